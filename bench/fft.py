@@ -0,0 +1,114 @@
+"""
+Benchmark the spectrum FFT at every size from 128 to 4096 points.
+
+Each size is timed for the in-place transform alone and for the whole
+spectrum, the transform and the reduction to one level per column. It
+runs the fixed point Python FFT, as on the badge, or with --ulab the
+array math the scope uses when ulab is present, with NumPy standing in.
+
+    python bench/fft.py
+    python bench/fft.py --ulab
+    python bench/fft.py --output fft_results.json
+"""
+
+import argparse
+import array
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import hostsim  # noqa: E402
+
+SIZES = (128, 256, 512, 1024, 2048, 4096)
+
+
+def test_signal(size):
+    """ Two tones and some noise, as offset binary samples. """
+    values = []
+    seed = 1
+    for i in range(size):
+        seed = (seed * 1103515245 + 12345) & 0x7fffffff
+        v = (12000 * math.sin(2 * math.pi * 0.0625 * i) +
+             3000 * math.sin(2 * math.pi * 0.3 * i) +
+             ((seed >> 16) & 0x3ff) - 512)
+        values.append(32768 + int(v))
+    return array.array('H', values)
+
+
+def best_ns(func, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        func()
+        elapsed = time.perf_counter_ns() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run(rounds=5, ulab=False):
+    hostsim.load_scope(hostsim.Backend(ulab=ulab))
+    # Imported after the scope, against the backend's ulab
+    from edgemic import common, spectrum as module
+    columns = common.x_right - common.x_left + 1
+    results = {}
+    for size in SIZES:
+        spectrum = module.Spectrum(size)
+        signal = test_signal(size)
+        buffer = array.array('H', signal)
+        levels = array.array('h', [0] * columns)
+
+        def transform():
+            buffer[:] = signal
+            spectrum.transform(buffer, 0)
+
+        def whole():
+            buffer[:] = signal
+            spectrum.levels(buffer, 0, levels)
+
+        copy_ns = best_ns(lambda: buffer.__setitem__(slice(None), signal),
+                          rounds)
+        result = {'levels_us': round((best_ns(whole, rounds) - copy_ns)
+                                     / 1000.0, 1)}
+        if module.np is None:
+            result['transform_us'] = round(
+                (best_ns(transform, rounds) - copy_ns) / 1000.0, 1)
+        results[str(size)] = result
+    return results, 'array' if module.np is not None else 'fixed point'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='runs per size, the fastest is reported')
+    parser.add_argument('--output', help='where to write the results')
+    parser.add_argument('--ulab', action='store_true',
+                        help='time the array FFT, with NumPy as ulab')
+    args = parser.parse_args()
+
+    results, kind = run(args.rounds, args.ulab)
+    print('%s FFT' % kind)
+    print('%6s %12s %12s' % ('points', 'transform us', 'spectrum us'))
+    for size in SIZES:
+        r = results[str(size)]
+        print('%6d %12s %12.1f' % (size, r.get('transform_us', '-'),
+                                   r['levels_us']))
+    if args.output:
+        report = {'meta': {'python': platform.python_version(),
+                           'machine': platform.machine(),
+                           'fft': kind},
+                  'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
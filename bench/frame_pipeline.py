@@ -0,0 +1,420 @@
+"""
+Benchmark the acquire/trigger/draw/refresh frame pipeline on the host.
+
+Every channel is run across the full num_samples_per_px range and across
+a set of gain/offset settings, and the microphone's spectrum at every FFT
+size, the microphone and generator averaged and with peak hold, and the
+microphone and accelerometer together as two traces. The microphone and
+generator are also run through each decimation filter across the sweep
+range, next to the raw dots and envelope at the same settings. The
+microphone and light sensor's longest sweeps are held and inspected at
+several zooms, panned back and forth every frame. Each stage of the main
+loop is timed separately, with swap covering decimation and averaging,
+and the bitmap writes per frame are counted. Results are
+written as JSON and compared against a stored baseline:
+
+    python bench/frame_pipeline.py                    # compare to baseline
+    python bench/frame_pipeline.py --update-baseline  # update what moved
+    python bench/frame_pipeline.py --only 'light/roll/*' --update-baseline
+
+With --replay, a capture file is played back as fast as it can be read
+and timed as one more channel, so recorded signals can be benchmarked.
+
+The run fails when a configuration does more bitmap writes per frame
+than the baseline, or when its frame time grows by more than
+--time-tolerance. Writes are deterministic. Frame times are compared
+as multiples of a fixed calibration loop timed next to each
+configuration, which takes out most of the difference between machines
+and of CPU clock changes during the run. A configuration over the time
+tolerance is run again, up to RETRIES times, and its best time kept, so
+one disturbed run does not fail it.
+
+--update-baseline only changes the entries that moved: those that are
+new, whose writes changed, or that are still over the time tolerance.
+The others keep their stored numbers, so the baseline's history shows 
+which configurations a change affected. With --only, just the matching
+configurations are run, and with --update-baseline their entries are
+stored whatever they measured, to record a speedup.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import hostsim  # noqa: E402
+
+BASELINE = os.path.join(ROOT, 'bench', 'baseline.json')
+STAGES = ('sweep', 'trigger', 'draw', 'refresh', 'swap')
+# Runs again of a configuration over the time tolerance
+RETRIES = 2
+
+
+def channels(scope):
+    found = {}
+    for name in scope.ChannelRegistry.CLASSES:
+        found[name] = scope.registry.get(name)
+    replay = scope.registry.made('replay')
+    if replay is not None:
+        found['replay'] = replay
+    return found
+
+
+def configurations(scope, quick=False):
+    """ Yield (key, channel name, settings) for every configuration.
+
+    settings maps channel attributes to the values to apply on top of
+    the channel preset.
+    """
+    # The scope's classes are in lib/edgemic, importable once a scope is
+    # loaded.
+    from edgemic.accumulator import Accumulator
+    from edgemic.decimator import Decimator
+    from edgemic.display import DisplayView
+    dots = DisplayView.TRACE_DOTS
+    envelope = DisplayView.TRACE_ENVELOPE
+    for name, channel in sorted(channels(scope).items()):
+        channel.preset()
+        step = 6 if quick else 1
+        # A replay keeps the recorded sweep length.
+        first_spp = channel.min_samples_per_px
+        last_spp = channel.max_samples_per_px
+        if name == 'replay':
+            first_spp = last_spp = channel.num_samples_per_px
+        for spp in range(first_spp, last_spp + 1, step):
+            yield ('%s/spp=%d' % (name, spp), name,
+                   {'num_samples_per_px': spp, 'trace_mode': dots,
+                    'roll_mode': False})
+            yield ('%s/envelope/spp=%d' % (name, spp), name,
+                   {'num_samples_per_px': spp, 'trace_mode': envelope,
+                    'roll_mode': False})
+            if name in ('mic', 'generator'):
+                for mode in range(1, len(Decimator.FILTER_NAMES)):
+                    yield ('%s/%s/spp=%d' % (
+                               name, Decimator.FILTER_NAMES[mode].lower(),
+                               spp), name,
+                           {'num_samples_per_px': spp, 'trace_mode': dots,
+                            'decimation': mode, 'roll_mode': False})
+            if hasattr(channel, 'read_sample'):
+                yield ('%s/roll/spp=%d' % (name, spp), name,
+                       {'num_samples_per_px': spp, 'roll_mode': True})
+
+        gain = channel.vertical_gain
+        offset = channel.vertical_offset
+        for g in (channel.min_gain_limit, gain, channel.max_gain_limit):
+            for o in (offset - 32, offset, offset + 32):
+                yield ('%s/gain=%d/offset=%d' % (name, g, o), name,
+                       {'vertical_gain': g, 'vertical_offset': o,
+                        'trace_mode': dots, 'roll_mode': False})
+
+        if name in ('mic', 'generator'):
+            for mode in range(1, len(Accumulator.MODE_NAMES)):
+                yield ('%s/%s' % (name, Accumulator.MODE_NAMES[mode].lower()),
+                       name, {'acquire_mode': mode})
+
+        if name in ('mic', 'light'):
+            for per in (1, 4, 16, 64):
+                yield ('%s/inspect/per=%d' % (name, per), name,
+                       {'num_samples_per_px': channel.max_samples_per_px,
+                        'roll_mode': False, 'inspect': per})
+
+        if name == 'mic':
+            size = channel.min_fft_size
+            while size <= channel.max_fft_size:
+                yield ('%s/fft=%d' % (name, size), name,
+                       {'fft_size': size, 'spectrum_mode': True})
+                size <<= 1
+
+    yield ('mic+accel', 'mic+accel', {})
+
+
+def calibrate(rounds=3):
+    """ Time a fixed Python loop, in ns. """
+    buffer = list(range(2000))
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        total = 0
+        for _ in range(5):
+            for v in buffer:
+                if v > 1000:
+                    total += v >> 3
+        elapsed = time.perf_counter_ns() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_frames(scope, traces, frames):
+    """ Run frames through the pipeline and time each stage. """
+    screen = scope.screen
+    bitmap = screen.bitmap
+    display = screen.display
+    clock = time.perf_counter_ns
+    totals = dict.fromkeys(STAGES, 0)
+
+    writes = bitmap.writes
+    best = None
+    pan = 1
+    start = clock()
+    for _ in range(frames):
+        # A held sweep is panned a quarter screen back and forth, so the
+        # view changes every frame unless it is already at an end.
+        for channel in traces:
+            if channel.inspecting:
+                channel.history.pan(pan * (channel.history.columns >> 2))
+        pan = -pan
+        # The same order as the main loop: draw the last sweep, start the
+        # refresh, take the next sweep while it is pending, then finish.
+        t0 = clock()
+        screen.draw_traces(traces)
+        t1 = clock()
+        refreshed = display.refresh(minimum_frames_per_second=0)
+        t2 = clock()
+        scope.take_sweeps(traces)
+        t3 = clock()
+        triggered = [not channel.roll_mode and not channel.inspecting and
+                     channel.trigger() for channel in traces]
+        t4 = clock()
+        while not refreshed:
+            refreshed = display.refresh(minimum_frames_per_second=0)
+        t5 = clock()
+        for channel, swap in zip(traces, triggered):
+            if swap:
+                channel.swap_buffers()
+        t6 = clock()
+        totals['draw'] += t1 - t0
+        totals['sweep'] += t3 - t2
+        totals['trigger'] += t4 - t3
+        totals['refresh'] += (t2 - t1) + (t5 - t4)
+        totals['swap'] += t6 - t5
+        if best is None or t6 - t0 < best:
+            best = t6 - t0
+    elapsed = clock() - start
+
+    result = {'us': {}}
+    for stage in STAGES:
+        result['us'][stage] = round(totals[stage] / frames / 1000.0, 1)
+    # The fastest frame is the least disturbed by the rest of the machine,
+    # so it is the one compared against the baseline.
+    result['frame_us'] = round(best / 1000.0, 1)
+    result['fps'] = round(frames * 1e9 / elapsed, 1)
+    result['writes_per_frame'] = round((bitmap.writes - writes) / frames, 1)
+    return result
+
+
+def load(realtime, ulab, replay):
+    # With analogbufio, a light sweep is a copy from the source, where a 
+    # paced one would wait out its length in real time. The bench times 
+    # what the scope's Python costs, so it keeps analogbufio.
+    scope = hostsim.load_scope(hostsim.Backend(realtime=realtime, ulab=ulab,
+                                               analogbufio=True))
+    if replay:
+        scope.add_replay(replay, speed=0)
+    return scope
+
+
+def run(frames=5, quick=False, realtime=False, ulab=False, replay=None,
+        patterns=None):
+    """ Time every configuration, or those whose keys match one of the 
+    fnmatch patterns. """
+    results = {}
+    scope = load(realtime, ulab, replay)
+    for key, name, settings in configurations(scope, quick):
+        if patterns is not None and not any(
+                fnmatch.fnmatchcase(key, pattern) for pattern in patterns):
+            continue
+        # A fresh scope for every configuration, so the signal sources
+        # start from the same point and the bitmap writes repeat exactly.
+        scope = load(realtime, ulab, replay)
+        if name == 'mic+accel':
+            traces = scope.select_input(scope.MULTI_INPUT)
+        else:
+            channel = channels(scope)[name]
+            traces = (channel,)
+            channel.preset()
+            for attr, value in settings.items():
+                if attr == 'roll_mode':
+                    channel.set_roll_mode(value)
+                elif attr == 'spectrum_mode':
+                    channel.set_spectrum_mode(value)
+                elif attr == 'acquire_mode':
+                    channel.set_acquire_mode(value)
+                elif attr == 'decimation':
+                    channel.set_decimation(value)
+                elif attr == 'inspect':
+                    continue
+                else:
+                    setattr(channel, attr, value)
+            channel.calc_num_samples()
+        # Without real time, a roll takes a whole screen every frame
+        # instead of stopping at a deadline, so the writes repeat exactly.
+        if not realtime:
+            scope.ROLL_BUDGET_MS = 1000000
+        # One warm-up frame so the first sweep's setup is not counted.
+        run_frames(scope, traces, 1)
+        if 'inspect' in settings:
+            channel.set_inspect(True)
+            channel.history.zoom(settings['inspect'])
+        calibration_ns = calibrate()
+        result = run_frames(scope, traces, frames)
+        calibration_ns = min(calibration_ns, calibrate())
+        result['frame_rel'] = round(result['frame_us'] * 1000.0 /
+                                    calibration_ns, 3)
+        results[key] = result
+    return results
+
+
+def too_slow(result, base, time_tolerance):
+    return (time_tolerance is not None and
+            result['frame_rel'] > base['frame_rel'] * (1.0 + time_tolerance))
+
+
+def compare(results, baseline, time_tolerance):
+    """ Return a list of regressions against the baseline results. """
+    failures = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['writes_per_frame'] > base['writes_per_frame']:
+            failures.append('%s: %.1f bitmap writes per frame, baseline %.1f'
+                            % (key, result['writes_per_frame'],
+                               base['writes_per_frame']))
+        if too_slow(result, base, time_tolerance):
+            failures.append('%s: frame time %.2f calibration loops, '
+                            'baseline %.2f'
+                            % (key, result['frame_rel'], base['frame_rel']))
+    return failures
+
+
+def retry_slow(results, baseline, time_tolerance, args):
+    """ Run the configurations over the time tolerance again, keeping 
+    each one's fastest run. """
+    for _ in range(RETRIES):
+        slow = [key for key, result in sorted(results.items())
+                if key in baseline and 
+                too_slow(result, baseline[key], time_tolerance)]
+        if not slow:
+            return
+        again = run(args.frames, args.quick, args.realtime, args.ulab,
+                    args.replay, slow)
+        for key, result in again.items():
+            if result['frame_rel'] < results[key]['frame_rel']:
+                results[key] = result
+
+
+def moved(results, baseline, time_tolerance):
+    """ The keys of the results that are new, do different writes, or 
+    are over the time tolerance. """
+    keys = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if (base is None or 
+                result['writes_per_frame'] != base['writes_per_frame'] or
+                too_slow(result, base, time_tolerance)):
+            keys.append(key)
+    return keys
+
+
+def summary(results):
+    lines = ['%-28s %9s %9s %9s %9s %9s %9s %8s' %
+             ('configuration', 'fps', 'sweep', 'trigger', 'draw', 'refresh',
+              'swap', 'writes')]
+    for key, r in sorted(results.items()):
+        us = r['us']
+        # Baselines from before the swap stage was timed lack it.
+        lines.append('%-28s %9.1f %9.1f %9.1f %9.1f %9.1f %9.1f %8.1f' %
+                     (key, r['fps'], us['sweep'], us['trigger'], us['draw'],
+                      us['refresh'], us.get('swap', 0.0),
+                      r['writes_per_frame']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=5,
+                        help='frames timed per configuration')
+    parser.add_argument('--quick', action='store_true',
+                        help='step num_samples_per_px by 6 instead of 1')
+    parser.add_argument('--realtime', action='store_true',
+                        help='block for hardware time like the badge does')
+    parser.add_argument('--ulab', action='store_true',
+                        help='give the scope NumPy as ulab; compare against '
+                             'a baseline made with --ulab too')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='time playing back this capture file too')
+    parser.add_argument('--output', default='bench_results.json',
+                        help='where to write the results')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store the entries that moved, or with '
+                             '--only the ones run')
+    parser.add_argument('--only', metavar='PATTERN', action='append',
+                        help='only run configurations matching this '
+                             'fnmatch pattern; may be repeated')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='allowed fractional frame time increase; '
+                             'negative to skip the time check')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline = stored['results']
+    tolerance = args.time_tolerance if args.time_tolerance >= 0 else None
+    results = run(args.frames, args.quick, args.realtime, args.ulab,
+                  args.replay, args.only)
+    retry_slow(results, baseline, tolerance, args)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'frames': args.frames,
+            'realtime': args.realtime,
+            'ulab': args.ulab,
+            'replay': args.replay,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    if not args.quiet:
+        print(summary(results))
+
+    if args.update_baseline:
+        if not baseline:
+            stored = report
+            keys = sorted(results)
+        elif args.only:
+            keys = sorted(results)
+        else:
+            keys = moved(results, baseline, tolerance)
+        for key in keys:
+            baseline[key] = results[key]
+            print('baseline updated: %s' % key)
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=1, sort_keys=True)
+        print('%d entries written to %s' % (len(keys), args.baseline))
+        return 0
+
+    if not baseline:
+        print('no baseline at %s, nothing to compare' % args.baseline)
+        return 0
+    failures = compare(results, baseline, tolerance)
+    for failure in failures:
+        print('REGRESSION ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
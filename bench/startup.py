@@ -0,0 +1,194 @@
+"""
+Time the scope's startup on the host, to its first trace on the screen.
+
+The scope makes a channel, importing its module and its driver, the 
+first time its input is shown. Of the drivers, that only defers 
+audiobusio for the microphone and adafruit_lis3dh for the accelerometer;
+the others are imported at boot either way. Each input is started both 
+that way and with every channel made before the first frame, and the
+time from importing code.py to the end of the first frame and the
+memory allocated by then are reported, with the steps of code.py's own
+startup report for the lazy start.
+
+The badge compiles code.py and each lib/edgemic module from source when
+it is imported, and how much RAM that takes decides whether the scope 
+starts at all. Bytecode caches are turned off here, so the load step 
+includes compiling, as it does on the badge. Each source is also 
+compiled on its own with compile(), and the time and the peak memory
+are reported, with whether a start on the light sensor imports it.
+
+    python bench/startup.py
+    python bench/startup.py --rounds 10 --output startup_results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import hostsim  # noqa: E402
+
+LIB = os.path.join(ROOT, 'lib', 'edgemic')
+
+# The scope's INPUTS
+INPUTS = (('mic', 0), ('light', 1), ('generator', 2), ('accel', 3),
+          ('fft', 4), ('mic+accel', 5))
+
+
+def start(input_idx, eager):
+    """ Start the scope on an input and run one frame. Return the ms to
+    the first trace and the scope. """
+    begin = time.perf_counter_ns()
+    scope = hostsim.load_scope(hostsim.Backend())
+    if eager:
+        for name in scope.ChannelRegistry.CLASSES:
+            scope.registry.get(name)
+    # The scope prints its startup report after the first frame.
+    with contextlib.redirect_stdout(io.StringIO()):
+        scope.run(frames=1, input_idx=input_idx)
+    return (time.perf_counter_ns() - begin) / 1e6, scope
+
+
+def allocated_kb(input_idx, eager):
+    """ The memory still allocated after the first frame, in kB. Traced
+    on a start of its own, as tracing slows everything down. """
+    tracemalloc.start()
+    start(input_idx, eager)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated / 1024.0
+
+
+def sources():
+    """ (module name, path) of code.py and each lib/edgemic module. """
+    found = [('code', hostsim.SCOPE_PATH)]
+    for filename in sorted(os.listdir(LIB)):
+        if filename.endswith('.py'):
+            name = filename[:-3]
+            if name == '__init__':
+                name = 'edgemic'
+            else:
+                name = 'edgemic.' + name
+            found.append((name, os.path.join(LIB, filename)))
+    return found
+
+
+def compile_costs(rounds=5):
+    """ Compile each source with no bytecode cache. Return, by module, 
+    its size, the fastest compile in ms and the peak memory of one 
+    compile in kB. """
+    costs = {}
+    for name, path in sources():
+        with open(path) as f:
+            source = f.read()
+        best_ms = None
+        for _ in range(rounds):
+            begin = time.perf_counter_ns()
+            compile(source, path, 'exec', dont_inherit=True)
+            ms = (time.perf_counter_ns() - begin) / 1e6
+            if best_ms is None or ms < best_ms:
+                best_ms = ms
+        tracemalloc.start()
+        compile(source, path, 'exec', dont_inherit=True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        costs[name] = {'bytes': len(source), 'compile_ms': round(best_ms, 2),
+                       'compile_peak_kb': round(peak / 1024.0, 1)}
+    return costs
+
+
+def boot_modules(input_idx=1):
+    """ The modules a start on an input imports by its first trace. """
+    start(input_idx, False)
+    return sorted(name for name in sys.modules
+                  if name == 'edgemic' or name.startswith('edgemic.'))
+
+
+def run(rounds=5):
+    results = {}
+    for name, input_idx in INPUTS:
+        result = {}
+        for mode in ('lazy', 'eager'):
+            best_ms = None
+            for _ in range(rounds):
+                ms, scope = start(input_idx, mode == 'eager')
+                if best_ms is None or ms < best_ms:
+                    best_ms = ms
+            kb = allocated_kb(input_idx, mode == 'eager')
+            result[mode] = {'first_trace_ms': round(best_ms, 2),
+                            'allocated_kb': round(kb, 1),
+                            'channels': sorted(scope.registry.channels)}
+            if mode == 'lazy':
+                result['steps'] = scope.startup.steps
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5,
+                        help='starts per input and mode, the fastest is '
+                             'reported')
+    parser.add_argument('--output', help='where to write the results')
+    args = parser.parse_args()
+
+    # Compile from source on every start, as the badge does, instead of
+    # loading the bytecode a first start left in __pycache__.
+    sys.dont_write_bytecode = True
+    sys.pycache_prefix = tempfile.mkdtemp()
+
+    results = run(args.rounds)
+    costs = compile_costs(args.rounds)
+    boot = boot_modules()
+    print('%-10s %10s %10s %10s %10s  %s' %
+          ('input', 'lazy ms', 'eager ms', 'lazy kB', 'eager kB',
+           'lazy steps, ms'))
+    for name, _ in INPUTS:
+        r = results[name]
+        steps = []
+        last = 0
+        for step, ms in r['steps']:
+            steps.append('%s %d' % (step, ms - last))
+            last = ms
+        print('%-10s %10.2f %10.2f %10.1f %10.1f  %s' %
+              (name, r['lazy']['first_trace_ms'],
+               r['eager']['first_trace_ms'], r['lazy']['allocated_kb'],
+               r['eager']['allocated_kb'], ', '.join(steps)))
+    print()
+    print('%-22s %8s %11s %12s  %s' %
+          ('module', 'bytes', 'compile ms', 'compile kB', 'imported'))
+    boot_ms = 0.0
+    for name, _ in sources():
+        c = costs[name]
+        at_boot = name == 'code' or name in boot
+        if at_boot:
+            boot_ms += c['compile_ms']
+        print('%-22s %8d %11.2f %12.1f  %s' %
+              (name, c['bytes'], c['compile_ms'], c['compile_peak_kb'],
+               'at boot' if at_boot else 'on first use'))
+    print('compiled at boot: %.2f ms, of %.2f ms for all of them' %
+          (boot_ms, sum(c['compile_ms'] for c in costs.values())))
+    if args.output:
+        report = {'meta': {'python': platform.python_version(),
+                           'machine': platform.machine(),
+                           'rounds': args.rounds},
+                  'results': results,
+                  'compile': costs,
+                  'boot_modules': boot}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
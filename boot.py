@@ -0,0 +1,14 @@
+"""
+Runs before code.py when the EDGE badge starts. Turns on the second USB
+serial port, the data port that code.py streams sweeps on, next to the
+REPL console. Copy it to the badge with code.py. Changes take effect
+after a hard reset.
+
+Needs CircuitPython 7 or later; on older versions it does nothing.
+"""
+
+try:
+    import usb_cdc
+    usb_cdc.enable(console=True, data=True)
+except (ImportError, AttributeError):
+    pass
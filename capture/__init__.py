@@ -0,0 +1,14 @@
+"""
+Host-side receiver for the sweeps the badge streams over USB serial.
+
+code.py sends each sweep on the usb_cdc data port when streaming is on
+(Left and Right together). stream.SweepDecoder turns the bytes back into
+Sweeps with NumPy sample arrays and counts the sweeps lost on the way,
+and capfile.Recorder appends them to memory-mapped capture files, which
+capfile.CaptureReader maps back for analysis and code.py can replay:
+
+    python -m capture --port /dev/ttyACM1 --output run.emcap
+"""
+
+from capture.capfile import CaptureReader, CaptureWriter, Recorder
+from capture.stream import Measurements, Sweep, SweepDecoder
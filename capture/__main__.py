@@ -0,0 +1,113 @@
+"""
+Record the sweeps streamed by the badge to capture files.
+
+    python -m capture --port /dev/ttyACM1 --output run.emcap
+    python -m capture --input sweeps.bin --output run.emcap
+
+--port reads the badge's USB serial data port and needs pyserial.
+--input reads a file of the raw stream, such as python -m hostsim
+--stream writes.
+"""
+
+import argparse
+import sys
+import time
+
+from capture.capfile import Recorder
+from capture.stream import SweepDecoder
+
+READ_SIZE = 1 << 16
+# Seconds between status lines
+STATUS_INTERVAL = 5.0
+
+
+def open_port(name):
+    try:
+        import serial
+    except ImportError:
+        sys.exit('reading a serial port needs pyserial: '
+                 'pip install pyserial')
+    # USB serial ignores the baud rate. The timeout keeps status lines
+    # coming when the badge is not streaming.
+    port = serial.Serial(name, timeout=0.2)
+
+    def read():
+        return port.read(max(1, port.in_waiting))
+    return read, port.close
+
+
+def open_input(name):
+    f = open(name, 'rb')
+
+    def read():
+        data = f.read(READ_SIZE)
+        return data if data else None
+    return read, f.close
+
+
+def status(decoder, recorder):
+    return ('%d sweeps, %d dropped, %d bytes skipped, %d files' %
+            (decoder.sweeps, decoder.dropped, decoder.skipped_bytes,
+             len(recorder.paths)))
+
+
+def record(read, decoder, recorder, max_sweeps=None, duration=None,
+           verbose=True):
+    """ Decode and record until the input ends or a limit is reached. """
+    start = time.monotonic()
+    next_status = start + STATUS_INTERVAL
+    dropped = decoder.dropped
+    while True:
+        data = read()
+        if data is None:
+            return
+        for sweep in decoder.feed(data):
+            # The sweeps lost just before this one
+            recorder.write(sweep, decoder.dropped - dropped)
+            dropped = decoder.dropped
+            if max_sweeps is not None and decoder.sweeps >= max_sweeps:
+                return
+        now = time.monotonic()
+        if duration is not None and now - start >= duration:
+            return
+        if verbose and now >= next_status:
+            print(status(decoder, recorder))
+            next_status = now + STATUS_INTERVAL
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--port', help='serial port of the badge data port')
+    source.add_argument('--input', help='file holding a raw stream')
+    parser.add_argument('--output', required=True,
+                        help='capture file; later files get -001, -002...')
+    parser.add_argument('--sweeps', type=int,
+                        help='stop after this many sweeps')
+    parser.add_argument('--duration', type=float,
+                        help='stop after this many seconds')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    if args.port:
+        read, close = open_port(args.port)
+    else:
+        read, close = open_input(args.input)
+    decoder = SweepDecoder()
+    recorder = Recorder(args.output)
+    try:
+        record(read, decoder, recorder, args.sweeps, args.duration,
+               not args.quiet)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+        close()
+    print(status(decoder, recorder))
+    for path in recorder.paths:
+        print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
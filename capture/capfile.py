@@ -0,0 +1,233 @@
+"""
+Capture files: sweeps from one channel with fixed settings, stored so
+they can be memory-mapped.
+
+A file is a 64 byte little-endian header followed by one row per sweep:
+
+    header field  type     meaning
+    magic         8 bytes  b'EMCAPTUR'
+    version       uint16   VERSION
+    header_size   uint16   HEADER_SIZE, where the rows start
+    channel       uint8    CHANNEL_ID of the channel in code.py
+    flags         uint8    FLAG_SPECTRUM: rows hold signed dB levels
+    spp           uint8    num_samples_per_px
+    (pad)         uint8
+    sample_rate   uint32   Hz, of the first sweep
+    gain          int16    vertical_gain
+    offset        int16    vertical_offset
+    sweep_length  uint16   samples in each sweep
+    (pad)         uint16
+    sweeps        uint32   rows written
+    dropped       uint32   sweeps lost before and between these rows
+    first_seq     uint32   seq of the first row
+    (reserved)             zeros, up to header_size
+
+    row field     type     meaning
+    seq           uint32   the sweep's sequence number from the badge
+    sample_rate   uint32   Hz, as measured for this sweep
+    start         uint16   the first sample drawn
+    (pad)         uint16
+    samples       uint16 x sweep_length
+
+The rows are a contiguous array of row_dtype(sweep_length), and the
+samples of all rows one (sweeps, sweep_length) slice of it. A Recorder
+keeps a file for each channel and starts a new one when the channel's
+settings change.
+
+CaptureReader maps a file for reading on a PC. On the badge, the scope's
+replayChannel reads the same files a sweep at a time.
+"""
+
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from capture.stream import Sweep
+
+MAGIC = b'EMCAPTUR'
+VERSION = 1
+HEADER = struct.Struct('<8sHHBBBxIhhHxxIII')
+HEADER_SIZE = 64
+FLAG_SPECTRUM = 1
+EXTENSION = '.emcap'
+
+
+def row_dtype(sweep_length):
+    """ The dtype of one row. """
+    return np.dtype([('seq', '<u4'), ('sample_rate', '<u4'),
+                     ('start', '<u2'), ('pad', '<u2'),
+                     ('samples', '<u2', (sweep_length,))])
+
+
+def settings(sweep):
+    """ The parts of a Sweep that are fixed for a whole file. Whether it
+    was measured is not one: measurements are not stored. """
+    return (sweep.channel, sweep.flags & FLAG_SPECTRUM, sweep.spp, sweep.gain,
+            sweep.offset, len(sweep.samples))
+
+
+class CaptureWriter(object):
+    """ Appends sweeps to a new capture file through a memory map.
+
+    The file grows by GROW_ROWS rows at a time, or more for short
+    sweeps, and is cut back to the rows written when it is closed. The
+    header is kept up to date after every sweep, so a file that is still
+    being written can be read up to its last complete row.
+    """
+
+    GROW_BYTES = 4 << 20
+
+    def __init__(self, path, sweep):
+        self.path = path
+        self.settings = settings(sweep)
+        self.sample_rate = sweep.sample_rate
+        self.first_seq = sweep.seq
+        self.dtype = row_dtype(len(sweep.samples))
+        self.grow_rows = max(1, self.GROW_BYTES // self.dtype.itemsize)
+        self.sweeps = 0
+        self.dropped = 0
+        self.capacity = 0
+        self.rows = None
+        self.map = None
+        self.file = open(path, 'w+b')
+        self._grow()
+
+    def _grow(self):
+        # The rows view must go before the map it looks into can close.
+        self.rows = None
+        if self.map is not None:
+            self.map.close()
+        self.capacity += self.grow_rows
+        self.file.truncate(HEADER_SIZE + self.capacity * self.dtype.itemsize)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.rows = np.ndarray((self.capacity,), self.dtype, self.map,
+                               HEADER_SIZE)
+
+    def _write_header(self):
+        channel, flags, spp, gain, offset, length = self.settings
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, HEADER_SIZE, channel,
+                         flags, spp, self.sample_rate, gain, offset, length,
+                         self.sweeps, self.dropped, self.first_seq)
+
+    def matches(self, sweep):
+        """ Whether sweep can go in this file. """
+        return settings(sweep) == self.settings
+
+    def append(self, sweep, dropped=0):
+        """ Add a sweep, and the number lost just before it. """
+        if self.sweeps == self.capacity:
+            self._grow()
+        row = self.rows[self.sweeps]
+        row['seq'] = sweep.seq
+        row['sample_rate'] = sweep.sample_rate
+        row['start'] = sweep.start
+        row['samples'] = sweep.samples.view('<u2')
+        self.sweeps += 1
+        self.dropped += dropped
+        self._write_header()
+
+    def close(self):
+        if self.file is None:
+            return
+        self._write_header()
+        self.rows = None
+        self.map.flush()
+        self.map.close()
+        self.map = None
+        self.file.truncate(HEADER_SIZE + self.sweeps * self.dtype.itemsize)
+        self.file.close()
+        self.file = None
+
+
+class Recorder(object):
+    """ Writes sweeps to a run of capture files.
+
+    The first file is path itself, and each new file gets a number added
+    to the name: run.emcap, run-001.emcap, run-002.emcap and so on. Each
+    channel has a file of its own, since a multi-trace input streams the
+    sweeps of two channels in turn, and a new one is started when the
+    channel's settings change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.paths = []
+        self.writers = {}
+
+    def _next_path(self):
+        if not self.paths:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        return '%s-%03d%s' % (base, len(self.paths), ext or EXTENSION)
+
+    def write(self, sweep, dropped=0):
+        """ Add a sweep, and the number lost just before it. """
+        writer = self.writers.get(sweep.channel)
+        if writer is None or not writer.matches(sweep):
+            if writer is not None:
+                writer.close()
+            path = self._next_path()
+            self.paths.append(path)
+            writer = CaptureWriter(path, sweep)
+            self.writers[sweep.channel] = writer
+        writer.append(sweep, dropped)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+class CaptureReader(object):
+    """ A capture file, memory-mapped for reading.
+
+    Nothing is read until it is used, so files of any size open at once.
+    rows is the array of all rows, samples the (sweeps, sweep_length)
+    array of their samples, signed for spectrum files, and reader[i] is
+    sweep i as a Sweep. A file still being written is read up to the
+    rows its header counts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError('not a capture file: %s' % path)
+        (magic, version, self.header_size, self.channel, self.flags,
+         self.spp, self.sample_rate, self.gain, self.offset,
+         self.sweep_length, self.sweeps, self.dropped,
+         self.first_seq) = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a capture file: %s' % path)
+        self.dtype = row_dtype(self.sweep_length)
+        if self.sweeps:
+            self.rows = np.memmap(path, self.dtype, 'r', self.header_size,
+                                  (self.sweeps,))
+        else:
+            self.rows = np.zeros(0, self.dtype)
+
+    @property
+    def samples(self):
+        samples = self.rows['samples']
+        if self.flags & FLAG_SPECTRUM:
+            return samples.view('<i2')
+        return samples
+
+    def __len__(self):
+        return self.sweeps
+
+    def __getitem__(self, idx):
+        row = self.rows[idx]
+        samples = row['samples']
+        if self.flags & FLAG_SPECTRUM:
+            samples = samples.view('<i2')
+        return Sweep(self.channel, self.flags, self.spp, int(row['seq']),
+                     int(row['sample_rate']), self.gain, self.offset,
+                     int(row['start']), samples)
+
+    def __iter__(self):
+        for idx in range(self.sweeps):
+            yield self[idx]
@@ -0,0 +1,158 @@
+"""
+Decoder for the sweeps code.py streams over the USB serial data port.
+
+Each sweep is a little-endian header, its samples and an end mark:
+
+    field         type    meaning
+    magic         2 bytes b'EM'
+    version       uint8   VERSION
+    channel       uint8   the channel's CHANNEL_ID, see CHANNEL_NAMES
+    flags         uint8   FLAG_SPECTRUM: dB levels instead of samples
+                          FLAG_MEASURED: measurements follow the samples
+    spp           uint8   num_samples_per_px
+    seq           uint32  counts every sweep sent
+    sample_rate   uint32  Hz, 0 if the channel has no timebase
+    gain          int16   vertical_gain
+    offset        int16   vertical_offset
+    start         uint16  the first sample drawn, where the trigger put it
+    count         uint16  the number of samples that follow
+
+then count samples, unsigned 16 bit offset binary, or signed 16 bit dB
+for spectrum sweeps, then with FLAG_MEASURED the measurements of the
+samples on the screen:
+
+    lo            uint16  the lowest sample
+    hi            uint16  the highest sample
+    mean          uint16  the mean sample
+    rms           uint16  the RMS about the mean, in counts
+    frequency     uint32  0.1Hz, 0 if it could not be measured
+    duty          uint16  0.1%, NO_DUTY if it could not be measured
+
+then the two bytes of END. A sweep the badge decimated to one sample per
+column arrives as those samples alone: spp 0, start 0 and its decimated
+sample_rate. This layout must match SweepStream in lib/edgemic/stream.py.
+Version 1 streams have no measurements and are still read.
+"""
+
+import collections
+import struct
+
+import numpy as np
+
+MAGIC = b'EM'
+VERSION = 2
+VERSIONS = (1, 2)
+HEADER = struct.Struct('<2sBBBBIIhhHH')
+MEASURED = struct.Struct('<HHHHIH')
+END = b'\xa5\x5a'
+FLAG_SPECTRUM = 1
+FLAG_MEASURED = 2
+NO_DUTY = 0xffff
+# The most samples code.py ever sends, the size of its sample buffers
+MAX_COUNT = 8000
+
+CHANNEL_NAMES = {0: 'none', 1: 'mic', 2: 'light', 3: 'generator',
+                 4: 'accel'}
+
+Sweep = collections.namedtuple(
+    'Sweep', ('channel', 'flags', 'spp', 'seq', 'sample_rate', 'gain',
+              'offset', 'start', 'samples', 'measurements'),
+    defaults=(None,))
+
+# Levels in counts, frequency in Hz and duty as a fraction, or None
+Measurements = collections.namedtuple(
+    'Measurements', ('lo', 'hi', 'mean', 'rms', 'frequency', 'duty'))
+
+
+class SweepDecoder(object):
+    """ Turns a byte stream back into Sweeps.
+
+    Feed it bytes in pieces of any size as they arrive. Anything that is
+    not a valid header is skipped, counted in skipped_bytes, until the
+    next magic, and so is a sweep whose samples are not followed by END.
+    The decoder recovers from a sweep cut short when the badge timed out
+    writing it, or from joining the stream part way.
+
+    A gap in seq means sweeps were lost, on the badge or on the way.
+    They are counted in dropped.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.last_seq = None
+        self.sweeps = 0
+        self.dropped = 0
+        self.skipped_bytes = 0
+
+    def feed(self, data):
+        """ Add bytes and return the list of Sweeps they complete. """
+        self.buffer += data
+        sweeps = []
+        while True:
+            sweep = self._next()
+            if sweep is None:
+                break
+            sweeps.append(sweep)
+        return sweeps
+
+    def _skip(self, count):
+        del self.buffer[:count]
+        self.skipped_bytes += count
+
+    def _next(self):
+        buf = self.buffer
+        while True:
+            at = buf.find(MAGIC)
+            if at < 0:
+                # Keep a last byte that could start a magic.
+                keep = 1 if buf[-1:] == MAGIC[:1] else 0
+                self._skip(len(buf) - keep)
+                return None
+            if at:
+                self._skip(at)
+            if len(buf) < HEADER.size:
+                return None
+            (magic, version, channel, flags, spp, seq, sample_rate, gain,
+             offset, start, count) = HEADER.unpack_from(buf)
+            if (version not in VERSIONS or channel not in CHANNEL_NAMES or
+                    count > MAX_COUNT or start > count):
+                # A magic inside the samples, or garbage. Look further on.
+                self._skip(1)
+                continue
+            end = HEADER.size + 2 * count
+            measured_end = end
+            if flags & FLAG_MEASURED:
+                measured_end += MEASURED.size
+            size = measured_end + len(END)
+            if len(buf) < size:
+                return None
+            if buf[measured_end:size] != END:
+                # Cut short, and the next sweep follows. Resync on it.
+                self._skip(1)
+                continue
+            dtype = '<i2' if flags & FLAG_SPECTRUM else '<u2'
+            samples = np.frombuffer(bytes(buf[HEADER.size:end]), dtype)
+            measurements = None
+            if flags & FLAG_MEASURED:
+                measurements = _measurements(MEASURED.unpack_from(buf, end))
+            del buf[:size]
+            self._count(seq)
+            return Sweep(channel, flags, spp, seq, sample_rate, gain, offset,
+                         start, samples, measurements)
+
+    def _count(self, seq):
+        if self.last_seq is not None:
+            gap = (seq - self.last_seq - 1) & 0xffffffff
+            # A seq that goes backwards is the badge restarting, not a
+            # loss of four billion sweeps.
+            if gap < 0x80000000:
+                self.dropped += gap
+        self.last_seq = seq
+        self.sweeps += 1
+
+
+def _measurements(fields):
+    lo, hi, mean, rms, frequency, duty = fields
+    return Measurements(lo, hi, mean, rms,
+                        frequency / 10.0 if frequency else None,
+                        duty / 1000.0 if duty != NO_DUTY else None)
@@ -38,6 +38,7 @@ Up:    push trace up
 Down:  push trace down
 Left:  faster sweep, fewer points
 Right: slower sweep, more points
+Hold a button to repeat it.
 
 For a photos and a description see:
 https://www.adafruitdaily.com/2019/11/19/
@@ -45,27 +46,40 @@ a-supercon-was-had-arm-aiot-dev-summit-is-almost-here-and-more-python-
 adafruit-circuitpython-pythonhardware-circuitpython-micropython-thepsf-adafruit/
 
 """
-
 import array
-import math
+import gc
+import os
 import time
-import audiobusio
-import displayio
+# When code.py started, for the startup report
+boot_start_ns = time.monotonic_ns()
 import board
-import analogio
 
 from micropython import const
-import digitalio
-import audioio
-from gamepadshift import GamePadShift
-import neopixel
-from adafruit_display_text.label import Label
-import terminalio
-import adafruit_lis3dh
+# The scope's classes are in lib/edgemic. Those every frame uses are
+# imported here. The channels and the features that are off at startup
+# are imported the first time they are used, so the badge only compiles
+# what it runs. See lib/edgemic/__init__.py.
+from edgemic.buttons import Button
+from edgemic.channel import sweeps_due, start_sweeps, step_sweeps
+from edgemic.common import ticks_diff, ticks_ms
+from edgemic.display import DisplayView, LedView
+from edgemic.telemetry import Heap, Telemetry
+# The USB serial data port, for streaming sweeps. boot.py turns it on.
+try:
+    import usb_cdc
+except ImportError:
+    usb_cdc = None
+# Cooperative tasks, where the asyncio library is installed
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
 
 """ Model View Controller Architecture 
-    The Model and View are in classes.
-    The Controller is the initialization and run loop and has no class.
+    The Model and View are classes in lib/edgemic.
+    The Controller is the initialization, the Controller class with the 
+    parts of a frame, and either the run loop here or the cooperative 
+    tasks in edgemic.tasks that call them.
 
     Hardware model classes:
         sensorChannel is the shared code for:
@@ -76,526 +90,564 @@ import adafruit_lis3dh
         The sensor-specific classes:
           - Interfaces to the hardware
           - Scales the output data
-          - Has a take_sweep() function to take a trace full of data.
+          - Has a take_sweep() function to take a trace full of data,
+            and start_sweep() and sweep_step() to take it in short steps.
 """
         
-class sensorChannel(object):
-    def __init__(self, button):
-        
-        self.button = button
-        
-        self.vertical_offset = 64
-        self.num_samples_per_px = 2
-        self.num_samples = 1000
-        self.vertical_gain = 5
-        self.start_sample = 3
-        self.adc_midscale = 32768
-        
-        self.max_gain_limit = 12
-        self.min_gain_limit = 0
-        self.gain_increment = 1
-        
-        self.max_vertical_offset_limit = 1000
-        self.min_vertical_offset_limit = -1000
-        self.vertical_offset_increment = 4
-        
-        self.max_samples_per_px = 39
-        self.min_samples_per_px = 1
-        self.samples_per_px_increment = 1
-        
-        self.min_num_samples = 100
-        self.max_num_samples = 8000
-        
-    def preset(self):
-        self.vertical_offset = 64
-        self.num_samples_per_px = 2
-        self.vertical_gain = 5
-        self.calc_num_samples()
-     
-    def increase_gain(self):
-        if self.vertical_gain < self.max_gain_limit:
-            self.vertical_gain += self.gain_increment
-            
-    def decrease_gain(self):
-        if self.vertical_gain > self.min_gain_limit:
-            self.vertical_gain -= self.gain_increment
-            
-    def increase_offset(self):
-        if (self.vertical_offset <= self.max_vertical_offset_limit +
-                                    self.vertical_offset_increment):
-            self.vertical_offset += self.vertical_offset_increment
-            
-    def decrease_offset(self):
-        if (self.vertical_offset >= self.min_vertical_offset_limit -
-                                    self.vertical_offset_increment):
-            self.vertical_offset -= self.vertical_offset_increment
-            
-    def increase_samples(self):
-        if self.num_samples_per_px > self.min_samples_per_px:
-            self.num_samples_per_px -= self.samples_per_px_increment
-            self.calc_num_samples()
-
-    def decrease_samples(self):
-        if self.num_samples_per_px < self.max_samples_per_px:
-            self.num_samples_per_px += self.samples_per_px_increment
-            self.calc_num_samples()
-            
-    def calc_num_samples(self):
-        nsamp = (1 + self.num_samples_per_px) * (x_right - x_left + 1) \
-                + self.start_sample
-        if nsamp <= self.max_num_samples:
-            self.num_samples = nsamp
-        elif nsamp >= self.min_num_samples:
-            self.num_samples = nsamp
-        else:
-            self.num_samples = self.max_num_samples
-
-    def buttons(self):
-        self.button.scan()
-        if self.button.a:
-            self.increase_gain()
-        if self.button.b:
-            self.decrease_gain()
-        if self.button.down:
-            self.increase_offset()
-        if self.button.up:
-            self.decrease_offset()
-        if self.button.left:
-            self.increase_samples()        
-        if self.button.right:
-            self.decrease_samples()
-        if self.button.start:
-            self.preset()
-            
-class micChannel(sensorChannel):
-    """ Class to use the light sensor as a data channel. """
+class Startup(object):
+    """Time the steps from code.py starting to the first trace shown"""
     
-    def __init__(self, board, button, samples):
-        super().__init__(button)
-        self.samples = samples
-        self.board = board
-        self.mic = audiobusio.PDMIn(
-                board.TX,
-                board.D12,
-                sample_rate=16000,
-                bit_depth=16)
-        
-    def take_sweep(self):
-        """ Take a sweep of sound samples."""
-        
-        self.mic.record(self.samples, self.num_samples)
-        
-class lightChannel(sensorChannel):
-    """ Class to use the light sensor as a data channel. """
-        
-    def __init__(self, board, button, samples):
-        super().__init__(button)
-        self.samples = samples
-        self.board = board
-        self.light_sensor = analogio.AnalogIn(board.A7)
-        
-    def preset(self):
-        super().preset()
-        self.vertical_gain = 8
-        self.vertical_offset = 0
-        
-    def take_sweep(self):
-        """ Take a sweep of light samples."""
-           
-        for a in range(self.num_samples):
-            self.samples[a] = self.light_sensor.value
-                
-class sawtoothChannel(sensorChannel):
-    """ Class to use a generated sawtooth waveform as a data channel. """
-        
-    def __init__(self, board, button, samples):
-        super().__init__(button)
-        self.samples = samples
-        self.board = board
-        self.vert_peak = 1000
-        self.vert_start = 32768 - self.vert_peak
-        self.vert_stop = 32768 + self.vert_peak
-        self.vert_incr = 25
-        self.vert = self.vert_start
-        
-    def preset(self):
-        
-        super().preset()
-        self.vertical_gain = 5
-        self.vertical_offset = 68
-        
-    def take_sweep(self):
-        """ Generate a sawtooth waveform with math, no measurement."""
-        
-        for idx in range(self.num_samples):
-            self.samples[idx] = self.vert
-            if self.vert + self.vert_incr > self.vert_stop:
-                self.vert = self.vert_start
-            else:
-                self.vert += self.vert_incr
-
-class accelerometerChannel(sensorChannel):
-    """ Class to use the accelerometer as a data channel. """
+    """mark(step) notes how long it has been since code.py started at 
+    the end of each step of setting up, and report() prints the time 
+    each step took once the first trace is on the screen, on USB serial:
     
-    def __init__(self, board, button, samples):
-        super().__init__(button)
-        self.samples = samples
-        self.board = board
-
-        try:
-            i2c = board.I2C()
-        except RuntimeError:
-            self.accelerometer = None
-
-        if i2c is not None:
-            int1 = digitalio.DigitalInOut(board.ACCELEROMETER_INTERRUPT)
-            try:
-                self.accelerometer = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19, int1=int1)
-            except ValueError:
-                self.accelerometer = adafruit_lis3dh.LIS3DH_I2C(i2c, int1=int1)       
-        
-    def preset(self):
-        super().preset()
-        
-    def take_sweep(self):
-        """ Take a sweep of accelerometer measurements."""
-        
-        """ Question: what is best lightweight algorithm to make 
-        a swept graph of acceleration interesting? 
-        Right now it is using the sum of the accelerations in x, y, and z."""
-        
-        # Scale the readings to look like ADC readings.
-
-        for a in range(0, self.num_samples, 2):
-            accel_reading = self.accelerometer.acceleration
-            accel = int(round(accel_reading.x + accel_reading.y + accel_reading.z) * 25.0) + 32768
-            self.samples[a] = accel
-            
-        # The accelerometer is slow. Interpolate between readings to make it sweep faster.
-        for a in range(1, self.num_samples, 2):
-            self.samples[a] = (self.samples[a-1] + self.samples[a+1]) >> 1
-
-class Button:
-    """Class to read Buttons on AdaFruit EDGE Badge."""
-    
-    """
-    TODO:
-    Need to debounce all the buttons in here, and also detect chords.
-    Chords can be captured as maximum value during press.
-    Instead of sleeping, should set a flag meaning 'button(s) are down'
-    And then another flag when they are all stable and up.
-    Use timestamps instead of delays so maybe things can continue
-    to happen. This requires some sort of threading or interrupts? 
-    Or maybe it spins inside here?
-    
-    Would like to have a button interrupt, especially for start/preset()
-    Need a debounce button method for all buttons
-
+        startup ms: <step> <ms>, <step> <ms>, ...; total <ms> ms, <kB>k free
+                    
+    load is the imports and the class definitions. Channels are made 
+    when they are first shown, so their steps are named after them. The
+    free memory is left out where gc.mem_free() is not available, as on 
+    a PC. Marks after the report are not kept.
     """
     
-    # Button Constants
-    BUTTON_LEFT = const(128)
-    BUTTON_UP = const(64)
-    BUTTON_DOWN = const(32)
-    BUTTON_RIGHT = const(16)
-    BUTTON_SELECT = const(8)
-    BUTTON_START = const(4)
-    BUTTON_A = const(2)
-    BUTTON_B = const(1)
-
-    def __init__(self, lights=None, i2c=None):
-        # Buttons
-        self._buttons = GamePadShift(digitalio.DigitalInOut(board.BUTTON_CLOCK),
-                                     digitalio.DigitalInOut(board.BUTTON_OUT),
-                                     digitalio.DigitalInOut(board.BUTTON_LATCH))
-        self.button_values = self._buttons.get_pressed()
-        self.lights = lights
-        
-    def scan(self):
-        self.button_values = self._buttons.get_pressed()        
-
-    @property
-    def left(self):
-        return self.button_values & self.BUTTON_LEFT
-        
-    @property
-    def up(self):
-        return self.button_values & self.BUTTON_UP
-        
-    @property
-    def down(self):
-        return self.button_values & self.BUTTON_DOWN
-        
-    @property
-    def right(self):
-        return self.button_values & self.BUTTON_RIGHT
-        
-    @property
-    def select(self):
-        return self.button_values & self.BUTTON_SELECT
-        
-    @property
-    def start(self):
-        return self.button_values & self.BUTTON_START
-        
-    @property
-    def a(self):
-        return self.button_values & self.BUTTON_A
-        
-    @property
-    def b(self):
-        return self.button_values & self.BUTTON_B
+    def __init__(self, start_ns):
+        self.start_ns = start_ns
+        self.steps = []
+        self.reported = False
+        
+    def mark(self, step):
+        if not self.reported:
+            self.steps.append((step, 
+                    (time.monotonic_ns() - self.start_ns) // 1000000))
+        
+    def report(self):
+        """ Print the steps, the first time it is called. """
+        if self.reported:
+            return
+        self.reported = True
+        line = 'startup ms:'
+        last = 0
+        for step, ms in self.steps:
+            line += ' %s %d,' % (step, ms - last)
+            last = ms
+        line = line[:-1] + '; total %d ms' % last
+        if hasattr(gc, 'mem_free'):
+            line += ', %dk free' % (gc.mem_free() // 1024)
+        print(line)
+        
+class ChannelRegistry(object):
+    """Make each channel the first time an input shows it"""
     
-    def set_light_color(self, color_attr):
-        if self.lights is not None:
-            lights.pixels[2] = getattr(self.lights, color_attr)
-            
-    def debounce_select(self):
-        pressed = False
-        if self.select:
-            pressed = True
-            lights.pixels[2] = lights.pale_green
-            while self.select:
-                self.set_light_color('pale_blue')
-                time.sleep(0.05)
-                self.scan()
-        else:
-            lights.pixels[2] = lights.black  
-        return pressed
-
-
-""" View """
-
-class DisplayView(object):
-    global x_left
-    global x_right
-    global y_bottom
-    global y_top
-    
-    def __init__(self, display):
-        # To synchronize the display update to the waveform update,
-        # turn off automatic display refresh.
-        # Explicit refresh functions update the display.
-        # The display refresh feature requires CircuitPython v5.0.0 or later.
-        
-        self.display = display
-        display.auto_refresh = False
-         
-        # Create a bitmap with colors
-        ncolors = 3
-        self.bitmap = displayio.Bitmap(self.display.width, self.display.height, ncolors)
-         
-        # Create a color palette
-        palette = displayio.Palette(ncolors)
-        palette[0] = 0x000000
-        palette[1] = 0x00ff00
-        palette[2] = 0xaaaaaa
-         
-        # Create a TileGrid using the Bitmap and Palette
-        tile_grid = displayio.TileGrid(self.bitmap, pixel_shader=palette)
-         
-        # Create a Group
-        group = displayio.Group()
-         
-        # Add the TileGrid to the Group
-        group.append(tile_grid)
-         
-        # Add the Group to the Display
-        self.display.show(group)
-         
-        # The display width is 160 and the height is 128
-        #   Positive y is down
-        #   Positive x is right
-        
-        # Define the bounds of the graph
-        x_left = 10
-        x_right = 140
-        y_bottom = 114
-        y_top = 14
-        
-        # Define the bounds of the annotation
-        y_annot_top = 5
-        y_annot_bottom = 123
-        
-        # Draw a frame around the graph
-        for px in range(x_left-1, x_right+1):
-            self.bitmap[px, y_top-1] = 2
-            self.bitmap[px, y_bottom+1] = 2
-        for py in range(y_top-1, y_bottom+1):
-            self.bitmap[x_left-1, py] = 2
-            self.bitmap[x_right+1, py] = 2
-        
-        # Draw labels to annotate the display
-        self.st_label = Label(terminalio.FONT, text='*', max_glyphs=30)
-        self.st_label.x = x_left
-        self.st_label.y = y_annot_top
-        self.st_label.color = palette[1]
-        group.append(self.st_label)
-        
-        self.dt_label = Label(terminalio.FONT, text='LIGHT', max_glyphs=30)
-        self.dt_label.x = x_right - self.dt_label.bounding_box[2]
-        self.dt_label.y = y_annot_top
-        self.dt_label.color = palette[1]
-        group.append(self.dt_label)
-        
-        self.status_label = Label(terminalio.FONT, text='EDGEMICSCOPE', max_glyphs=30)
-        self.status_label.x = x_left
-        self.status_label.y = y_annot_bottom
-        self.status_label.color = palette[1]
-        group.append(self.status_label)        
-
-    def draw_trace(self, color_idx, channel):
-        """Draw a trace on the screen"""
-    
-        """Globals:
-            Screen:
-              - x_left
-              - x_right
-              - y_bottom
-              - y_top
-              
-           Channel settings:   
-            Display:
-              - num_samples_per_px
-              - adc_midscale
-              - vertical_offset
-              - vertical_gain
-            Sampling:
-              - start_sample
-              - num_samples
-        """
-        x = x_left
-        horizontal_counter = channel.num_samples_per_px
-        sample_index = channel.start_sample
-        while (x < x_right) and (sample_index < channel.num_samples):
-            y = channel.vertical_offset - ((channel.samples[sample_index] - 
-                    channel.adc_midscale) >> channel.vertical_gain)
-            if y > y_bottom:
-                y = y_bottom
-            elif y < y_top:
-                y = y_top
-            self.bitmap[x, y] = color_idx
-            if horizontal_counter == 0:
-                x += 1
-                horizontal_counter = channel.num_samples_per_px
-            else:
-                horizontal_counter -= 1
-            sample_index += 1
-
-class LedView(object):
-    """Class to turn the NeoPixels on and off"""
-    
-    import neopixel
+    """Making a channel imports its module and its driver, and sets up
+    its hardware: the microphone's PDMIn, or the LIS3DH over I2C. Only 
+    the input shown first has to be ready for the first trace, so get() 
+    makes the others when Select first comes to them, and the memory the
+    ones never shown would take stays free. Once made, a channel is 
+    kept, with its settings.
+    """
     
-    PIXEL_SWEEP = const(0)
-    PIXEL_SELECT = const(2)
-    PIXEL_REFRESH = const(4)
+    # The module and class of each channel, by the names INPUTS uses
+    CLASSES = {'mic': ('edgemic.mic', 'micChannel'), 
+               'light': ('edgemic.light', 'lightChannel'), 
+               'generator': ('edgemic.generator', 'generatorChannel'), 
+               'accel': ('edgemic.accel', 'accelerometerChannel')}
     
-    def __init__(self, leds):
-        """ Neopixel initialization """
-        
-        neopixel_count = 5
-        self.pixels = neopixel.NeoPixel(leds, neopixel_count,
-                                            pixel_order=neopixel.GRB)
-        self.pale_green = [0,1,0]
-        self.pale_blue = [0,0,1]
-        self.black = [0,0,0]
-        self.sweep_led = 0
-        self.refresh_led = 4
+    def __init__(self, board, button, samples1, samples2):
+        self.board = board
+        self.button = button
+        self.samples1 = samples1
+        self.samples2 = samples2
+        self.channels = {}
+        
+    def get(self, name):
+        """ Return a channel, making it if need be. """
+        channel = self.channels.get(name)
+        if channel is None:
+            module, cls = ChannelRegistry.CLASSES[name]
+            cls = getattr(__import__(module, None, None, (cls,)), cls)
+            channel = cls(self.board, self.button, self.samples1)
+            channel.preset()
+            channel.set_buffers(self.samples1, self.samples2)
+            self.channels[name] = channel
+            startup.mark(name)
+        return channel
+        
+    def made(self, name):
+        """ Return a channel, or None if it has not been made. """
+        return self.channels.get(name)
+        
+    def add(self, name, channel):
+        """ Keep a channel made elsewhere. """
+        self.channels[name] = channel
         
-    def set_light_color(self, pixel_idx, color_attr):
-        """ Set one neopixel to a predefined color. """
-        if self.pixels is not None:
-            color = getattr(self, color_attr)
-            if color is not None:  
-                self.pixels[pixel_idx] = color
-                
 """ 
-TODO: Move the screen size to one place.
-Clean up the number of points on the display,
+TODO: Clean up the number of points on the display,
 Sweep time button step size is too small for slow sweep times,
   could increase by a minimum fraction of current sweep time. 
 """
 
 """ Controller """
 
-x_left = 10
-x_right = 140
-y_bottom = 114
-y_top = 14
+startup = Startup(boot_start_ns)
+startup.mark('load')
 
 screen = DisplayView(board.DISPLAY)
 lights = LedView(board.NEOPIXEL)
+startup.mark('display')
+
+# Take the next sweep into a second buffer while the last sweep is
+# still being drawn and refreshed. This costs another 16kB of RAM.
+DOUBLE_BUFFER = True
 
 # Allocate memory to store up to 0.5 seconds of audio
 samples1 = array.array('H', [0] * 8000)
+if DOUBLE_BUFFER:
+    samples2 = array.array('H', [0] * 8000)
+else:
+    samples2 = None
 
-button = Button(lights)
+button = Button()
     
-mic_channel = micChannel(board, button, samples1)
-mic_channel.preset()
-
-light_channel = lightChannel(board, button, samples1)
-light_channel.preset()
-
-sawtooth_channel = sawtoothChannel(board, button, samples1)
-sawtooth_channel.preset()
-
-accelerometer_channel = accelerometerChannel(board, button, samples1)
-accelerometer_channel.preset()
+registry = ChannelRegistry(board, button, samples1, samples2)
+    
+# The second trace of a multi-trace input has buffers of its own, made 
+# the first time one is selected. They are smaller than the first trace's,
+# which limits the second channel's sweep to this many samples.
+SECOND_TRACE_SAMPLES = const(2000)
+samples3 = None
+samples4 = None
 
 screen.display.refresh(minimum_frames_per_second=0)
 
-channel = light_channel
-vertical_input = 1
+telemetry = Telemetry()
+
+heap = Heap()
+
+# Made when streaming is first turned on
+stream = None
+
+def set_streaming(on):
+    """ Turn streaming sweeps to a PC on or off. """
+    global stream
+    if stream is None:
+        if not on:
+            return
+        from edgemic.stream import SweepStream
+        stream = SweepStream(usb_cdc.data if usb_cdc is not None else None)
+    stream.enabled = on
+
+def streaming():
+    return stream is not None and stream.enabled
+
+# In roll mode, take samples for this long each frame.
+# This bounds the time from a change in the signal to the screen.
+ROLL_BUDGET_MS = 40
+
+def second_trace_buffers():
+    """ Return the buffers for the second trace, making them if need be. """
+    global samples3, samples4
+    if samples3 is None:
+        samples3 = array.array('H', [0] * SECOND_TRACE_SAMPLES)
+        if DOUBLE_BUFFER:
+            samples4 = array.array('H', [0] * SECOND_TRACE_SAMPLES)
+    return samples3, samples4
+
+def take_interleaved(mic, accel):
+    """ Take sweeps of the microphone and the accelerometer side by side.
+    
+    The microphone records a step of its sweep at a time, and in between 
+    the accelerometer FIFO is emptied into its sweep, so the two sweeps
+    start together and stay within a step of each other. Whichever has
+    the longer sweep carries on alone at the end.
+    """
+    if accel.fifo_device is None:
+        mic.take_sweep()
+        accel.take_sweep()
+        return
+    start_sweeps((mic, accel))
+    while not step_sweeps((mic, accel), 0, ROLL_BUDGET_MS):
+        pass
 
-while(True):
+def take_sweeps(traces):
+    """ Take the next sweep or roll of every channel on the screen. """
+    if (len(traces) == 2 and traces[0] is registry.made('mic') and
+            traces[1] is registry.made('accel') and
+            not traces[0].trigger_held and not traces[0].spectrum_mode
+            and not traces[1].roll_mode and not traces[0].inspecting 
+            and not traces[1].inspecting):
+        take_interleaved(traces[0], traces[1])
+        return
+    # Rolling channels share the time a single one would have.
+    budget_ms = ROLL_BUDGET_MS // len(traces)
+    for channel in traces:
+        if channel.roll_mode:
+            channel.take_roll(budget_ms)
+        elif not (channel.trigger_held or channel.inspecting):
+            channel.take_sweep()
+
+def clear_sweep(channel):
+    """ Forget what a channel showed before it was selected, or before 
+    its roll mode changed. Return True if it needs a sweep before it is
+    drawn. """
+    channel.set_inspect(False)
+    if channel.accumulator is not None:
+        channel.accumulator.clear()
+    if channel.roll_mode:
+        channel.roll.clear()
+        return False
+    return True
+
+def first_sweep(channel):
+    """ Get a channel ready to draw in the first frame after selecting it. """
+    if clear_sweep(channel):
+        channel.take_sweep()
+        channel.trigger()
+        channel.swap_buffers()
+
+# The inputs Select steps through, by channel name: the microphone's 
+# spectrum, and the microphone and accelerometer together, come after 
+# the channels.
+INPUTS = ('mic', 'light', 'generator', 'accel', 'mic', ('mic', 'accel'))
+SPECTRUM_INPUT = const(4)
+MULTI_INPUT = const(5)
+
+# A capture file copied to the badge plays back as one more input.
+REPLAY_PATH = '/replay.emcap'
+
+def add_replay(path, speed=1):
+    """ Add an input that plays back a capture file. Return its index. 
+    The file is checked now, so the channel is made now too. """
+    global INPUTS
+    from edgemic.replay import replayChannel
+    channel = replayChannel(board, button, samples1, path, speed)
+    channel.set_buffers(samples1, samples2)
+    channel.preset()
+    registry.add('replay', channel)
+    INPUTS = INPUTS + ('replay',)
+    return len(INPUTS) - 1
     
-    # Check the buttons for the channel
-    channel.buttons()
-    if channel.button.debounce_select():
-        vertical_input += 1
-        if vertical_input > 3:
-            vertical_input = 0  
-        
-        if vertical_input == 0:
-            channel = mic_channel
-            screen.dt_label.text = 'MIC'
-            screen.dt_label.x = x_right - screen.dt_label.bounding_box[2]
-            screen.st_label.text = 'ST: *ms'
-        elif vertical_input == 1:
-            channel = light_channel
-            screen.dt_label.text = 'LIGHT'
-            screen.dt_label.x = x_right - screen.dt_label.bounding_box[2]
-        elif vertical_input == 2:
-            channel = sawtooth_channel
-            screen.dt_label.text = 'SAWTOOTH'
-            screen.dt_label.x = x_right - screen.dt_label.bounding_box[2]
+try:
+    # Only import the replay channel if there is a file to play.
+    os.stat(REPLAY_PATH)
+    add_replay(REPLAY_PATH)
+except (OSError, ValueError):
+    pass
+startup.mark('setup')
+
+def select_input(input_idx, stepped=False):
+    """ Return the channels for an input, ready to draw.
+    
+    The channels of a multi-trace input sweep, not roll, so that they
+    can be taken together. The first trace has the main buffers, the
+    second its own. With stepped, the first sweeps are left for the 
+    caller to take in steps.
+    """
+    names = INPUTS[input_idx]
+    if not isinstance(names, tuple):
+        names = (names,)
+    traces = tuple(registry.get(name) for name in names)
+    # A microphone not made yet is not in spectrum mode either.
+    mic = registry.made('mic')
+    if mic is not None:
+        mic.set_spectrum_mode(input_idx == SPECTRUM_INPUT)
+    for idx in range(len(traces)):
+        channel = traces[idx]
+        if idx == 0:
+            channel.set_buffers(samples1, samples2)
         else:
-            channel = accelerometer_channel
-            screen.dt_label.text = 'ACCEL'
-            screen.dt_label.x = x_right - screen.dt_label.bounding_box[2]
-        
-    # Turn the sweep LED on while taking samples
-    lights.set_light_color(LedView.PIXEL_SWEEP, 'pale_green')
-    start_time = time.monotonic_ns()
+            channel.set_buffers(*second_trace_buffers())
+        if len(traces) > 1 and channel.roll_mode:
+            channel.set_roll_mode(False)
+        channel.calc_num_samples()
+        if channel is mic:
+            screen.show_sweep_time(-1)
+        # The buffers hold the last channel's sweep. Take a new one.
+        if stepped:
+            clear_sweep(channel)
+        else:
+            first_sweep(channel)
+    return traces
+
+class Controller(object):
+    """The state of the main loop, and the parts of a frame"""
     
-    channel.take_sweep()
+    """run() calls the parts one after another, every frame. run_tasks() 
+    shares them out between cooperative tasks. The traces on the screen 
+    are those of input_idx, and the buttons act on the one in focus, 
+    channel. The flags say what the LEDs show. generation counts changes 
+    of input or roll mode, so a sweep taken across one is dropped. With 
+    stepped, as the tasks run it, the first sweep of a channel selected 
+    is not taken at once: the channel waits in unswept for the render 
+    task to take it in steps.
+    """
     
-    sweep_time = (time.monotonic_ns() - start_time)/1000000.0
-    screen.st_label.text = 'ST: ' + str(round(sweep_time)) + 'ms'
-    lights.set_light_color(LedView.PIXEL_SWEEP, 'black')
-
-    # During the display update, light the refresh LED.
-    lights.set_light_color(LedView.PIXEL_REFRESH, 'pale_blue')
+    def __init__(self, input_idx, stepped=False):
+        self.input_idx = input_idx
+        self.stepped = stepped
+        self.unswept = ()
+        self.select(input_idx)
+        self.focus = 0
+        self.channel = self.traces[0]
+        self.generation = 0
+        self.frame = 0
+        self.profiling = False
+        # What the status line shows this frame
+        self.show_measurements = False
+        self.show_timebase = True
+        # The traces of the last sweeps taken, a bit each for those to 
+        # show
+        self.swept = self.traces
+        self.triggered = 0
+        # For the LEDs
+        self.select_held = False
+        self.sweeping = False
+        self.refreshing = False
+        # For the tasks: whether to carry on, and asyncio Events for a 
+        # sweep buffer free to take the next sweep in, and a sweep ready
+        self.running = True
+        self.sweep_free = None
+        self.sweep_ready = None
+        
+    def select(self, input_idx):
+        """ Put the channels of an input on the screen. """
+        self.traces = select_input(input_idx, self.stepped)
+        if self.stepped:
+            self.unswept = tuple(channel for channel in self.traces 
+                                 if not channel.roll_mode)
+        
+    def start_frame(self):
+        """ Count the frame and decide what the status line shows. """
+        self.frame += 1
+        heap.start_frame()
+        self.profiling = telemetry.timing()
+        if self.profiling:
+            telemetry.start()
+        # The status line shows the timebase, unless it shows telemetry
+        # or measurements.
+        status_free = (telemetry.mode != Telemetry.MODE_SCREEN and 
+                       telemetry.mode != Telemetry.MODE_MEMORY)
+        self.show_measurements = (
+                screen.measure_page != DisplayView.MEASURE_OFF and 
+                status_free and 
+                self.frame % DisplayView.MEASURE_FRAMES == 0)
+        self.show_timebase = (status_free and 
+                              screen.measure_page == DisplayView.MEASURE_OFF)
+        
+    def handle_input(self):
+        """ Act on the buttons pressed since the last call. This never 
+        waits, and holding a button does not stop the scope. """
+        button.poll()
+        channel = self.channel
+        roll_mode = channel.roll_mode
+        event = button.get_event()
+        while event is not None:
+            kind, mask, event_time = event
+            if mask == Button.BUTTON_SELECT:
+                if kind == Button.EVENT_PRESS:
+                    self.select_held = True
+                    self.focus += 1
+                    if self.focus == len(self.traces):
+                        self.focus = 0
+                        self.input_idx += 1
+                        if self.input_idx == len(INPUTS):
+                            self.input_idx = 0
+                        self.select(self.input_idx)
+                        self.generation += 1
+                    channel = self.traces[self.focus]
+                    self.channel = channel
+                    roll_mode = channel.roll_mode
+                elif kind == Button.EVENT_RELEASE:
+                    self.select_held = False
+            elif (kind == Button.EVENT_CHORD and 
+                    mask == Button.BUTTON_UP | Button.BUTTON_DOWN):
+                # Up and down together step through the telemetry modes.
+                telemetry.next_mode()
+                heap.reset()
+                screen.timebase_shown = False
+            elif (kind == Button.EVENT_CHORD and 
+                    mask == Button.BUTTON_DOWN | Button.BUTTON_RIGHT):
+                # Down and right together step through the measurements.
+                screen.next_measure_page()
+            elif (kind == Button.EVENT_CHORD and 
+                    mask == Button.BUTTON_LEFT | Button.BUTTON_RIGHT):
+                # Left and right together turn streaming on and off.
+                set_streaming(not streaming())
+            else:
+                channel.button_event(kind, mask)
+            event = button.get_event()
+        if channel.roll_mode != roll_mode:
+            if not self.stepped:
+                first_sweep(channel)
+            elif clear_sweep(channel) and channel not in self.unswept:
+                self.unswept += (channel,)
+            self.generation += 1
+        # Inspecting, the timebase follows the zoom.
+        if channel.inspecting:
+            screen.show_sweep_time(DisplayView.SWEEP_STOPPED)
+            if self.show_timebase:
+                screen.show_timebase(channel)
+            
+        # The generator's name changes with its settings.
+        screen.show_name(channel, DisplayView.TRACE_COLORS[self.focus])
+        
+    def update_lights(self):
+        """ Show on the LEDs: Select held, a sweep being taken, a 
+        refresh going on, and streaming. Only changes are written. """
+        lights.set_light_color(LedView.PIXEL_SELECT, LedView.PALE_GREEN 
+                               if self.select_held else LedView.BLACK)
+        lights.set_light_color(LedView.PIXEL_SWEEP, LedView.PALE_GREEN 
+                               if self.sweeping else LedView.BLACK)
+        lights.set_light_color(LedView.PIXEL_REFRESH, LedView.PALE_BLUE 
+                               if self.refreshing else LedView.BLACK)
+        lights.set_light_color(LedView.PIXEL_STREAM, LedView.PALE_BLUE 
+                               if streaming() else LedView.BLACK)
+        
+    def show_sweep(self, sweep_ms):
+        """ Show the sweep time and timebase of the channel in focus, 
+        after a sweep that took sweep_ms. """
+        channel = self.channel
+        if channel.roll_mode:
+            screen.show_sweep_time(None)
+            if self.show_timebase:
+                screen.show_timebase(None)
+        elif not (channel.trigger_held or channel.inspecting):
+            screen.show_sweep_time(sweep_ms)
+            if self.show_timebase:
+                screen.show_timebase(channel)
+                
+    def trigger(self, traces, stepped=False):
+        """ Find where to start drawing each sweep, a bit per trace. An 
+        untriggered sweep is only shown in auto mode. A sweep taken in 
+        steps that is shorter than its channel's sweeps are now, because
+        the sweep time changed while it was taken, is not shown. """
+        triggered = 0
+        for idx in range(len(traces)):
+            channel = traces[idx]
+            if channel.roll_mode or channel.inspecting:
+                continue
+            if stepped and channel.step_count < channel.num_samples:
+                continue
+            if channel.trigger():
+                triggered |= 1 << idx
+        self.swept = traces
+        self.triggered = triggered
+        
+    def finish_frame(self):
+        """ Swap in the sweeps triggered, and measure the sweeps that are 
+        shown or sent. """
+        traces = self.swept
+        triggered = self.triggered
+        sending = streaming()
+        for idx in range(len(traces)):
+            if triggered & (1 << idx):
+                traces[idx].swap_buffers()
+                if sending or (self.show_measurements and 
+                               traces[idx] is self.channel):
+                    traces[idx].measure()
+                if sending:
+                    stream.send(traces[idx])
+        self.triggered = 0
+        if self.show_measurements:
+            screen.show_measurements(self.channel)
+            
+        heap.end_frame()
+        if self.profiling:
+            telemetry.mark(Telemetry.SPAN_WAIT)
+            telemetry.end_frame()
+            telemetry.report(screen.status_label)
+        elif telemetry.mode == Telemetry.MODE_MEMORY:
+            heap.report(screen.status_label, self.frame)
+        # The first frame put the first trace on the screen.
+        if not startup.reported:
+            startup.mark('first trace')
+            startup.report()
+
+def run(frames=None, input_idx=1):
+    """ Run the scope. Runs forever unless a number of frames is given. 
+    
+    It starts on input_idx, the light sensor unless told otherwise.
+    On an input with several traces, the buttons act on the channel in
+    focus. Select moves the focus to the next trace, and from the last 
+    one to the next input.
+    """
     
-    # Draw the waveform to pixels on the display.
-    screen.draw_trace(1, channel)
+    # Each frame draws the sweeps taken during the frame before.
+    ctl = Controller(input_idx)
+    # Start with none of the garbage from setting up.
+    heap.collect()
     
-    # Refresh the display. Repeat the call until it completes.
-    while not screen.display.refresh(minimum_frames_per_second=0):
-        pass
+    while frames is None or ctl.frame < frames:
+        ctl.start_frame()
+        ctl.handle_input()
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_INPUT)
+            
+        # During the display update, light the refresh LED.
+        ctl.refreshing = True
+        ctl.update_lights()
+        
+        # Draw the last sweeps to pixels on the display.
+        # This also erases the pixels of the last waveforms that changed.
+        traces = ctl.traces
+        screen.draw_traces(traces)
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_DRAW)
+        
+        # Start the refresh. It returns False when it is too soon after the
+        # last one. Use that time to take the next sweep instead of spinning.
+        refreshed = screen.refresh_step()
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_REFRESH)
+        
+        # Turn the sweep LED on while taking samples.
+        # The status line follows the channel in focus.
+        if sweeps_due(traces):
+            ctl.sweeping = True
+            ctl.update_lights()
+            start_time = ticks_ms()
+            
+            take_sweeps(traces)
+            
+            ctl.show_sweep(ticks_diff(ticks_ms(), start_time))
+            ctl.sweeping = False
+            ctl.update_lights()
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_SWEEP)
+            
+        ctl.trigger(traces)
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_TRIGGER)
+        
+        # The refresh is usually still going. Collect garbage now, if it
+        # is due, rather than wherever the heap happens to fill up.
+        heap.collect_if_due()
+        
+        # Finish the refresh. Repeat the call until it completes.
+        while not refreshed:
+            refreshed = screen.refresh_step()
+        ctl.refreshing = False
+        ctl.update_lights()
         
-    # Erase the waveform by redrawing the pixels with black.
-    screen.draw_trace(0, channel)
-    lights.set_light_color(LedView.PIXEL_REFRESH, 'black')
+        ctl.finish_frame()
+
+async def run_tasks(frames=None, input_idx=1):
+    """ Run the scope as cooperative tasks, like run(), for boards with 
+    asyncio. Runs forever unless a number of frames is given.
+    
+    Input, the LEDs, taking sweeps and drawing them are separate tasks.
+    Sweeps are taken in short steps, the first sweeps of an input just
+    selected too, so a long sweep does not hold up the buttons or the 
+    LEDs, and waiting for the refresh gives the other tasks the time 
+    instead of spinning.
+    """
+    from edgemic import tasks
+    ctl = Controller(input_idx, stepped=True)
+    heap.collect()
+    await tasks.run(ctl, frames, screen, telemetry, heap, ROLL_BUDGET_MS)
+
+# CircuitPython runs code.py as __main__. The host simulation imports it
+# under another name and calls run() or run_tasks() itself.
+if __name__ == '__main__':
+    if asyncio is not None:
+        asyncio.run(run_tasks())
+    else:
+        run()
@@ -0,0 +1,87 @@
+"""
+Host-side simulation of the EDGE badge hardware.
+
+install() puts pure-Python stand-ins for the CircuitPython modules that
+code.py and lib/edgemic import into sys.modules, and lib on sys.path as
+the badge has it, so the scope can be run and profiled with CPython:
+
+    import hostsim
+    scope = hostsim.load_scope(hostsim.Backend(mic=hostsim.sources.sine(1000)))
+    scope.run(frames=100)
+    print(scope.screen.bitmap.writes)
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+from hostsim import backend
+from hostsim import sources
+from hostsim.backend import Backend, ButtonScript
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCOPE_PATH = os.path.join(ROOT, 'code.py')
+LIB_PATH = os.path.join(ROOT, 'lib')
+
+_MODULES = ('board', 'displayio', 'audiobusio', 'analogio', 'digitalio',
+            'gamepadshift', 'neopixel', 'adafruit_lis3dh', 'terminalio',
+            'micropython', 'usb_cdc')
+
+
+def install(new_backend=None):
+    """ Make the stand-in modules importable under their badge names. """
+    if new_backend is None:
+        new_backend = Backend()
+    backend.set_current(new_backend)
+    for name in _MODULES:
+        sys.modules[name] = importlib.import_module('hostsim.' + name)
+    if LIB_PATH not in sys.path:
+        sys.path.insert(0, LIB_PATH)
+    # The scope's modules are imported again, against this backend's
+    # optional modules, as a badge imports them after a reset.
+    for name in list(sys.modules):
+        if name == 'edgemic' or name.startswith('edgemic.'):
+            del sys.modules[name]
+    label = importlib.import_module('hostsim.label')
+    display_text = types.ModuleType('adafruit_display_text')
+    display_text.label = label
+    sys.modules['adafruit_display_text'] = display_text
+    sys.modules['adafruit_display_text.label'] = label
+    if new_backend.analogbufio:
+        sys.modules['analogbufio'] = importlib.import_module(
+            'hostsim.analogbufio')
+    else:
+        # None in sys.modules makes the import raise ImportError.
+        sys.modules['analogbufio'] = None
+    if new_backend.bitmaptools:
+        sys.modules['bitmaptools'] = importlib.import_module(
+            'hostsim.bitmaptools')
+    else:
+        sys.modules['bitmaptools'] = None
+    if new_backend.ulab:
+        sys.modules['ulab'] = importlib.import_module('hostsim.ulab')
+    else:
+        sys.modules['ulab'] = None
+
+    displayio = sys.modules['displayio']
+    sys.modules['board']._attach(new_backend, displayio.Display())
+    sys.modules['usb_cdc']._attach(new_backend)
+    return new_backend
+
+
+def load_scope(new_backend=None, path=SCOPE_PATH):
+    """ Install a backend and import code.py against it.
+
+    The module is loaded under the name edgemicscope, which builds the
+    screen, LEDs and buttons but does not start the main loop. Channels
+    are made by scope.registry.get(name), or by selecting their input.
+    Call run(frames=N) on the returned module to run N frames. The 
+    classes are in the edgemic package, which is importable once this 
+    returns.
+    """
+    install(new_backend)
+    spec = importlib.util.spec_from_file_location('edgemicscope', path)
+    scope = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(scope)
+    return scope
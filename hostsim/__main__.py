@@ -0,0 +1,150 @@
+"""
+Run the scope on the host for a number of frames.
+
+    python -m hostsim --frames 200 --channel mic --wav tone.wav
+    python -m cProfile -s cumtime -m hostsim --frames 50
+    python -m hostsim --frames 200 --stream sweeps.bin
+    python -m hostsim --frames 200 --replay run.emcap --replay-speed 0
+    python -m hostsim --frames 200 --tasks --realtime
+    python -m hostsim --frames 20 --channel mic --inspect
+"""
+
+import argparse
+import asyncio
+import time
+
+import hostsim
+
+# The scope's INPUTS, in the order Select steps through them
+CHANNEL_INPUTS = {'mic': 0, 'light': 1, 'generator': 2, 'accel': 3, 'fft': 4,
+                  'mic+accel': 5}
+
+
+def input_channels(scope, input_idx):
+    """ The channels of one of the scope's INPUTS, made if need be. """
+    names = scope.INPUTS[input_idx]
+    if not isinstance(names, tuple):
+        names = (names,)
+    return [scope.registry.get(name) for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--channel', choices=sorted(CHANNEL_INPUTS),
+                        default='light')
+    parser.add_argument('--wav', help='16-bit WAV file for the microphone')
+    parser.add_argument('--realtime', action='store_true',
+                        help='block for hardware time like the badge does')
+    parser.add_argument('--analogbufio', action='store_true',
+                        help='give the scope analogbufio, as on an RP2040 '
+                             'board: the ADC fills the light channel\'s '
+                             'sweeps, instead of the scope pacing its reads '
+                             'as on the badge')
+    parser.add_argument('--ulab', action='store_true',
+                        help='give the scope NumPy as ulab, for its array '
+                             'math paths')
+    parser.add_argument('--no-bitmaptools', action='store_true',
+                        help='no bitmaptools, as before CircuitPython 7: '
+                             'every pixel is written from Python')
+    parser.add_argument('--stream', metavar='FILE',
+                        help='turn streaming on and write what the badge '
+                             'would send on the USB data port to FILE')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='play back a capture file as an extra input '
+                             'and start on it')
+    parser.add_argument('--replay-speed', type=int, default=1,
+                        help='times faster than it was sampled, 0 for no '
+                             'waiting')
+    parser.add_argument('--acquire', choices=('avg', 'ema', 'peak'),
+                        help='average the sweeps, or hold their peaks')
+    parser.add_argument('--decimate', choices=('box', 'cic', 'fir'),
+                        help='filter each sweep to one sample per column')
+    parser.add_argument('--measure', choices=('levels', 'timing'),
+                        help='show measurements on the status line')
+    parser.add_argument('--telemetry', choices=('screen', 'serial', 'memory'),
+                        help='time the frame stages, shown on the status '
+                             'line or printed like on USB serial, or watch '
+                             'garbage collection')
+    parser.add_argument('--tasks', action='store_true',
+                        help='run the cooperative tasks under asyncio, as '
+                             'on a badge with the asyncio library')
+    parser.add_argument('--inspect', action='store_true',
+                        help='press the buttons to stop and inspect the '
+                             'sweep after a few frames, zoom in and pan')
+    args = parser.parse_args()
+
+    mic = hostsim.sources.WavSource(args.wav) if args.wav else None
+    usb_data = open(args.stream, 'wb') if args.stream else None
+    backend = hostsim.Backend(mic=mic, realtime=args.realtime,
+                              analogbufio=args.analogbufio, ulab=args.ulab,
+                              usb_data=usb_data,
+                              bitmaptools=not args.no_bitmaptools)
+    scope = hostsim.load_scope(backend)
+    from edgemic.accumulator import Accumulator
+    from edgemic.decimator import Decimator
+    scope.set_streaming(usb_data is not None)
+    if args.inspect:
+        button = scope.Button
+        backend.buttons.steps.extend(
+                [0, 0, 0, button.BUTTON_UP | button.BUTTON_RIGHT, 0,
+                 button.BUTTON_LEFT, 0, button.BUTTON_A, 0])
+    input_idx = CHANNEL_INPUTS[args.channel]
+    if args.replay:
+        input_idx = scope.add_replay(args.replay, args.replay_speed)
+    if args.acquire:
+        mode = Accumulator.MODE_NAMES.index(args.acquire.upper())
+        for channel in input_channels(scope, input_idx):
+            channel.set_acquire_mode(mode)
+    if args.decimate:
+        mode = Decimator.FILTER_NAMES.index(args.decimate.upper())
+        for channel in input_channels(scope, input_idx):
+            channel.set_decimation(mode)
+    if args.measure == 'levels':
+        scope.screen.measure_page = scope.DisplayView.MEASURE_LEVELS
+    elif args.measure == 'timing':
+        scope.screen.measure_page = scope.DisplayView.MEASURE_TIMING
+    if args.telemetry == 'screen':
+        scope.telemetry.mode = scope.Telemetry.MODE_SCREEN
+    elif args.telemetry == 'serial':
+        scope.telemetry.mode = scope.Telemetry.MODE_SERIAL
+    elif args.telemetry == 'memory':
+        scope.telemetry.mode = scope.Telemetry.MODE_MEMORY
+
+    start = time.perf_counter()
+    if args.tasks:
+        asyncio.run(scope.run_tasks(frames=args.frames, input_idx=input_idx))
+    else:
+        scope.run(frames=args.frames, input_idx=input_idx)
+    elapsed = time.perf_counter() - start
+    if usb_data is not None:
+        usb_data.close()
+
+    display = scope.screen.display
+    print('frames:        %d' % args.frames)
+    print('elapsed:       %.3f s (%.1f frames/s)' %
+          (elapsed, args.frames / elapsed))
+    print('refreshes:     %d' % display.refresh_count)
+    print('pixels pushed: %d (%.0f per refresh)' %
+          (display.pixels_pushed,
+           display.pixels_pushed / max(display.refresh_count, 1)))
+    print('bitmap writes: %d (%.0f per frame)' %
+          (scope.screen.bitmap.writes,
+           scope.screen.bitmap.writes / args.frames))
+    if args.measure:
+        print('status line:   %s' % scope.screen.status_label.text)
+    if usb_data is not None:
+        print('sweeps sent:   %d (%d bytes)' %
+              (scope.stream.seq, scope.usb_cdc.data.bytes_written))
+    if args.inspect:
+        channel = input_channels(scope, input_idx)[0]
+        if channel.inspecting:
+            history = channel.history
+            print('inspecting:    %d samples per column from sample %d '
+                  'of %d' % (history.per, history.pos, history.count))
+        else:
+            print('inspecting:    no')
+
+
+if __name__ == '__main__':
+    main()
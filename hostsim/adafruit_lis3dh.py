@@ -0,0 +1,180 @@
+"""
+Stand-in for the adafruit_lis3dh library. Readings come from the
+backend AccelScript.
+
+Besides the acceleration property, the register interface the scope
+uses for FIFO stream mode is modelled: CTRL_REG5, FIFO_CTRL_REG,
+FIFO_SRC_REG and auto-incrementing burst reads from OUT_X_L through the
+driver's I2C device.
+"""
+
+import time
+from collections import deque, namedtuple
+
+from hostsim import backend as _backend
+
+RANGE_16_G = 0b11
+RANGE_8_G = 0b10
+RANGE_4_G = 0b01
+RANGE_2_G = 0b00
+DATARATE_1344_HZ = 0b1001
+DATARATE_400_HZ = 0b0111
+DATARATE_200_HZ = 0b0110
+DATARATE_100_HZ = 0b0101
+DATARATE_50_HZ = 0b0100
+DATARATE_25_HZ = 0b0011
+DATARATE_10_HZ = 0b0010
+DATARATE_1_HZ = 0b0001
+DATARATE_POWERDOWN = 0
+DATARATE_LOWPOWER_1K6HZ = 0b1000
+DATARATE_LOWPOWER_5KHZ = 0b1001
+
+STANDARD_GRAVITY = 9.806
+
+_DATA_RATE_HZ = {
+    DATARATE_1344_HZ: 1344, DATARATE_400_HZ: 400, DATARATE_200_HZ: 200,
+    DATARATE_100_HZ: 100, DATARATE_50_HZ: 50, DATARATE_25_HZ: 25,
+    DATARATE_10_HZ: 10, DATARATE_1_HZ: 1, DATARATE_LOWPOWER_1K6HZ: 1620}
+
+# Counts per g of the left-justified raw readings, as in the driver
+_COUNTS_PER_G = {RANGE_2_G: 16380, RANGE_4_G: 8190, RANGE_8_G: 4096,
+                 RANGE_16_G: 1365}
+
+_REG_CTRL5 = 0x24
+_REG_OUT_X_L = 0x28
+_REG_FIFO_CTRL = 0x2E
+_REG_FIFO_SRC = 0x2F
+_FIFO_SIZE = 32
+
+AccelerationTuple = namedtuple('acceleration', ('x', 'y', 'z'))
+
+
+class _I2CDevice(object):
+    """ The driver's adafruit_bus_device I2CDevice. """
+
+    def __init__(self, lis3dh):
+        self._lis3dh = lis3dh
+        self.transactions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_then_readinto(self, out_buffer, in_buffer, out_start=0,
+                            out_end=None, in_start=0, in_end=None):
+        if in_end is None:
+            in_end = len(in_buffer)
+        self.transactions += 1
+        data = self._lis3dh._read(out_buffer[out_start], in_end - in_start)
+        in_buffer[in_start:in_end] = data
+
+
+class LIS3DH(object):
+    def __init__(self, int1=None, int2=None):
+        self._backend = _backend.current()
+        self._script = self._backend.accel
+        self._registers = {_REG_CTRL5: 0, _REG_FIFO_CTRL: 0}
+        self._fifo = deque()
+        self._overrun = False
+        self._fifo_time = None
+        self.range = RANGE_2_G
+        self.data_rate = DATARATE_400_HZ
+        self.reads = 0
+
+    @property
+    def data_rate(self):
+        return self._data_rate
+
+    @data_rate.setter
+    def data_rate(self, rate):
+        self._data_rate = rate
+        self._script.data_rate = _DATA_RATE_HZ.get(rate, 400)
+
+    @property
+    def acceleration(self):
+        """ One reading, costing one I2C transaction on the badge. """
+        self.reads += 1
+        self._backend.sleep(1.0 / self._script.data_rate)
+        return AccelerationTuple(*self._script.read())
+
+    def _read_register_byte(self, register):
+        if register == _REG_FIFO_SRC:
+            return self._fifo_src()
+        return self._registers.get(register, 0)
+
+    def _write_register_byte(self, register, value):
+        self._registers[register] = value
+        if register == _REG_FIFO_CTRL and value >> 6 == 0:
+            # Bypass mode empties the FIFO.
+            self._fifo.clear()
+            self._overrun = False
+            self._fifo_time = None
+
+    def _streaming(self):
+        return (self._registers[_REG_CTRL5] & 0x40 and
+                self._registers[_REG_FIFO_CTRL] >> 6 == 0b10)
+
+    def _fill_fifo(self):
+        """ Add the readings taken since the FIFO was last looked at.
+
+        In real time they arrive at the data rate. Otherwise the FIFO is
+        topped up to full every time, without an overrun.
+        """
+        if not self._streaming():
+            return
+        rate = self._script.data_rate
+        if self._backend.realtime:
+            now = time.monotonic()
+            if self._fifo_time is None:
+                self._fifo_time = now
+            count = int((now - self._fifo_time) * rate)
+            self._fifo_time += count / rate
+        else:
+            count = _FIFO_SIZE - len(self._fifo)
+        for _ in range(count):
+            if len(self._fifo) == _FIFO_SIZE:
+                self._fifo.popleft()
+                self._overrun = True
+            self._fifo.append(self._raw_reading())
+
+    def _raw_reading(self):
+        scale = _COUNTS_PER_G[self.range] / STANDARD_GRAVITY
+        raw = bytearray()
+        for v in self._script.read():
+            counts = max(-32768, min(32767, int(round(v * scale))))
+            raw += (counts & 0xffff).to_bytes(2, 'little')
+        return bytes(raw)
+
+    def _fifo_src(self):
+        self._fill_fifo()
+        count = len(self._fifo)
+        src = count & 0x1f
+        if count == 0:
+            src |= 0x20
+        if self._overrun:
+            src |= 0x40
+        return src
+
+    def _read(self, register, length):
+        """ A burst read starting at register. """
+        if register & 0x7f != _REG_OUT_X_L or not register & 0x80:
+            raise NotImplementedError('only burst reads of OUT_X_L')
+        self._overrun = False
+        data = bytearray()
+        while len(data) < length:
+            if self._fifo:
+                data += self._fifo.popleft()
+            else:
+                data += self._raw_reading()
+        return data[:length]
+
+
+class LIS3DH_I2C(LIS3DH):
+    def __init__(self, i2c, address=0x18, int1=None, int2=None):
+        if i2c is None or address != i2c.backend.accel_address:
+            raise ValueError('No I2C device at address: %x' % address)
+        self.address = address
+        self._i2c = _I2CDevice(self)
+        super().__init__(int1=int1, int2=int2)
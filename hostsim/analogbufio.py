@@ -0,0 +1,28 @@
+"""Stand-in for analogbufio. BufferedIn reads the backend light source."""
+
+from hostsim import backend as _backend
+
+
+class BufferedIn(object):
+    def __init__(self, pin, *, sample_rate):
+        self._backend = _backend.current()
+        self._source = self._backend.light
+        self.pin = pin
+        self.sample_rate = sample_rate
+        self._source.bind(sample_rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.deinit()
+
+    def readinto(self, buffer):
+        """ Fill buffer and block for the time the ADC takes to do it. """
+        count = len(buffer)
+        self._source.read(buffer, count)
+        self._backend.sleep(count / self.sample_rate)
+        return count
+
+    def deinit(self):
+        pass
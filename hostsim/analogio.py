@@ -0,0 +1,25 @@
+"""Stand-in for analogio. AnalogIn reads the backend light source."""
+
+import time
+
+from hostsim import backend as _backend
+
+
+class AnalogIn(object):
+    def __init__(self, pin):
+        self.pin = pin
+        self.reference_voltage = 3.3
+        self._backend = _backend.current()
+        self._source = self._backend.light
+
+    @property
+    def value(self):
+        # In real time a reading is the source at the time it is taken,
+        # however fast the scope reads. Otherwise each read is the next
+        # sample at the rate the source is bound to.
+        if self._backend.realtime:
+            return self._source.value_at(time.monotonic())
+        return self._source.value()
+
+    def deinit(self):
+        pass
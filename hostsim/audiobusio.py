@@ -0,0 +1,22 @@
+"""Stand-in for audiobusio. PDMIn plays back the backend mic source."""
+
+from hostsim import backend as _backend
+
+
+class PDMIn(object):
+    def __init__(self, clock_pin, data_pin, sample_rate=16000, bit_depth=8,
+                 mono=True, oversample=64, startup_delay=0.11):
+        self._backend = _backend.current()
+        self._source = self._backend.mic
+        self.sample_rate = sample_rate
+        self.bit_depth = bit_depth
+        self._source.bind(sample_rate)
+
+    def record(self, destination, destination_length):
+        """ Fill destination and block for the length of the recording. """
+        self._source.read(destination, destination_length)
+        self._backend.sleep(destination_length / self.sample_rate)
+        return destination_length
+
+    def deinit(self):
+        pass
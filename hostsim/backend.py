@@ -0,0 +1,111 @@
+"""
+The backend holds the signal sources and scripts that drive the
+simulated badge hardware. The stand-in modules look up the current
+backend when they are constructed, so a new backend can be installed
+before each run.
+"""
+
+import time
+
+from hostsim import sources
+
+
+class ButtonScript(object):
+    """ Scripted GamePadShift input.
+
+    steps is a list of button masks, or (mask, polls) pairs to hold a
+    mask for several polls. After the script runs out, no buttons are
+    pressed.
+    """
+
+    def __init__(self, steps=()):
+        self.steps = []
+        for step in steps:
+            if isinstance(step, tuple):
+                self.steps.extend([step[0]] * step[1])
+            else:
+                self.steps.append(step)
+        self.polls = 0
+
+    def poll(self):
+        mask = 0
+        if self.polls < len(self.steps):
+            mask = self.steps[self.polls]
+        self.polls += 1
+        return mask
+
+
+class Backend(object):
+    """ Signal sources and scripts for one simulated badge.
+
+    mic:     source played back by audiobusio.PDMIn
+    light:   source read by analogio.AnalogIn and analogbufio.BufferedIn
+    accel:   scripted acceleration for adafruit_lis3dh
+    buttons: ButtonScript read by gamepadshift.GamePadShift
+    usb_data: binary file that gets what is written to usb_cdc.data,
+              or None to leave the data port off
+
+    With realtime set, hardware calls take as long as they would on the
+    badge: the mic blocks for the length of the recording and display
+    refreshes are paced to target_frames_per_second. Otherwise every
+    call returns immediately so only the Python cost is measured.
+
+    The analogbufio module cannot be imported by default, as on the
+    badge, whose SAMD51 has no bulk ADC capture, and the light channel
+    paces its own reads. Pacing waits in real time whether or not
+    realtime is set. With analogbufio set, the ADC fills a sweep as an
+    RP2040 board's does; without realtime that takes no time at all.
+
+    The light source is bound to the light channel's 5000Hz by default,
+    so reads paced at that rate, and rolls, see the signal at its own
+    frequency.
+
+    With ulab set, code.py gets NumPy as ulab.numpy and takes its array
+    math paths. The default matches the badge, which has no ulab.
+
+    With bitmaptools cleared, the bitmaptools module cannot be imported,
+    as before CircuitPython 7, and code.py writes every pixel itself.
+    """
+
+    def __init__(self, mic=None, light=None, accel=None, buttons=None,
+                 realtime=False, light_rate=5000, accel_address=0x19,
+                 refresh_ms=0, analogbufio=False, ulab=False,
+                 usb_data=None, bitmaptools=True):
+        if mic is None:
+            mic = sources.sine(440, amplitude=6000)
+        if light is None:
+            light = sources.sine(100, amplitude=2000, midscale=30000)
+        if accel is None:
+            accel = sources.AccelScript()
+        if buttons is None:
+            buttons = ButtonScript()
+        self.mic = mic
+        self.light = light
+        self.accel = accel
+        self.buttons = buttons
+        self.realtime = realtime
+        self.light_rate = light_rate
+        self.accel_address = accel_address
+        self.refresh_ms = refresh_ms
+        self.analogbufio = analogbufio
+        self.ulab = ulab
+        self.bitmaptools = bitmaptools
+        self.usb_data = usb_data
+        self.light.bind(light_rate)
+
+    def sleep(self, seconds):
+        """ Model time spent blocked in hardware. """
+        if self.realtime and seconds > 0:
+            time.sleep(seconds)
+
+
+_current = Backend()
+
+
+def current():
+    return _current
+
+
+def set_current(backend):
+    global _current
+    _current = backend
@@ -0,0 +1,25 @@
+"""Stand-in for bitmaptools. Each call counts as one write to the bitmap."""
+
+
+def fill_region(dest_bitmap, x1, y1, x2, y2, value):
+    """ Fill the rectangle from (x1, y1) up to (x2, y2). Like the badge's,
+    the corners are put in order and the rectangle is clipped. """
+    if not 0 <= value < dest_bitmap.value_count:
+        raise ValueError('pixel value out of range')
+    if x1 > x2:
+        x1, x2 = x2, x1
+    if y1 > y2:
+        y1, y2 = y2, y1
+    x1 = max(x1, 0)
+    y1 = max(y1, 0)
+    x2 = min(x2, dest_bitmap.width)
+    y2 = min(y2, dest_bitmap.height)
+    if x1 >= x2 or y1 >= y2:
+        return
+    width = dest_bitmap.width
+    pixels = dest_bitmap.pixels
+    row = bytes([value]) * (x2 - x1)
+    for y in range(y1, y2):
+        pixels[y * width + x1:y * width + x2] = row
+    dest_bitmap.writes += 1
+    dest_bitmap._dirty(x1, y1, x2, y2)
@@ -0,0 +1,48 @@
+"""
+Stand-in for the CircuitPython board module of the EDGE badge.
+
+Pins are plain named objects. DISPLAY and I2C() are attached to the
+current backend by hostsim.install().
+"""
+
+
+class Pin(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return 'board.' + self.name
+
+
+TX = Pin('TX')
+D12 = Pin('D12')
+A7 = Pin('A7')
+NEOPIXEL = Pin('NEOPIXEL')
+BUTTON_CLOCK = Pin('BUTTON_CLOCK')
+BUTTON_OUT = Pin('BUTTON_OUT')
+BUTTON_LATCH = Pin('BUTTON_LATCH')
+ACCELEROMETER_INTERRUPT = Pin('ACCELEROMETER_INTERRUPT')
+SCL = Pin('SCL')
+SDA = Pin('SDA')
+
+DISPLAY = None
+
+
+class _I2CBus(object):
+    """ The shared I2C bus. Devices are looked up on the backend. """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+
+_i2c = None
+
+
+def I2C():
+    return _i2c
+
+
+def _attach(backend, display):
+    global DISPLAY, _i2c
+    DISPLAY = display
+    _i2c = _I2CBus(backend)
@@ -0,0 +1,16 @@
+"""Stand-in for digitalio."""
+
+
+class Direction(object):
+    INPUT = 'INPUT'
+    OUTPUT = 'OUTPUT'
+
+
+class DigitalInOut(object):
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.value = False
+
+    def deinit(self):
+        pass
@@ -0,0 +1,193 @@
+"""
+Stand-in for displayio.
+
+Bitmap counts every write so the cost of drawing a trace can be
+measured: a pixel, a fill, or a bitmaptools region, as each is one call
+from Python. It also keeps the rectangle the writes dirtied, as displayio
+does. Display counts refreshes and the pixels of the dirty rectangles
+each one pushes and, when the backend runs in real time, paces them like
+the badge does.
+"""
+
+import time
+
+from hostsim import backend as _backend
+
+
+class Bitmap(object):
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self.pixels = bytearray(width * height)
+        self.writes = 0
+        # The dirty rectangle, x1, y1, x2, y2 exclusive, or None
+        self.dirty = None
+
+    def _offset(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError('pixel coordinates out of bounds')
+            return y * self.width + x
+        if not 0 <= index < self.width * self.height:
+            raise IndexError('pixel index out of bounds')
+        return index
+
+    def __getitem__(self, index):
+        return self.pixels[self._offset(index)]
+
+    def __setitem__(self, index, value):
+        if not 0 <= value < self.value_count:
+            raise ValueError('pixel value out of range')
+        offset = self._offset(index)
+        self.pixels[offset] = value
+        self.writes += 1
+        x = offset % self.width
+        y = offset // self.width
+        self._dirty(x, y, x + 1, y + 1)
+
+    def fill(self, value):
+        if not 0 <= value < self.value_count:
+            raise ValueError('pixel value out of range')
+        self.pixels[:] = bytes([value]) * len(self.pixels)
+        self.writes += 1
+        self._dirty(0, 0, self.width, self.height)
+
+    def _dirty(self, x1, y1, x2, y2):
+        if self.dirty is None:
+            self.dirty = (x1, y1, x2, y2)
+        else:
+            dx1, dy1, dx2, dy2 = self.dirty
+            self.dirty = (min(x1, dx1), min(y1, dy1), max(x2, dx2),
+                          max(y2, dy2))
+
+    def _take_dirty(self):
+        """ The number of dirty pixels, and the bitmap is clean again. """
+        if self.dirty is None:
+            return 0
+        x1, y1, x2, y2 = self.dirty
+        self.dirty = None
+        return (x2 - x1) * (y2 - y1)
+
+
+class Palette(object):
+    def __init__(self, color_count):
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+    def is_transparent(self, index):
+        return index in self._transparent
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+
+class TileGrid(object):
+    def __init__(self, bitmap, pixel_shader=None, x=0, y=0, **kwargs):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+
+class Group(object):
+    def __init__(self, max_size=None, scale=1, x=0, y=0):
+        self._items = []
+        self.x = x
+        self.y = y
+        self.scale = scale
+        self.hidden = False
+
+    def append(self, item):
+        self._items.append(item)
+
+    def remove(self, item):
+        self._items.remove(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+
+class Display(object):
+    """ The badge display. board.DISPLAY is one of these. """
+
+    def __init__(self, width=160, height=128):
+        self._backend = _backend.current()
+        self.width = width
+        self.height = height
+        self.auto_refresh = True
+        self.root_group = None
+        self.refresh_count = 0
+        self.pixels_pushed = 0
+        self._last_refresh = None
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, target_frames_per_second=60,
+                minimum_frames_per_second=1):
+        """ Returns False when called too soon after the last refresh. """
+        if self._backend.realtime:
+            now = time.monotonic()
+            if (self._last_refresh is not None and
+                    now - self._last_refresh < 1.0 / target_frames_per_second):
+                return False
+            self._last_refresh = now
+            self._backend.sleep(self._backend.refresh_ms / 1000.0)
+        self.refresh_count += 1
+        if self.root_group is not None:
+            self.pixels_pushed += self._push(self.root_group)
+        return True
+
+    def _push(self, group):
+        pixels = 0
+        for item in group:
+            if isinstance(item, TileGrid):
+                pixels += item.bitmap._take_dirty()
+            elif isinstance(item, Group):
+                pixels += self._push(item)
+        return pixels
+
+    def snapshot(self):
+        """ Return the screen as rows of palette colors. """
+        rows = [[0] * self.width for _ in range(self.height)]
+        if self.root_group is not None:
+            self._composite(rows, self.root_group, 0, 0)
+        return rows
+
+    def _composite(self, rows, group, x0, y0):
+        for item in group:
+            if item.hidden:
+                continue
+            if isinstance(item, TileGrid):
+                bitmap = item.bitmap
+                palette = item.pixel_shader
+                for y in range(bitmap.height):
+                    sy = y0 + item.y + y
+                    if not 0 <= sy < self.height:
+                        continue
+                    for x in range(bitmap.width):
+                        sx = x0 + item.x + x
+                        value = bitmap[x, y]
+                        if (0 <= sx < self.width and
+                                not palette.is_transparent(value)):
+                            rows[sy][sx] = palette[value]
+            elif isinstance(item, Group):
+                self._composite(rows, item, x0 + item.x, y0 + item.y)
@@ -0,0 +1,14 @@
+"""Stand-in for gamepadshift. Buttons come from the backend script."""
+
+from hostsim import backend as _backend
+
+
+class GamePadShift(object):
+    def __init__(self, clock, data, latch):
+        self._script = _backend.current().buttons
+
+    def get_pressed(self):
+        return self._script.poll()
+
+    def deinit(self):
+        pass
@@ -0,0 +1,32 @@
+"""
+Stand-in for adafruit_display_text.label.
+
+Text is not rendered. The bounding box follows the 6x12 terminalio font.
+"""
+
+from hostsim import displayio
+
+
+class Label(displayio.Group):
+    def __init__(self, font, text='', max_glyphs=None, color=0xffffff, **kwargs):
+        super().__init__()
+        self.font = font
+        self.max_glyphs = max_glyphs if max_glyphs is not None else len(text)
+        self.color = color
+        self._text = ''
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, new_text):
+        if len(new_text) > self.max_glyphs:
+            raise RuntimeError('Text length exceeds max_glyphs')
+        self._text = new_text
+
+    @property
+    def bounding_box(self):
+        return (0, -self.font.height // 2,
+                len(self._text) * self.font.width, self.font.height)
@@ -0,0 +1,36 @@
+"""Stand-in for the neopixel library. Pixel writes are counted."""
+
+GRB = 'GRB'
+RGB = 'RGB'
+
+
+class NeoPixel(object):
+    def __init__(self, pin, n, bpp=3, brightness=1.0, auto_write=True,
+                 pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.pixel_order = pixel_order
+        self._pixels = [(0, 0, 0)] * n
+        self.writes = 0
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = tuple(color)
+        self.writes += 1
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def fill(self, color):
+        for i in range(self.n):
+            self[i] = color
+
+    def show(self):
+        pass
+
+    def deinit(self):
+        pass
@@ -0,0 +1,142 @@
+"""
+Signal sources for the simulated sensors.
+
+Sources hold a precomputed block of unsigned 16-bit samples, the same
+offset-binary format the badge ADC and PDM mic produce, and play it back
+in a loop. Reads are slice copies so the simulation adds little to the
+time measured for a sweep.
+"""
+
+import array
+import math
+import wave
+
+
+class LoopSource(object):
+    """ Plays back a block of samples in a loop.
+
+    render(sample_rate) returns the block for a given sample rate. It is
+    called again whenever the source is bound to a new rate.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.sample_rate = None
+        self.data = None
+        self.position = 0
+
+    def bind(self, sample_rate):
+        if sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            self.data = self.render(sample_rate)
+            self.position = 0
+
+    def value(self):
+        """ Return the next sample. """
+        v = self.data[self.position]
+        self.position += 1
+        if self.position == len(self.data):
+            self.position = 0
+        return v
+
+    def value_at(self, t):
+        """ Return the sample for time t in seconds. """
+        return self.data[int(t * self.sample_rate) % len(self.data)]
+
+    def read(self, buffer, count):
+        """ Copy the next count samples into buffer. """
+        data = self.data
+        done = 0
+        while done < count:
+            n = min(count - done, len(data) - self.position)
+            buffer[done:done + n] = data[self.position:self.position + n]
+            done += n
+            self.position += n
+            if self.position == len(data):
+                self.position = 0
+        return count
+
+
+def _clip(v):
+    if v < 0:
+        return 0
+    if v > 65535:
+        return 65535
+    return int(v)
+
+
+def function(func, duration=1.0):
+    """ Source from func(t) in seconds, sampled over duration seconds. """
+    def render(sample_rate):
+        n = max(1, int(round(duration * sample_rate)))
+        return array.array('H', [_clip(func(i / sample_rate)) for i in range(n)])
+    return LoopSource(render)
+
+
+def sine(frequency, amplitude=8000, midscale=32768, duration=1.0):
+    """ Sine wave around midscale. """
+    w = 2.0 * math.pi * frequency
+    return function(lambda t: midscale + amplitude * math.sin(w * t), duration)
+
+
+def square(frequency, amplitude=8000, midscale=32768, duty=0.5, duration=1.0):
+    """ Square wave around midscale. """
+    def func(t):
+        if (t * frequency) % 1.0 < duty:
+            return midscale + amplitude
+        return midscale - amplitude
+    return function(func, duration)
+
+
+def constant(value=32768):
+    return LoopSource(lambda sample_rate: array.array('H', [value]))
+
+
+class WavSource(LoopSource):
+    """ Plays back the first channel of a 16-bit WAV file.
+
+    The file is resampled to the rate the source is bound to by picking
+    the nearest sample.
+    """
+
+    def __init__(self, path):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError('only 16-bit WAV files are supported')
+            self.wav_rate = wav.getframerate()
+            channels = wav.getnchannels()
+            frames = array.array('h', wav.readframes(wav.getnframes()))
+        # WAV samples are signed. The badge produces offset binary.
+        self.wav_data = array.array(
+            'H', [s + 32768 for s in frames[::channels]])
+        super().__init__(self._resample)
+
+    def _resample(self, sample_rate):
+        if sample_rate == self.wav_rate:
+            return self.wav_data
+        n = max(1, len(self.wav_data) * sample_rate // self.wav_rate)
+        step = self.wav_rate / sample_rate
+        return array.array('H', [self.wav_data[int(i * step)]
+                                 for i in range(n)])
+
+
+class AccelScript(object):
+    """ Scripted acceleration in m/s^2.
+
+    func(t) returns an (x, y, z) tuple for time t in seconds. Each reading
+    advances time by one period of the output data rate. The default is
+    the badge lying flat with a slow wobble.
+    """
+
+    def __init__(self, func=None, data_rate=400):
+        if func is None:
+            func = lambda t: (2.0 * math.sin(2.0 * math.pi * 2.0 * t),
+                              0.0, 9.806)
+        self.func = func
+        self.data_rate = data_rate
+        self.index = 0
+
+    def read(self):
+        reading = self.func(self.index / self.data_rate)
+        self.index += 1
+        return reading
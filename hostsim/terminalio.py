@@ -0,0 +1,9 @@
+"""Stand-in for terminalio. The built-in font is 6x12 pixels."""
+
+
+class _Font(object):
+    width = 6
+    height = 12
+
+
+FONT = _Font()
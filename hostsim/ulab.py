@@ -0,0 +1,7 @@
+"""
+Stand-in for ulab, with NumPy in the place of ulab.numpy. It is only
+installed when the backend asks for it, since the badge's CircuitPython
+is built without ulab.
+"""
+
+import numpy  # noqa: F401
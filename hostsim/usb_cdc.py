@@ -0,0 +1,33 @@
+"""
+Stand-in for usb_cdc. data writes to the backend's usb_data file, as if
+a PC had the data port open, or is None when the backend has none, as
+when boot.py has not turned the port on.
+"""
+
+from hostsim import backend as _backend
+
+
+class Serial(object):
+    def __init__(self, sink):
+        self._sink = sink
+        self.connected = True
+        self.timeout = 1
+        self.write_timeout = None
+        self.bytes_written = 0
+
+    def write(self, buf):
+        data = bytes(buf)
+        self._sink.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+
+console = None
+data = None
+
+
+def _attach(new_backend):
+    global data
+    data = None
+    if new_backend.usb_data is not None:
+        data = Serial(new_backend.usb_data)
@@ -0,0 +1,22 @@
+"""
+The scope's classes, for code.py to import.
+
+code.py holds the main loop. common, buttons, display, channel and
+telemetry are imported when it starts. The rest are imported the first
+time they are needed, so a feature that is never used is never
+compiled and takes no memory:
+
+    mic, light, generator, accel  when the channel is first shown
+    replay                        when there is a capture file to play
+    spectrum                      at the first FFT
+    accumulator                   when averaging or peak hold is turned on
+    decimator                     when a decimation filter is turned on
+    measure                       at the first measurement
+    history                       when a sweep is first held to inspect
+    stream                        when streaming is turned on
+    tasks                         when the scope runs under asyncio
+
+Each module is compiled on its own, so none needs as much memory to
+compile as the whole program would. mpy-cross can compile them to .mpy
+ahead of time, which takes compiling off the badge altogether.
+"""
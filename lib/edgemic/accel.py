@@ -0,0 +1,222 @@
+"""
+The accelerometer channel. Imported, with adafruit_lis3dh, when it is
+first shown.
+"""
+
+import array
+
+import adafruit_lis3dh
+import digitalio
+from micropython import const
+
+from edgemic.channel import sensorChannel
+from edgemic.common import UNITS
+
+class accelerometerChannel(sensorChannel):
+    """ Class to use the accelerometer as a data channel. """
+    
+    CHANNEL_ID = const(4)
+    UNIT, UNIT_PER_COUNT, UNIT_ZERO = UNITS[CHANNEL_ID]
+    
+    # LIS3DH registers for FIFO stream mode
+    REG_CTRL5 = const(0x24)
+    REG_OUT_X_L = const(0x28)
+    REG_FIFO_CTRL = const(0x2E)
+    REG_FIFO_SRC = const(0x2F)
+    FIFO_SIZE = const(32)
+    
+    # Output data rates. Sweeps use the fastest rate. Roll mode uses a 
+    # slower one, so the FIFO does not overflow while a frame is drawn.
+    SWEEP_DATA_RATE = const(1344)
+    ROLL_DATA_RATE = const(400)
+    
+    def __init__(self, board, button, samples):
+        super().__init__(button)
+        self.set_buffers(samples)
+        self.board = board
+        self.name = 'ACCEL'
+        # Do not take extra samples to search for a trigger.
+        self.trigger_mode = sensorChannel.TRIGGER_FREE
+
+        self.accelerometer = None
+        i2c = None
+        try:
+            i2c = board.I2C()
+        except RuntimeError:
+            pass
+
+        if i2c is not None:
+            int1 = digitalio.DigitalInOut(board.ACCELEROMETER_INTERRUPT)
+            try:
+                self.accelerometer = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19, int1=int1)
+            except ValueError:
+                self.accelerometer = adafruit_lis3dh.LIS3DH_I2C(i2c, int1=int1)       
+        
+        self.fifo_device = None
+        self.fifo_overruns = 0
+        if self.accelerometer is not None:
+            self.start_fifo()
+            
+        # Roll instead of waiting for a sweep.
+        self.set_roll_mode(True)
+        
+    def start_fifo(self):
+        """ Set up the LIS3DH FIFO in stream mode, for burst reads. """
+        accel = self.accelerometer
+        # The burst read goes straight to the I2C device, because the
+        # driver's register buffer only holds one reading.
+        device = getattr(accel, '_i2c', None)
+        if device is None:
+            return
+        self.fifo_device = device
+        self.fifo_bytes = bytearray(6 * accelerometerChannel.FIFO_SIZE)
+        self.fifo_register = bytearray([accelerometerChannel.REG_OUT_X_L | 0x80])
+        self.block = array.array('H', [0] * accelerometerChannel.FIFO_SIZE)
+        self.block_len = 0
+        self.block_pos = 0
+        
+        # Scale the sum of the raw x, y and z counts to 25 counts per m/s^2,
+        # like the readings in m/s^2 were, as a 16.16 fixed point factor.
+        # Raw readings are left justified, and the counts per g depend on
+        # the range, as in the driver.
+        counts_per_g = {
+            adafruit_lis3dh.RANGE_2_G: 16380,
+            adafruit_lis3dh.RANGE_4_G: 8190,
+            adafruit_lis3dh.RANGE_8_G: 4096,
+            adafruit_lis3dh.RANGE_16_G: 1365}[accel.range]
+        self.fifo_scale = (25 * 9806 * 65536) // (1000 * counts_per_g)
+        
+        ctrl5 = accel._read_register_byte(accelerometerChannel.REG_CTRL5)
+        accel._write_register_byte(accelerometerChannel.REG_CTRL5, ctrl5 | 0x40)
+        self.set_data_rate(accelerometerChannel.SWEEP_DATA_RATE)
+        self.reset_fifo()
+        
+    def set_data_rate(self, rate):
+        """ Set the output data rate in Hz, which sets the sweep time. """
+        self.accelerometer.data_rate = {
+            1344: adafruit_lis3dh.DATARATE_1344_HZ,
+            400: adafruit_lis3dh.DATARATE_400_HZ,
+            200: adafruit_lis3dh.DATARATE_200_HZ,
+            100: adafruit_lis3dh.DATARATE_100_HZ}[rate]
+        self.sample_rate = rate
+        
+    def reset_fifo(self):
+        """ Empty the FIFO and start filling it again. """
+        accel = self.accelerometer
+        # Bypass mode empties the FIFO. Then go back to stream mode.
+        accel._write_register_byte(accelerometerChannel.REG_FIFO_CTRL, 0x00)
+        accel._write_register_byte(accelerometerChannel.REG_FIFO_CTRL, 0x80)
+        self.block_len = 0
+        self.block_pos = 0
+        
+    def read_fifo(self, dest, index, max_count):
+        """ Burst-read up to max_count samples from the FIFO into dest.
+        
+        The samples go to dest[index:] and the number read is returned, 
+        which is 0 if the FIFO is empty. All the readings come in one I2C 
+        transaction and are converted with integer math only.
+        """
+        accel = self.accelerometer
+        src = accel._read_register_byte(accelerometerChannel.REG_FIFO_SRC)
+        if src & 0x20:
+            # Empty
+            return 0
+        count = src & 0x1F
+        if src & 0x40:
+            # Overrun: the FIFO is full and older readings were lost.
+            self.fifo_overruns += 1
+            count = accelerometerChannel.FIFO_SIZE
+        elif count == 0:
+            # Not empty, so the 5-bit count has wrapped: the FIFO is full.
+            count = accelerometerChannel.FIFO_SIZE
+        if count > max_count:
+            count = max_count
+        if count == 0:
+            return 0
+            
+        buf = self.fifo_bytes
+        with self.fifo_device as i2c:
+            i2c.write_then_readinto(self.fifo_register, buf, in_end=6 * count)
+            
+        # The readings are little-endian signed 16-bit x, y, z. Flipping
+        # the sign bit makes each offset binary, so the sum has three 
+        # offsets of 32768 to take off.
+        scale = self.fifo_scale
+        i = 0
+        for idx in range(index, index + count):
+            total = ((((buf[i + 1] << 8) | buf[i]) ^ 0x8000) +
+                     (((buf[i + 3] << 8) | buf[i + 2]) ^ 0x8000) +
+                     (((buf[i + 5] << 8) | buf[i + 4]) ^ 0x8000) - 98304)
+            dest[idx] = 32768 + ((total * scale) >> 16)
+            i += 6
+        return count
+        
+    def set_roll_mode(self, roll_mode):
+        super().set_roll_mode(roll_mode)
+        if self.fifo_device is not None:
+            if roll_mode:
+                self.set_data_rate(accelerometerChannel.ROLL_DATA_RATE)
+            else:
+                self.set_data_rate(accelerometerChannel.SWEEP_DATA_RATE)
+            self.reset_fifo()
+        
+    def preset(self):
+        super().preset()
+        
+    def read_sample(self):
+        """ Read one acceleration, scaled to look like an ADC reading. """
+        
+        """ Question: what is best lightweight algorithm to make 
+        a swept graph of acceleration interesting? 
+        Right now it is using the sum of the accelerations in x, y, and z."""
+        
+        if self.fifo_device is not None:
+            # Readings come from the FIFO a block at a time.
+            if self.block_pos == self.block_len:
+                self.block_len = 0
+                self.block_pos = 0
+                while self.block_len == 0:
+                    self.block_len = self.read_fifo(self.block, 0, 
+                                                accelerometerChannel.FIFO_SIZE)
+            sample = self.block[self.block_pos]
+            self.block_pos += 1
+            return sample
+            
+        if self.accelerometer is None:
+            return self.adc_midscale
+        accel_reading = self.accelerometer.acceleration
+        return int(round(accel_reading.x + accel_reading.y + accel_reading.z) * 25.0) + 32768
+        
+    def take_sweep(self):
+        """ Take a sweep of accelerometer measurements."""
+        
+        """ The sweep takes num_samples / sample_rate seconds. 
+        The FIFO is emptied first so the sweep starts now.
+        """
+        if self.fifo_device is None:
+            samples = self.sweep_samples
+            for a in range(self.num_samples):
+                samples[a] = self.read_sample()
+            return
+            
+        self.start_sweep()
+        while not self.sweep_step():
+            pass
+            
+    def start_sweep(self):
+        """ Empty the FIFO, so the sweep starts now. A roll carries on 
+        from the readings it has. """
+        super().start_sweep()
+        if self.fifo_device is not None and not self.roll_mode:
+            self.reset_fifo()
+            
+    def sweep_step(self):
+        """ Take whatever the FIFO holds, without waiting for more. The
+        FIFO keeps filling between steps. """
+        if self.fifo_device is None:
+            self.take_sweep()
+            return True
+        self.step_index += self.read_fifo(self.sweep_samples, 
+                                          self.step_index, 
+                                          self.step_count - self.step_index)
+        return self.step_index >= self.step_count
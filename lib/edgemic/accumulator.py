@@ -0,0 +1,190 @@
+"""
+Averaging and peak hold. Imported when an acquire mode is first chosen.
+"""
+
+import array
+
+from micropython import const
+
+from edgemic.channel import RollBuffer
+
+class Accumulator(object):
+    """ Sweeps combined sample by sample, for averaging and peak hold.
+    
+    Samples are lined up from each sweep's start_sample, where the trigger
+    put it, so a steady triggered signal adds up in step instead of 
+    smearing. Sweeps that were not aligned, auto sweeps without a trigger,
+    are added from where they start until a sweep is aligned, so a signal
+    that never triggers is still averaged. The first aligned sweep starts
+    again without them, and from then on those not aligned are left out.
+    The sweep just swapped in is added, then overwritten with the 
+    result, so the view draws the result like any other sweep.
+    Sums are integers, and nothing is allocated after the first sweep of
+    a given length.
+    
+      AVERAGE: the mean of each block of `sweeps` sweeps. The last full 
+               block's mean is shown while the next adds up, and the mean
+               so far until the first is full.
+      EMA:     a moving average giving each new sweep a weight of
+               1 / 2**shift, kept with FRACTION_BITS below the sample.
+      PEAK:    the lowest and highest sample seen in each column since
+               it was cleared, drawn as a span per column.
+    """
+    
+    MODE_OFF = const(0)
+    MODE_AVERAGE = const(1)
+    MODE_EMA = const(2)
+    MODE_PEAK = const(3)
+    MODE_NAMES = ('', 'AVG', 'EMA', 'PEAK')
+    
+    FRACTION_BITS = const(4)
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.sweeps = 16
+        self.shift = 3
+        self.sums = array.array('l')
+        self.result = array.array('H')
+        # The lowest and highest sample in each column, drawn like a
+        # full roll buffer
+        self.peak = RollBuffer(columns)
+        self.size = 0
+        self.per = 0
+        self.clear()
+        
+    def clear(self):
+        """ Start again from the next sweep. """
+        # Sweeps added: in the current block, or in all for EMA and PEAK
+        self.count = 0
+        # Whether result holds anything to show, and for AVERAGE whether 
+        # it is the mean of a full block
+        self.valid = False
+        self.full = False
+        # Whether the sweeps added were aligned
+        self.aligned = False
+        self.peak.clear()
+        
+    def resize(self, size, per):
+        """ Get ready for sweeps of size samples, per to a column. """
+        if size > len(self.sums):
+            self.sums = array.array('l', [0] * size)
+            self.result = array.array('H', [0] * size)
+        self.size = size
+        self.per = per
+        self.clear()
+        
+    def add(self, mode, samples, start, count, per, aligned):
+        """ Add samples[start:start + count] and replace them with the 
+        result. A sweep of a new length or column width starts again. """
+        if count < 0:
+            count = 0
+        if count != self.size or per != self.per:
+            self.resize(count, per)
+        if aligned and not self.aligned:
+            if self.count:
+                self.clear()
+            self.aligned = True
+        elif not aligned and self.aligned:
+            # Left out, and the result shown instead
+            if mode != Accumulator.MODE_PEAK and self.valid:
+                result = self.result
+                for idx in range(count):
+                    samples[start + idx] = result[idx]
+            return
+        if mode == Accumulator.MODE_PEAK:
+            self.add_peak(samples, start, count, per)
+        elif mode == Accumulator.MODE_AVERAGE:
+            self.add_average(samples, start, count)
+        else:
+            self.add_ema(samples, start, count)
+                
+    # Each sample is added and replaced with the result in the same loop.
+    
+    def add_average(self, samples, start, count):
+        sums = self.sums
+        result = self.result
+        self.count += 1
+        n = self.count
+        if n == self.sweeps:
+            # The block is full. Its mean is the result until the next is.
+            for idx in range(count):
+                mean = (sums[idx] + samples[start + idx]) // n
+                result[idx] = mean
+                samples[start + idx] = mean
+                sums[idx] = 0
+            self.count = 0
+            self.valid = True
+            self.full = True
+        elif self.full:
+            for idx in range(count):
+                sums[idx] += samples[start + idx]
+                samples[start + idx] = result[idx]
+        else:
+            # The first sweep of a block starts its sums, whatever was 
+            # left in them before a clear() or by another mode.
+            first = n == 1
+            for idx in range(count):
+                total = samples[start + idx]
+                if not first:
+                    total += sums[idx]
+                sums[idx] = total
+                mean = total // n
+                result[idx] = mean
+                samples[start + idx] = mean
+            self.valid = True
+            
+    def add_ema(self, samples, start, count):
+        acc = self.sums
+        result = self.result
+        bits = Accumulator.FRACTION_BITS
+        if self.count == 0:
+            # The first sweep starts the average.
+            for idx in range(count):
+                s = samples[start + idx]
+                acc[idx] = s << bits
+                result[idx] = s
+        else:
+            shift = self.shift
+            for idx in range(count):
+                a = acc[idx]
+                a += ((samples[start + idx] << bits) - a) >> shift
+                acc[idx] = a
+                a >>= bits
+                result[idx] = a
+                samples[start + idx] = a
+        self.count += 1
+        self.valid = True
+        
+    def add_peak(self, samples, start, count, per):
+        peak = self.peak
+        lows = peak.lo
+        highs = peak.hi
+        first = self.count == 0
+        end = start + count
+        idx = start
+        for col in range(self.columns):
+            if idx < end:
+                col_end = idx + per
+                if col_end > end:
+                    col_end = end
+                lo = samples[idx]
+                hi = lo
+                for i in range(idx + 1, col_end):
+                    s = samples[i]
+                    if s < lo:
+                        lo = s
+                    elif s > hi:
+                        hi = s
+                idx = col_end
+                if first or lo < lows[col]:
+                    lows[col] = lo
+                if first or hi > highs[col]:
+                    highs[col] = hi
+            elif first:
+                # No samples reach this column. A span from the top down
+                # to the bottom draws nothing.
+                lows[col] = 65535
+                highs[col] = 0
+        peak.head = 0
+        peak.count = self.columns
+        self.count += 1
@@ -0,0 +1,212 @@
+"""
+The badge's buttons, read through the shift register.
+"""
+
+import board
+import digitalio
+from gamepadshift import GamePadShift
+from micropython import const
+
+from edgemic.common import TICKS_MASK, ticks_diff, ticks_ms
+
+class Button:
+    """Class to read Buttons on AdaFruit EDGE Badge."""
+    
+    """
+    poll() reads the buttons and queues timestamped events, and 
+    get_event() takes them off the queue. Neither one waits.
+    
+      PRESS, RELEASE: a button went down or up.
+      REPEAT:         a button that repeats is still held. Repeats start
+                      after REPEAT_DELAY_MS and speed up the longer it is 
+                      held, down to REPEAT_MIN_MS apart.
+      CHORD:          a button went down while others were held. The 
+                      mask is all the buttons held.
+                      
+    The buttons that repeat are also the ones that make chords, so none
+    of them acts alone when it is part of a chord. Their PRESS is held 
+    back until they are released, or until they are held long enough to
+    repeat, and dropped if a chord comes first. Once in a chord, a 
+    button makes no PRESS or REPEAT until it is released, even if the 
+    others are released first. Select and Start press at once.
+                      
+    Events are timed by ticks_ms(), so repeats come at the same rate 
+    however often poll() is called. Several may be queued at once after 
+    a long sweep.
+    
+    GamePadShift latches a press until it is read, so a button that
+    bounces while held still reads as held. A press less than DEBOUNCE_MS
+    after the same button was released is taken as bounce and ignored.
+    """
+    
+    # Button Constants
+    BUTTON_LEFT = const(128)
+    BUTTON_UP = const(64)
+    BUTTON_DOWN = const(32)
+    BUTTON_RIGHT = const(16)
+    BUTTON_SELECT = const(8)
+    BUTTON_START = const(4)
+    BUTTON_A = const(2)
+    BUTTON_B = const(1)
+    
+    # Buttons that repeat while held
+    REPEAT_MASK = const(0xf3)
+    
+    EVENT_PRESS = const(1)
+    EVENT_RELEASE = const(2)
+    EVENT_REPEAT = const(3)
+    EVENT_CHORD = const(4)
+    
+    DEBOUNCE_MS = const(20)
+    REPEAT_DELAY_MS = const(400)
+    REPEAT_START_MS = const(150)
+    REPEAT_MIN_MS = const(30)
+    
+    QUEUE_SIZE = const(16)
+
+    def __init__(self, i2c=None):
+        # Buttons
+        self._buttons = GamePadShift(digitalio.DigitalInOut(board.BUTTON_CLOCK),
+                                     digitalio.DigitalInOut(board.BUTTON_OUT),
+                                     digitalio.DigitalInOut(board.BUTTON_LATCH))
+        self.button_values = self._buttons.get_pressed()
+        # Buttons already down at startup do not make events.
+        self.held = self.button_values
+        # Buttons down whose PRESS is held back, and buttons in a chord
+        self.pending = 0
+        self.chorded = 0
+        
+        # Per button, by bit number
+        self.released_at = [0] * 8
+        self.next_repeat = [0] * 8
+        self.repeat_interval = [0] * 8
+        
+        # Ring of events
+        self.event_kind = bytearray(Button.QUEUE_SIZE)
+        self.event_mask = bytearray(Button.QUEUE_SIZE)
+        self.event_time = [0] * Button.QUEUE_SIZE
+        self.event_head = 0
+        self.event_count = 0
+        
+    def scan(self):
+        self.button_values = self._buttons.get_pressed()        
+
+    @property
+    def left(self):
+        return self.button_values & self.BUTTON_LEFT
+        
+    @property
+    def up(self):
+        return self.button_values & self.BUTTON_UP
+        
+    @property
+    def down(self):
+        return self.button_values & self.BUTTON_DOWN
+        
+    @property
+    def right(self):
+        return self.button_values & self.BUTTON_RIGHT
+        
+    @property
+    def select(self):
+        return self.button_values & self.BUTTON_SELECT
+        
+    @property
+    def start(self):
+        return self.button_values & self.BUTTON_START
+        
+    @property
+    def a(self):
+        return self.button_values & self.BUTTON_A
+        
+    @property
+    def b(self):
+        return self.button_values & self.BUTTON_B
+    
+    def queue_event(self, kind, mask, event_time):
+        """ Add an event. It is dropped if the queue is full. """
+        if self.event_count == Button.QUEUE_SIZE:
+            return
+        idx = self.event_head + self.event_count
+        if idx >= Button.QUEUE_SIZE:
+            idx -= Button.QUEUE_SIZE
+        self.event_kind[idx] = kind
+        self.event_mask[idx] = mask
+        self.event_time[idx] = event_time
+        self.event_count += 1
+        
+    def get_event(self):
+        """ Return the next (kind, mask, ticks_ms) event, or None. """
+        if self.event_count == 0:
+            return None
+        idx = self.event_head
+        self.event_head += 1
+        if self.event_head == Button.QUEUE_SIZE:
+            self.event_head = 0
+        self.event_count -= 1
+        return (self.event_kind[idx], self.event_mask[idx], 
+                self.event_time[idx])
+        
+    def poll(self):
+        """ Read the buttons and queue the events since the last poll. """
+        now = ticks_ms()
+        self.scan()
+        raw = self.button_values
+        held = self.held
+        changed = raw ^ held
+        if changed:
+            for bit in range(8):
+                mask = 1 << bit
+                if not changed & mask:
+                    continue
+                if raw & mask:
+                    if (0 <= ticks_diff(now, self.released_at[bit]) < 
+                            Button.DEBOUNCE_MS):
+                        continue
+                    held |= mask
+                    self.next_repeat[bit] = (
+                            (now + Button.REPEAT_DELAY_MS) & TICKS_MASK)
+                    self.repeat_interval[bit] = Button.REPEAT_START_MS
+                    chord = held & Button.REPEAT_MASK
+                    if not mask & Button.REPEAT_MASK:
+                        self.queue_event(Button.EVENT_PRESS, mask, now)
+                    elif chord != mask:
+                        # The presses held back are not single presses.
+                        self.pending &= ~chord
+                        self.chorded |= chord
+                    else:
+                        self.pending |= mask
+                    if held != mask:
+                        self.queue_event(Button.EVENT_CHORD, held, now)
+                else:
+                    held &= ~mask
+                    self.released_at[bit] = now
+                    if self.pending & mask:
+                        self.pending &= ~mask
+                        self.queue_event(Button.EVENT_PRESS, mask, now)
+                    self.chorded &= ~mask
+                    self.queue_event(Button.EVENT_RELEASE, mask, now)
+            self.held = held
+            
+        repeating = held & Button.REPEAT_MASK & ~self.chorded
+        if repeating:
+            for bit in range(8):
+                mask = 1 << bit
+                if not repeating & mask:
+                    continue
+                # Catch up with every repeat due since the last poll. Each 
+                # one comes a quarter sooner than the one before. A press
+                # held back is let go at the first.
+                while ticks_diff(now, self.next_repeat[bit]) >= 0:
+                    kind = Button.EVENT_REPEAT
+                    if self.pending & mask:
+                        self.pending &= ~mask
+                        kind = Button.EVENT_PRESS
+                    self.queue_event(kind, mask, self.next_repeat[bit])
+                    interval = self.repeat_interval[bit]
+                    self.next_repeat[bit] = (
+                            (self.next_repeat[bit] + interval) & TICKS_MASK)
+                    interval -= interval >> 2
+                    if interval < Button.REPEAT_MIN_MS:
+                        interval = Button.REPEAT_MIN_MS
+                    self.repeat_interval[bit] = interval
@@ -0,0 +1,763 @@
+"""
+sensorChannel, the code the channels share, and the helpers that take
+their sweeps.
+"""
+
+import array
+
+from micropython import const
+
+from edgemic.buttons import Button
+from edgemic.common import (ACQUIRE_OFF, FILTER_NONE, ticks_diff, ticks_ms, 
+                            x_left, x_right)
+from edgemic.display import DisplayView
+
+class sensorChannel(object):
+    
+    # Trigger modes
+    #   FREE:   no trigger, every sweep starts at the same sample
+    #   AUTO:   start at the trigger point, free run if there is none
+    #   NORMAL: only show sweeps with a trigger point
+    #   SINGLE: show the first triggered sweep and hold it until re-armed
+    TRIGGER_FREE = const(0)
+    TRIGGER_AUTO = const(1)
+    TRIGGER_NORMAL = const(2)
+    TRIGGER_SINGLE = const(3)
+    
+    TRIGGER_NAMES = ('FREE', 'AUTO', 'NORM', 'SNGL')
+    
+    TRIGGER_RISING = const(0)
+    TRIGGER_FALLING = const(1)
+    
+    # The least trigger hysteresis, so noise on a flat trace does not
+    # trigger
+    TRIGGER_MIN_HYSTERESIS = const(256)
+    # Pixels the trigger level moves for each press of its chord
+    TRIGGER_LEVEL_STEP_PX = const(8)
+    # An automatic trigger level is found again every this many sweeps,
+    # and whenever a sweep has no trigger point.
+    TRIGGER_LEVEL_SWEEPS = const(8)
+    
+    # Whether the buttons set the trigger. Channels that play back a
+    # trigger point already found do not have one.
+    TRIGGER_CONTROLS = True
+    
+    # Identifies the channel in streamed sweeps
+    CHANNEL_ID = const(0)
+    
+    # Measurements are shown in UNIT: (sample - UNIT_ZERO) * UNIT_PER_COUNT.
+    # Each channel's are in common.UNITS.
+    UNIT = ''
+    UNIT_PER_COUNT = 1.0
+    UNIT_ZERO = 0
+    
+    def __init__(self, button):
+        
+        self.button = button
+        # Shown at the top right of the screen
+        self.name = ''
+        
+        self.vertical_offset = 64
+        self.num_samples_per_px = 2
+        self.num_samples = 1000
+        self.vertical_gain = 5
+        # The first samples of a sweep can be junk. Skip them.
+        self.skip_samples = 3
+        # The first sample drawn, and the first for the sweep being taken.
+        self.start_sample = self.skip_samples
+        self.sweep_start = self.skip_samples
+        # A sweep taken in steps: the samples it takes, the next one, and
+        # whether it still has steps to go.
+        self.step_count = 0
+        self.step_index = 0
+        self.step_pending = False
+        self.adc_midscale = 32768
+        self.trace_mode = DisplayView.TRACE_DOTS
+        
+        # Samples per second, for channels with a timebase, and the rate
+        # the last sweep actually achieved, if it was measured.
+        self.sample_rate = None
+        self.achieved_rate = None
+        
+        self.trigger_mode = sensorChannel.TRIGGER_AUTO
+        self.trigger_edge = sensorChannel.TRIGGER_RISING
+        # With trigger_auto_level, the sweeps set the level halfway 
+        # between the lowest and highest samples searched. The level is 
+        # found again when level_countdown reaches 0.
+        self.trigger_auto_level = True
+        self.level_countdown = 0
+        self.trigger_level = self.adc_midscale
+        # The signal has to go this far past the level the other way
+        # before the trigger is armed, so noise does not trigger it.
+        # With the level set from the sweep, it is an eighth of the 
+        # sweep's peak-to-peak.
+        self.trigger_hysteresis = sensorChannel.TRIGGER_MIN_HYSTERESIS
+        # Sweeps are not shown until this long after the last trigger.
+        self.trigger_holdoff_ms = 0
+        # Columns on the screen before the trigger point
+        self.pretrigger_px = 16
+        self.trigger_held = False
+        self.trigger_time = None
+        # Whether the sweep being taken, and the one drawn, start at a
+        # trigger point or at least at a steady place in the signal.
+        self.sweep_aligned = True
+        self.aligned = True
+        
+        # Averaging and peak hold combine the sweeps in an Accumulator,
+        # made the first time a mode is turned on.
+        self.acquire_mode = ACQUIRE_OFF
+        self.accumulator = None
+        
+        # With several samples per column, a Decimator can filter each 
+        # sweep down to one sample per column. decimated is how many 
+        # columns the sweep drawn was filtered to, or 0 if it was not.
+        self.decimation = FILTER_NONE
+        self.decimator = None
+        self.decimated = 0
+        
+        # What was measured in the last sweep measured, made the first
+        # time one is
+        self.measurements = None
+        
+        # Roll mode streams samples onto the screen as they arrive instead
+        # of taking whole sweeps. Channels that support it have read_sample().
+        self.roll_mode = False
+        self.roll = None
+        
+        # Spectrum mode shows the FFT of the first fft_size samples of 
+        # each sweep, as the level in dB of each column in spectrum_db.
+        self.spectrum_mode = False
+        self.spectrum = None
+        self.spectrum_db = None
+        self.fft_size = 1024
+        self.min_fft_size = 128
+        self.max_fft_size = 4096
+        
+        # Inspect mode stops taking sweeps and holds the last one in a 
+        # History, made the first time, to zoom and pan across. captured 
+        # is the length of the sweep drawn.
+        self.inspecting = False
+        self.history = None
+        self.captured = 0
+        
+        self.max_gain_limit = 12
+        self.min_gain_limit = 0
+        self.gain_increment = 1
+        
+        self.max_vertical_offset_limit = 1000
+        self.min_vertical_offset_limit = -1000
+        self.vertical_offset_increment = 4
+        
+        self.max_samples_per_px = 39
+        self.min_samples_per_px = 1
+        self.samples_per_px_increment = 1
+        
+        self.min_num_samples = 100
+        self.max_num_samples = 8000
+        
+    def set_buffers(self, samples, sweep_samples=None):
+        """ Set the sample buffers. 
+        
+        samples holds the last complete sweep, which is what gets drawn.
+        take_sweep() fills sweep_samples. With two buffers, the next sweep
+        can be taken while the last one is still on its way to the screen.
+        With one buffer, both names refer to the same array. Sweeps are 
+        no longer than the buffers.
+        """
+        self.samples = samples
+        if sweep_samples is None:
+            sweep_samples = samples
+        self.sweep_samples = sweep_samples
+        self.max_num_samples = len(samples)
+        
+    def swap_buffers(self):
+        """ Make the sweep just taken the one that gets drawn. 
+        
+        When a decimation filter is on, the sweep is filtered to one 
+        sample per column first. When averaging or peak hold is on, the 
+        sweep is added to the accumulator and what is drawn is the result.
+        """
+        self.samples, self.sweep_samples = self.sweep_samples, self.samples
+        self.start_sample = self.sweep_start
+        self.captured = self.num_samples
+        self.aligned = self.sweep_aligned
+        self.decimated = 0
+        if (self.decimation != FILTER_NONE and 
+                self.num_samples_per_px > 0 and not self.spectrum_mode):
+            self.decimated = self.decimator.run(
+                self.decimation, self.samples, self.start_sample, 
+                self.num_samples, self.num_samples_per_px + 1, 
+                x_right - x_left + 1)
+        if self.acquire_mode != ACQUIRE_OFF and not self.spectrum_mode:
+            self.accumulate()
+            
+    def samples_per_column(self):
+        """ Samples per screen column in the sweep drawn: 1 once it has 
+        been decimated. """
+        if self.decimated:
+            return 1
+        return self.num_samples_per_px + 1
+        
+    def drawn_samples(self):
+        """ The number of samples from start_sample that are drawn. """
+        if self.decimated:
+            return self.decimated
+        count = self.num_samples - self.start_sample
+        if count > self.display_samples():
+            count = self.display_samples()
+        return count
+        
+    def accumulate(self):
+        self.accumulator.add(self.acquire_mode, self.samples, 
+                             self.start_sample, self.drawn_samples(),
+                             self.samples_per_column(), self.aligned)
+            
+    def set_acquire_mode(self, mode):
+        """ Turn averaging, the moving average or peak hold on or off.
+        Whichever it is starts again from the next sweep. """
+        self.acquire_mode = mode
+        if mode != ACQUIRE_OFF and self.accumulator is None:
+            from edgemic.accumulator import Accumulator
+            self.accumulator = Accumulator(x_right - x_left + 1)
+        if self.accumulator is not None:
+            self.accumulator.clear()
+            
+    def next_acquire_mode(self):
+        mode = self.acquire_mode + 1
+        from edgemic.accumulator import Accumulator
+        if mode == len(Accumulator.MODE_NAMES):
+            mode = ACQUIRE_OFF
+        self.set_acquire_mode(mode)
+        
+    def set_decimation(self, mode):
+        """ Choose the decimation filter, FILTER_NONE for none. 
+        It applies from the next sweep. """
+        self.decimation = mode
+        if mode != FILTER_NONE and self.decimator is None:
+            from edgemic.decimator import Decimator
+            self.decimator = Decimator()
+        # What is accumulated changes with the filter, so start again.
+        if self.accumulator is not None:
+            self.accumulator.clear()
+            
+    def next_decimation(self):
+        mode = self.decimation + 1
+        from edgemic.decimator import Decimator
+        if mode == len(Decimator.FILTER_NAMES):
+            mode = FILTER_NONE
+        self.set_decimation(mode)
+        
+    def measure(self):
+        """ Measure the sweep that will be drawn next. """
+        count = self.drawn_samples()
+        rate = self.achieved_rate or self.sample_rate or 0
+        if self.decimated:
+            rate /= self.num_samples_per_px + 1
+        if self.spectrum_mode:
+            count = 0
+        if self.measurements is None:
+            from edgemic.measure import Measurements
+            self.measurements = Measurements()
+        self.measurements.measure(self.samples, self.start_sample, count, 
+                                  int(rate))
+        
+    def set_inspect(self, inspecting):
+        """ Stop and hold the sweep drawn to zoom and pan across, or go 
+        back to taking sweeps. The view starts where the sweep is drawn
+        now. Rolls, spectra and sweeps that are averaged, peak held or 
+        decimated are not held: what is on the screen is not a sweep. """
+        if inspecting and (self.roll_mode or self.spectrum_mode or 
+                           self.acquire_mode != ACQUIRE_OFF or 
+                           self.decimated or 
+                           self.captured <= self.skip_samples):
+            return
+        self.inspecting = inspecting
+        if not inspecting:
+            return
+        columns = x_right - x_left + 1
+        if self.history is None or self.history.capacity < len(self.samples):
+            # Let the old pyramid go before making the new one.
+            self.history = None
+            from edgemic.history import History
+            self.history = History(len(self.samples), columns)
+        self.history.hold(self.samples, self.skip_samples, 
+                          self.captured - self.skip_samples, 
+                          self.num_samples_per_px + 1, 
+                          self.start_sample - self.skip_samples)
+        
+    def inspect_event(self, kind, mask):
+        """ Buttons while inspecting. Left zooms in and right out, B pans
+        earlier and A later by a quarter of the screen, and Start goes 
+        back to taking sweeps. Up and down move the trace as usual. """
+        if kind != Button.EVENT_PRESS and kind != Button.EVENT_REPEAT:
+            return
+        history = self.history
+        if mask == Button.BUTTON_LEFT:
+            history.zoom(history.per >> 1)
+        elif mask == Button.BUTTON_RIGHT:
+            history.zoom(history.per << 1)
+        elif mask == Button.BUTTON_B:
+            history.pan(-(history.columns >> 2))
+        elif mask == Button.BUTTON_A:
+            history.pan(history.columns >> 2)
+        elif mask == Button.BUTTON_DOWN:
+            self.increase_offset()
+        elif mask == Button.BUTTON_UP:
+            self.decrease_offset()
+        elif mask == Button.BUTTON_START and kind == Button.EVENT_PRESS:
+            self.set_inspect(False)
+        
+    def display_samples(self):
+        """ The number of samples that fill the screen. """
+        return (1 + self.num_samples_per_px) * (x_right - x_left + 1)
+        
+    def time_per_div_us(self):
+        """ The time across one screen division in us, or None. """
+        rate = self.achieved_rate or self.sample_rate
+        if not rate:
+            return None
+        samples = self.display_samples()
+        if self.inspecting:
+            samples = self.history.per * self.history.columns
+        # us per sample times samples per division, kept under 2**30
+        return (samples * (1000000 // DisplayView.H_DIVISIONS) // int(rate))
+        
+    def trigger_window(self):
+        """ Extra samples taken so there is room to search for a trigger. """
+        if (self.trigger_mode == sensorChannel.TRIGGER_FREE or 
+                self.spectrum_mode):
+            return 0
+        return self.display_samples() >> 1
+        
+    def find_trigger(self, samples, first, last):
+        """ Return the index of the first trigger point, or -1.
+        
+        One linear pass over samples[first:last]. The first loop runs 
+        until the signal is far enough past the level to arm the trigger, 
+        the second continues from there until it crosses the level.
+        """
+        level = self.trigger_level
+        if self.trigger_edge == sensorChannel.TRIGGER_RISING:
+            arm_level = level - self.trigger_hysteresis
+            for idx in range(first, last):
+                if samples[idx] < arm_level:
+                    break
+            else:
+                return -1
+            for idx in range(idx, last):
+                if samples[idx] >= level:
+                    return idx
+        else:
+            arm_level = level + self.trigger_hysteresis
+            for idx in range(first, last):
+                if samples[idx] > arm_level:
+                    break
+            else:
+                return -1
+            for idx in range(idx, last):
+                if samples[idx] <= level:
+                    return idx
+        return -1
+        
+    def start_sweep(self):
+        """ Get ready to take a sweep in steps with sweep_step(). A sweep 
+        is num_samples long when it starts, whatever happens meanwhile. """
+        self.step_count = self.num_samples
+        self.step_index = 0
+        self.step_pending = True
+        
+    def sweep_step(self):
+        """ Take the next part of the sweep. Return True when it is done.
+        
+        Each step is short, so the other tasks can run in between. Here
+        the whole sweep is one step; channels whose sweeps take a while 
+        take theirs a part at a time.
+        """
+        self.take_sweep()
+        return True
+        
+    def trigger(self):
+        """ Align the sweep just taken on its trigger point.
+        
+        Sets sweep_start, which becomes start_sample when the buffers are
+        swapped. Returns False if the sweep should not be shown.
+        """
+        mode = self.trigger_mode
+        self.sweep_start = self.skip_samples
+        self.sweep_aligned = True
+        if mode == sensorChannel.TRIGGER_FREE or self.spectrum_mode:
+            return True
+        if self.trigger_held:
+            return False
+            
+        now = ticks_ms()
+        if (self.trigger_time is not None and 
+                0 <= ticks_diff(now, self.trigger_time) < 
+                self.trigger_holdoff_ms):
+            return False
+            
+        pretrigger = self.pretrigger_px * (1 + self.num_samples_per_px)
+        first = self.skip_samples + pretrigger
+        last = first + self.trigger_window()
+        if last > self.num_samples:
+            last = self.num_samples
+        samples = self.sweep_samples
+        found_level = False
+        if self.trigger_auto_level and last > first:
+            self.level_countdown -= 1
+            if self.level_countdown <= 0:
+                self.set_auto_level(samples, self.skip_samples, last)
+                found_level = True
+        idx = self.find_trigger(samples, first, last)
+        if (idx < 0 and self.trigger_auto_level and last > first and 
+                not found_level):
+            # The signal may have moved away from the level.
+            self.set_auto_level(samples, self.skip_samples, last)
+            idx = self.find_trigger(samples, first, last)
+        if idx < 0:
+            # An auto sweep without a trigger starts anywhere in the signal.
+            self.sweep_aligned = False
+            return mode == sensorChannel.TRIGGER_AUTO
+            
+        self.sweep_start = idx - pretrigger
+        self.trigger_time = now
+        if mode == sensorChannel.TRIGGER_SINGLE:
+            self.trigger_held = True
+        return True
+        
+    def set_auto_level(self, samples, first, last):
+        """ Put the trigger level halfway between the lowest and highest
+        of samples[first:last], as the measurements find their level. 
+        
+        The level, and the hysteresis with it, only move when the halfway
+        point is more than half the hysteresis from the level, so a steady
+        signal triggers at the same point of its waveform every sweep and
+        the trace stands still.
+        """
+        self.level_countdown = sensorChannel.TRIGGER_LEVEL_SWEEPS
+        # min() and max() of a memoryview run without copying the samples.
+        view = memoryview(samples)[first:last]
+        lo = min(view)
+        hi = max(view)
+        hysteresis = (hi - lo) >> 3
+        if hysteresis < sensorChannel.TRIGGER_MIN_HYSTERESIS:
+            hysteresis = sensorChannel.TRIGGER_MIN_HYSTERESIS
+        level = (lo + hi) >> 1
+        if abs(level - self.trigger_level) > (hysteresis >> 1):
+            self.trigger_level = level
+            self.trigger_hysteresis = hysteresis
+        
+    def arm_trigger(self):
+        """ Wait for the next trigger in single mode. """
+        self.trigger_held = False
+        
+    def set_roll_mode(self, roll_mode):
+        """ Turn roll mode on or off. The roll starts again empty. """
+        self.roll_mode = roll_mode
+        if roll_mode:
+            if self.roll is None:
+                self.roll = RollBuffer(x_right - x_left + 1)
+            self.roll.clear()
+            
+    def take_roll(self, budget_ms, max_columns=None):
+        """ Take samples into the roll buffer for about budget_ms.
+        
+        Samples go into the sample buffer, used as a ring. Each time a 
+        column's worth has arrived, its minimum and maximum go into the
+        roll buffer, which is what the view draws. The column also reaches
+        the last sample of the column before it, to keep the trace joined.
+        At most one screen of columns is taken per call, or max_columns.
+        Returns the number of columns taken.
+        """
+        roll = self.roll
+        ring = self.samples
+        ring_size = len(ring)
+        pos = roll.pos
+        last = roll.last
+        per = self.num_samples_per_px + 1
+        read = self.read_sample
+        started = ticks_ms()
+        
+        if last is None:
+            last = read()
+        if max_columns is None or max_columns > roll.columns:
+            max_columns = roll.columns
+        taken = 0
+        while taken < max_columns:
+            lo = last
+            hi = last
+            for _ in range(per):
+                s = read()
+                ring[pos] = s
+                pos += 1
+                if pos == ring_size:
+                    pos = 0
+                if s < lo:
+                    lo = s
+                elif s > hi:
+                    hi = s
+            last = s
+            roll.add(lo, hi)
+            taken += 1
+            if ticks_diff(ticks_ms(), started) >= budget_ms:
+                break
+        roll.pos = pos
+        roll.last = last
+        return taken
+        
+    def set_spectrum_mode(self, spectrum_mode):
+        """ Turn spectrum mode on or off. """
+        self.spectrum_mode = spectrum_mode
+        if spectrum_mode and self.spectrum_db is None:
+            self.spectrum_db = array.array('h', [0] * (x_right - x_left + 1))
+        self.calc_num_samples()
+        
+    def take_spectrum(self):
+        """ Work out spectrum_db from the sweep just taken, in place. """
+        if self.spectrum is None or self.spectrum.size != self.fft_size:
+            # Let the old tables go before making the new ones.
+            self.spectrum = None
+            from edgemic.spectrum import Spectrum
+            self.spectrum = Spectrum(self.fft_size)
+        self.spectrum.levels(self.sweep_samples, self.skip_samples, 
+                             self.spectrum_db)
+        
+    def set_trigger_mode(self, mode):
+        self.trigger_mode = mode
+        self.arm_trigger()
+        self.calc_num_samples()
+        
+    def next_trigger_mode(self):
+        mode = self.trigger_mode + 1
+        if mode == len(sensorChannel.TRIGGER_NAMES):
+            mode = sensorChannel.TRIGGER_FREE
+        self.set_trigger_mode(mode)
+        
+    def next_trigger_edge(self):
+        if self.trigger_edge == sensorChannel.TRIGGER_RISING:
+            self.trigger_edge = sensorChannel.TRIGGER_FALLING
+        else:
+            self.trigger_edge = sensorChannel.TRIGGER_RISING
+            
+    def move_trigger_level(self, step):
+        """ Move the trigger level up the screen by step steps of 
+        TRIGGER_LEVEL_STEP_PX, from where the sweep last put it. The 
+        level stays there until the next preset. """
+        self.trigger_auto_level = False
+        level = (self.trigger_level + 
+                 step * (sensorChannel.TRIGGER_LEVEL_STEP_PX << 
+                         self.vertical_gain))
+        if level < 0:
+            level = 0
+        elif level > 65535:
+            level = 65535
+        self.trigger_level = level
+        
+    def preset(self):
+        self.vertical_offset = 64
+        self.num_samples_per_px = 2
+        self.vertical_gain = 5
+        self.fft_size = 1024
+        self.trigger_auto_level = True
+        self.level_countdown = 0
+        self.calc_num_samples()
+     
+    def increase_gain(self):
+        if self.vertical_gain < self.max_gain_limit:
+            self.vertical_gain += self.gain_increment
+            
+    def decrease_gain(self):
+        if self.vertical_gain > self.min_gain_limit:
+            self.vertical_gain -= self.gain_increment
+            
+    def increase_offset(self):
+        if (self.vertical_offset <= self.max_vertical_offset_limit +
+                                    self.vertical_offset_increment):
+            self.vertical_offset += self.vertical_offset_increment
+            
+    def decrease_offset(self):
+        if (self.vertical_offset >= self.min_vertical_offset_limit -
+                                    self.vertical_offset_increment):
+            self.vertical_offset -= self.vertical_offset_increment
+            
+    def increase_samples(self):
+        if self.spectrum_mode:
+            if self.fft_size > self.min_fft_size:
+                self.fft_size >>= 1
+                self.calc_num_samples()
+        elif self.num_samples_per_px > self.min_samples_per_px:
+            self.num_samples_per_px -= self.samples_per_px_increment
+            self.calc_num_samples()
+
+    def decrease_samples(self):
+        if self.spectrum_mode:
+            if self.fft_size < self.max_fft_size:
+                self.fft_size <<= 1
+                self.calc_num_samples()
+        elif self.num_samples_per_px < self.max_samples_per_px:
+            self.num_samples_per_px += self.samples_per_px_increment
+            self.calc_num_samples()
+            
+    def calc_num_samples(self, window_ms=None):
+        """ Size the sweep: the skipped samples, the screen and the
+        trigger search window.
+        
+        With window_ms, first pick the samples per pixel that put about
+        that much time across the screen at the channel's sample rate.
+        """
+        if window_ms is not None and self.sample_rate:
+            columns = x_right - x_left + 1
+            per = ((window_ms * self.sample_rate + 500 * columns) // 
+                   (1000 * columns))
+            spp = per - 1
+            if spp > self.max_samples_per_px:
+                spp = self.max_samples_per_px
+            elif spp < self.min_samples_per_px:
+                spp = self.min_samples_per_px
+            self.num_samples_per_px = spp
+            
+        if self.spectrum_mode:
+            nsamp = self.skip_samples + self.fft_size
+        else:
+            nsamp = self.skip_samples + self.display_samples() \
+                    + self.trigger_window()
+        if nsamp > self.max_num_samples:
+            self.num_samples = self.max_num_samples
+        elif nsamp < self.min_num_samples:
+            self.num_samples = self.min_num_samples
+        else:
+            self.num_samples = nsamp
+
+    def button_event(self, kind, mask):
+        """ Act on an event from Button.get_event().
+        
+        The gain, offset and sweep buttons act when pressed, and again
+        each time they repeat. A and B together turn roll mode on and off,
+        on channels that can roll. Up and Left together step through the
+        acquisition modes, and Down and Left through the decimation filters.
+        Up and Right together stop to inspect the sweep, and go on again.
+        B and Left together step through the trigger modes, B and Right 
+        switch the trigger edge, and B with Up or Down moves the trigger
+        level, until Start restores the defaults.
+        """
+        if kind == Button.EVENT_CHORD:
+            if mask == Button.BUTTON_UP | Button.BUTTON_RIGHT:
+                self.set_inspect(not self.inspecting)
+            elif self.inspecting:
+                # The other chords would change how sweeps are taken.
+                pass
+            elif (mask == Button.BUTTON_A | Button.BUTTON_B and 
+                    hasattr(self, 'read_sample')):
+                self.set_roll_mode(not self.roll_mode)
+            elif mask == Button.BUTTON_UP | Button.BUTTON_LEFT:
+                self.next_acquire_mode()
+            elif mask == Button.BUTTON_DOWN | Button.BUTTON_LEFT:
+                self.next_decimation()
+            elif not self.TRIGGER_CONTROLS:
+                pass
+            elif mask == Button.BUTTON_B | Button.BUTTON_LEFT:
+                self.next_trigger_mode()
+            elif mask == Button.BUTTON_B | Button.BUTTON_RIGHT:
+                self.next_trigger_edge()
+            elif mask == Button.BUTTON_B | Button.BUTTON_UP:
+                self.move_trigger_level(1)
+            elif mask == Button.BUTTON_B | Button.BUTTON_DOWN:
+                self.move_trigger_level(-1)
+            return
+        if kind == Button.EVENT_RELEASE:
+            return
+        if self.inspecting:
+            self.inspect_event(kind, mask)
+            return
+        if mask == Button.BUTTON_A:
+            self.increase_gain()
+        elif mask == Button.BUTTON_B:
+            self.decrease_gain()
+        elif mask == Button.BUTTON_DOWN:
+            self.increase_offset()
+        elif mask == Button.BUTTON_UP:
+            self.decrease_offset()
+        elif mask == Button.BUTTON_LEFT:
+            self.increase_samples()        
+        elif mask == Button.BUTTON_RIGHT:
+            self.decrease_samples()
+        elif mask == Button.BUTTON_START and kind == Button.EVENT_PRESS:
+            # Start re-arms a held single trigger, otherwise restores defaults.
+            if self.trigger_held:
+                self.arm_trigger()
+            else:
+                self.preset()
+
+class RollBuffer(object):
+    """ Ring of column minimum/maximum pairs for roll mode. """
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.lo = array.array('H', [0] * columns)
+        self.hi = array.array('H', [0] * columns)
+        self.clear()
+        
+    def clear(self):
+        # head is the slot for the next column, count the columns filled.
+        self.head = 0
+        self.count = 0
+        # Where the next raw sample goes in the channel's sample ring,
+        # and the last sample taken.
+        self.pos = 0
+        self.last = None
+        
+    def add(self, lo, hi):
+        self.lo[self.head] = lo
+        self.hi[self.head] = hi
+        self.head += 1
+        if self.head == self.columns:
+            self.head = 0
+        if self.count < self.columns:
+            self.count += 1
+
+# Under the scheduler, a roll is taken this long at a time.
+ROLL_STEP_MS = const(10)
+
+def sweeps_due(traces):
+    """ Whether any channel on the screen takes samples this frame. 
+    A held single trigger, and a sweep being inspected, stay on the 
+    screen. """
+    for channel in traces:
+        if channel.roll_mode or not (channel.trigger_held or 
+                                     channel.inspecting):
+            return True
+    return False
+
+def start_sweeps(traces):
+    """ Start a sweep in steps on every channel on the screen that takes
+    one this frame. """
+    for channel in traces:
+        if channel.roll_mode or not (channel.trigger_held or 
+                                     channel.inspecting):
+            channel.start_sweep()
+
+def step_sweeps(traces, started, budget_ms):
+    """ Take one step of each sweep started. Rolling channels roll for 
+    ROLL_STEP_MS, until budget_ms from started or a whole screen. 
+    Returns True when they are all done. Stepping the channels in turn
+    takes sweeps side by side. """
+    done = True
+    for channel in traces:
+        if not channel.step_pending:
+            continue
+        if channel.inspecting:
+            # Stopped part way: the rest would write over the sweep held.
+            channel.step_pending = False
+        elif channel.roll_mode:
+            channel.step_index += channel.take_roll(
+                    ROLL_STEP_MS, channel.roll.columns - channel.step_index)
+            if (channel.step_index < channel.roll.columns and 
+                    ticks_diff(ticks_ms(), started) < budget_ms):
+                done = False
+            else:
+                channel.step_pending = False
+        elif channel.sweep_step():
+            channel.step_pending = False
+        else:
+            done = False
+    return done
@@ -0,0 +1,55 @@
+"""
+The clock, the graph's place on the screen and the modes the modules
+share.
+"""
+
+import time
+
+from micropython import const
+
+# A millisecond clock that wraps at 2**29, so its values are small
+# integers and reading it allocates nothing, unlike time.monotonic_ns(). 
+# supervisor.ticks_ms() is CircuitPython 7's; before that, it is made 
+# from monotonic_ns().
+TICKS_PERIOD = const(1 << 29)
+TICKS_MASK = const((1 << 29) - 1)
+try:
+    from supervisor import ticks_ms
+except ImportError:
+    def ticks_ms():
+        return (time.monotonic_ns() // 1000000) & TICKS_MASK
+        
+def ticks_diff(end, start):
+    """ end - start in ms, for ticks less than half a period apart. """
+    diff = (end - start) & TICKS_MASK
+    if diff >= TICKS_PERIOD >> 1:
+        diff -= TICKS_PERIOD
+    return diff
+
+# The bounds of the graph on the 160 by 128 display. Positive y is down,
+# positive x is right.
+x_left = 10
+x_right = 140
+y_bottom = 114
+y_top = 14
+
+# Averaging and peak hold, and decimation, are off in mode 0. These are 
+# Accumulator.MODE_OFF and MODE_PEAK and Decimator.FILTER_NONE, for the
+# channels and the view to check before those are imported.
+ACQUIRE_OFF = const(0)
+ACQUIRE_PEAK = const(3)
+FILTER_NONE = const(0)
+
+# The unit each channel's measurements are shown in, by CHANNEL_ID, as
+# (UNIT, UNIT_PER_COUNT, UNIT_ZERO): a level is (sample - UNIT_ZERO) *
+# UNIT_PER_COUNT. They are here so a replay can show the unit of the
+# channel it was recorded from without importing it.
+UNITS = {
+    # The microphone, in % of full scale
+    1: ('%', 100 / 32768, 32768),
+    # The light sensor, in volts at the ADC
+    2: ('V', 3.3 / 65536, 0),
+    # The generator, like the microphone
+    3: ('%', 100 / 32768, 32768),
+    # The accelerometer, in g, from 25 counts per m/s^2 summed over the axes
+    4: ('g', 1 / (25 * 9.806), 32768)}
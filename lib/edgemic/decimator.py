@@ -0,0 +1,190 @@
+"""
+Decimation filters. Imported when a filter is first chosen.
+"""
+
+import array
+import math
+
+from micropython import const
+
+class Decimator(object):
+    """ Filters a sweep down to one sample per column, in place.
+    
+    When there are several samples per column, plotting them all shows
+    whatever frequencies the columns cannot resolve as aliases, or, as 
+    an envelope, as a thick band. Decimation low-pass filters the sweep 
+    and keeps one value per column, written over the start of the 
+    column samples: column c of the screen is samples[start + c]. The 
+    result is a sweep with one sample per pixel at 1/per of the rate.
+    Every raw sample is read before anything is written over it, and the
+    filtering is integer math only.
+    
+      BOXCAR: the mean of the column's samples.
+      CIC:    a third order cascaded integrator-comb filter, decimating 
+              by per. Its stopband nulls fall on every multiple of the 
+              new sample rate, and it is a boxcar applied three times, 
+              with no multiplies. Integrators wrap at CIC_BITS, as in 
+              hardware, and samples are shifted down first when per**3 
+              would not fit.
+      FIR:    a Hamming windowed sinc, cut off at 0.4 of the new rate, 
+              about three columns long, with FIR_BITS fixed point taps 
+              made once for each per. Each column is written two 
+              columns late, when nothing left to filter reads it.
+              
+    CIC and FIR reach into the columns on both sides of the one they 
+    write, so each column is centered on its own samples and the trigger
+    point stays put. Before the sweep the first sample is repeated, and 
+    past its end the last, so the samples ahead of start are never read.
+    """
+    
+    FILTER_NONE = const(0)
+    FILTER_BOXCAR = const(1)
+    FILTER_CIC = const(2)
+    FILTER_FIR = const(3)
+    FILTER_NAMES = ('', 'BOX', 'CIC', 'FIR')
+    
+    CIC_BITS = const(28)
+    # The FIR taps are fixed point with this many fraction bits, which 
+    # keeps a sum of taps times samples under 2**30.
+    FIR_BITS = const(13)
+    # Passband edge of the FIR, as a fraction of the new Nyquist rate
+    FIR_CUTOFF = 0.8
+    
+    def __init__(self):
+        self.fir_per = 0
+        self.taps = None
+        
+    def run(self, mode, samples, start, num_samples, per, columns):
+        """ Decimate the sweep from start by per. Return the number of
+        columns written. """
+        count = (num_samples - start) // per
+        if count > columns:
+            count = columns
+        if count <= 0:
+            return 0
+        if mode == Decimator.FILTER_BOXCAR:
+            self.boxcar(samples, start, per, count)
+        elif mode == Decimator.FILTER_CIC:
+            self.cic(samples, start, num_samples, per, count)
+        else:
+            self.fir(samples, start, num_samples, per, count)
+        return count
+        
+    def boxcar(self, samples, start, per, count):
+        idx = start
+        for col in range(count):
+            total = 0
+            for i in range(idx, idx + per):
+                total += samples[i]
+            samples[start + col] = total // per
+            idx += per
+            
+    def cic(self, samples, start, num_samples, per, count):
+        # The comb output is at most 2**15 * per**3 from zero. Find the 
+        # shift that keeps that inside the wrapping integrators.
+        gain = per * per * per
+        shift = 0
+        while (gain << (15 - shift)) >= (1 << (Decimator.CIC_BITS - 1)):
+            shift += 1
+        mask = (1 << Decimator.CIC_BITS) - 1
+        half = 1 << (Decimator.CIC_BITS - 1)
+        wrap = 1 << Decimator.CIC_BITS
+        i1 = 0
+        i2 = 0
+        i3 = 0
+        c1 = 0
+        c2 = 0
+        c3 = 0
+        last = num_samples - 1
+        # The integrators start one column before the first, so the 
+        # combs are primed when the first column's output is due.
+        idx = start - per
+        for col in range(-1, count + 1):
+            if idx >= start and idx + per <= num_samples:
+                for i in range(idx, idx + per):
+                    i1 = (i1 + ((samples[i] - 32768) >> shift)) & mask
+                    i2 = (i2 + i1) & mask
+                    i3 = (i3 + i2) & mask
+            else:
+                for i in range(idx, idx + per):
+                    if i < start:
+                        i = start
+                    elif i > last:
+                        i = last
+                    i1 = (i1 + ((samples[i] - 32768) >> shift)) & mask
+                    i2 = (i2 + i1) & mask
+                    i3 = (i3 + i2) & mask
+            idx += per
+            d1 = (i3 - c1) & mask
+            c1 = i3
+            d2 = (d1 - c2) & mask
+            c2 = d1
+            y = (d2 - c3) & mask
+            c3 = d2
+            # The output after column col is centred on column col - 1.
+            if col >= 1:
+                if y >= half:
+                    y -= wrap
+                samples[start + col - 1] = 32768 + ((y // gain) << shift)
+                
+    def make_taps(self, per):
+        """ The FIR taps for a decimation of per, summing to 2**FIR_BITS. """
+        half = (3 * per) >> 1
+        size = 2 * half + 1
+        cutoff = Decimator.FIR_CUTOFF * 0.5 / per
+        weights = []
+        for k in range(size):
+            x = k - half
+            if x == 0:
+                w = 2 * cutoff
+            else:
+                w = math.sin(2 * math.pi * cutoff * x) / (math.pi * x)
+            w *= 0.54 + 0.46 * math.cos(math.pi * x / (half + 1))
+            weights.append(w)
+        total = sum(weights)
+        one = 1 << Decimator.FIR_BITS
+        taps = array.array('h', [int(round(one * w / total)) 
+                                 for w in weights])
+        # Rounding is taken up by the center tap, so DC gain is exact.
+        taps[half] += one - sum(taps)
+        self.taps = taps
+        self.fir_per = per
+        
+    def fir(self, samples, start, num_samples, per, count):
+        if per != self.fir_per:
+            self.make_taps(per)
+        taps = self.taps
+        size = len(taps)
+        bits = Decimator.FIR_BITS
+        last = num_samples - 1
+        first = start + ((per - 1) >> 1) - (size >> 1)
+        # Column c is written two columns later, when no column still to
+        # be filtered reads that far back.
+        held1 = 0
+        held2 = 0
+        for col in range(count):
+            total = 0
+            if first >= start and first + size <= num_samples:
+                for k in range(size):
+                    total += taps[k] * samples[first + k]
+            else:
+                for k in range(size):
+                    i = first + k
+                    if i < start:
+                        i = start
+                    elif i > last:
+                        i = last
+                    total += taps[k] * samples[i]
+            value = total >> bits
+            if value < 0:
+                value = 0
+            elif value > 65535:
+                value = 65535
+            if col >= 2:
+                samples[start + col - 2] = held2
+            held2 = held1
+            held1 = value
+            first += per
+        if count >= 2:
+            samples[start + count - 2] = held2
+        samples[start + count - 1] = held1
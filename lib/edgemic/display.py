@@ -0,0 +1,856 @@
+"""
+The screen and the neopixels.
+"""
+
+import array
+
+import displayio
+import neopixel
+import terminalio
+from adafruit_display_text.label import Label
+from micropython import const
+
+from edgemic.common import (ACQUIRE_OFF, ACQUIRE_PEAK, FILTER_NONE, 
+                            x_left, x_right, y_bottom, y_top)
+
+# Bulk bitmap writes, on boards whose CircuitPython has bitmaptools
+try:
+    import bitmaptools
+except ImportError:
+    bitmaptools = None
+# Array math, on boards whose CircuitPython has ulab
+try:
+    from ulab import numpy as np
+except ImportError:
+    np = None
+
+class TraceLayer(object):
+    """ What the view drew for one trace, so it can be changed or erased.
+    
+    Envelope, roll and spectrum traces keep the span drawn in each column.
+    Dot traces keep the y of every dot, dot_per dots to a column.
+    """
+    
+    def __init__(self, columns):
+        self.trace_mode = DisplayView.TRACE_DOTS
+        self.trace_color = 1
+        self.span_top = array.array('B', [DisplayView.SPAN_EMPTY] * columns)
+        self.span_bottom = array.array('B', [0] * columns)
+        self.dot_ys = bytearray(0)
+        self.dot_ys_next = bytearray(0)
+        self.dot_count = 0
+        self.dot_per = 1
+        # Cleared when the layer is erased, so erasing it again is free
+        self.drawn = False
+        
+    def forget(self):
+        """ Forget the trace, once the bitmap has been cleared. """
+        for col in range(len(self.span_top)):
+            self.span_top[col] = DisplayView.SPAN_EMPTY
+            self.span_bottom[col] = 0
+        self.dot_count = 0
+        self.drawn = False
+
+class DisplayView(object):
+    
+    # Trace rendering modes, selected per channel by channel.trace_mode
+    TRACE_DOTS = const(0)
+    TRACE_ENVELOPE = const(1)
+    # Used for channels in roll mode, whatever their trace mode
+    TRACE_ROLL = const(2)
+    # Used for channels in spectrum mode
+    TRACE_SPECTRUM = const(3)
+    # Used for channels in peak hold
+    TRACE_PEAK = const(4)
+    # Used for channels inspecting a held sweep
+    TRACE_INSPECT = const(5)
+    
+    # The color of each trace when several are on the screen at once:
+    # green, then amber.
+    TRACE_COLORS = (1, 3)
+    
+    # Spectrum bars go down from 0dB at the top of the graph.
+    SPECTRUM_PX_PER_DB = const(1)
+    
+    # Top of a column span with nothing drawn. It is below the bottom.
+    SPAN_EMPTY = const(255)
+    
+    # The width of the graph is ten divisions, for time/div. The 
+    # graticule also splits the height in four, and has a dot every 
+    # GRATICULE_STEP pixels along its lines.
+    H_DIVISIONS = const(10)
+    V_DIVISIONS = const(4)
+    GRATICULE_STEP = const(4)
+    
+    # What the status line shows of the measurements: nothing (the 
+    # timebase), the levels, or the timing
+    MEASURE_OFF = const(0)
+    MEASURE_LEVELS = const(1)
+    MEASURE_TIMING = const(2)
+    # Frames between measurements shown
+    MEASURE_FRAMES = const(8)
+    
+    # Setting a label's text makes a string and redraws the label, so 
+    # labels only change when what they show does. Texts made for the 
+    # sweep time are kept to use again, up to this many.
+    TEXT_CACHE_SIZE = const(32)
+    # The sweep time shown while a sweep is held to inspect
+    SWEEP_STOPPED = const(-2)
+    
+    # Without array math, samples are mapped to y through a table indexed
+    # by sample >> gain. Below this gain the table would be over 4KB, so 
+    # each sample is scaled on its own instead.
+    LUT_MIN_GAIN = const(4)
+    
+    def __init__(self, display):
+        # To synchronize the display update to the waveform update,
+        # turn off automatic display refresh.
+        # Explicit refresh functions update the display.
+        # The display refresh feature requires CircuitPython v5.0.0 or later.
+        
+        self.display = display
+        display.auto_refresh = False
+         
+        # The display width is 160 and the height is 128
+        #   Positive y is down
+        #   Positive x is right
+        
+        # Define the bounds of the annotation
+        y_annot_top = 5
+        y_annot_bottom = 123
+        
+        # The traces are drawn in a bitmap the size of the graph, with 
+        # (0, 0) at its top left, so only the graph is written to and 
+        # pushed to the display. Up to 4 colors take 2 bits a pixel, 
+        # 3.3kB; a fifth would double it.
+        self.columns = x_right - x_left + 1
+        self.rows = y_bottom - y_top + 1
+        ncolors = 4
+        self.bitmap = displayio.Bitmap(self.columns, self.rows, ncolors)
+         
+        # Create a color palette. Color 0 is see-through, so the 
+        # graticule shows between the traces.
+        palette = displayio.Palette(ncolors)
+        palette[0] = 0x000000
+        palette[1] = 0x00ff00
+        palette[2] = 0xaaaaaa
+        palette[3] = 0xffa000
+        palette.make_transparent(0)
+        self.palette = palette
+        
+        # The frame around the graph and the graticule never change. They
+        # are drawn once, in a bitmap of their own under the traces, at 
+        # one bit a pixel.
+        self.grid = displayio.Bitmap(self.columns + 2, self.rows + 2, 2)
+        grid_palette = displayio.Palette(2)
+        grid_palette[0] = 0x000000
+        grid_palette[1] = palette[2]
+        self.draw_graticule()
+         
+        # Create a Group with the graticule, then the traces on top
+        group = displayio.Group()
+        group.append(displayio.TileGrid(self.grid, pixel_shader=grid_palette,
+                                        x=x_left - 1, y=y_top - 1))
+        group.append(displayio.TileGrid(self.bitmap, pixel_shader=palette,
+                                        x=x_left, y=y_top))
+         
+        # Add the Group to the Display
+        self.display.show(group)
+        
+        # Draw labels to annotate the display
+        self.st_label = Label(terminalio.FONT, text='*', max_glyphs=30)
+        self.st_label.x = x_left
+        self.st_label.y = y_annot_top
+        self.st_label.color = palette[1]
+        group.append(self.st_label)
+        
+        self.dt_label = Label(terminalio.FONT, text='LIGHT', max_glyphs=30)
+        self.dt_label.x = x_right - self.dt_label.bounding_box[2]
+        self.dt_label.y = y_annot_top
+        self.dt_label.color = palette[1]
+        group.append(self.dt_label)
+        
+        self.status_label = Label(terminalio.FONT, text='EDGEMICSCOPE', max_glyphs=30)
+        self.status_label.x = x_left
+        self.status_label.y = y_annot_bottom
+        self.status_label.color = palette[1]
+        group.append(self.status_label)        
+        # The time/div and sample rate on the status line, if it shows them
+        self.timebase_shown = False
+        self.timebase_us = None
+        self.timebase_rate = None
+        self.timebase_spectrum = False
+        self.measure_page = DisplayView.MEASURE_OFF
+        # The name and acquisition mode at the top right
+        self.name_shown = None
+        self.mode_shown = None
+        self.decimation_shown = None
+        self.trigger_shown = None
+        # The sweep time at the top left, and its texts by ms
+        self.sweep_ms = None
+        self.sweep_texts = {}
+        
+        # What each trace drew last frame, used to change or erase it.
+        # layer is the one being drawn.
+        self.layers = [TraceLayer(self.columns)]
+        self.layer = self.layers[0]
+        # Scratch space to compare the old and new dots in one column
+        self.mark = bytearray(self.rows)
+        
+        # The gain, offset and midscale the sample to y mapping is for
+        self.map_gain = None
+        self.map_offset = None
+        self.map_midscale = None
+        self.lut = None
+
+    def draw_graticule(self):
+        """ Draw the frame around the graph, and dotted lines between the
+        divisions inside it. """
+        grid = self.grid
+        right = self.columns + 1
+        bottom = self.rows + 1
+        for x in range(right + 1):
+            grid[x, 0] = 1
+            grid[x, bottom] = 1
+        for y in range(1, bottom):
+            grid[0, y] = 1
+            grid[right, y] = 1
+        step = DisplayView.GRATICULE_STEP
+        for div in range(1, DisplayView.H_DIVISIONS):
+            x = 1 + div * self.columns // DisplayView.H_DIVISIONS
+            for y in range(1 + step, bottom, step):
+                grid[x, y] = 1
+        for div in range(1, DisplayView.V_DIVISIONS):
+            y = 1 + div * self.rows // DisplayView.V_DIVISIONS
+            for x in range(1 + step, right, step):
+                grid[x, y] = 1
+        
+    def show_name(self, channel, color_idx=1):
+        """ Show the channel name at the top right, if it has changed, in
+        the color of its trace, and the acquisition mode and decimation 
+        filter if it has them. A trigger other than auto on a rising edge
+        is shown after the name, with / for rising and \\ for falling, 
+        and HELD while a single trigger holds its sweep. """
+        name = channel.name
+        mode = channel.acquire_mode
+        decimation = channel.decimation
+        # The trigger mode, edge and hold in one number, 4 for the 
+        # default of auto on a rising edge
+        trigger = 4
+        if channel.TRIGGER_CONTROLS:
+            trigger = (channel.trigger_mode << 2 | channel.trigger_edge << 1 
+                       | channel.trigger_held)
+        if (name is not self.name_shown or mode != self.mode_shown or
+                decimation != self.decimation_shown or 
+                trigger != self.trigger_shown):
+            self.name_shown = name
+            self.mode_shown = mode
+            self.decimation_shown = decimation
+            self.trigger_shown = trigger
+            if trigger != 4:
+                if channel.trigger_held:
+                    name = name + ' HELD'
+                else:
+                    name = name + ' ' + channel.TRIGGER_NAMES[trigger >> 2]
+                    if trigger >= 4:
+                        name = name + ('\\' if channel.trigger_edge else '/')
+            if mode != ACQUIRE_OFF:
+                from edgemic.accumulator import Accumulator
+                name = name + ' ' + Accumulator.MODE_NAMES[mode]
+            if decimation != FILTER_NONE:
+                from edgemic.decimator import Decimator
+                name = name + ' ' + Decimator.FILTER_NAMES[decimation]
+            self.dt_label.text = name
+            self.dt_label.x = x_right - self.dt_label.bounding_box[2]
+        color = self.palette[color_idx]
+        if self.dt_label.color != color:
+            self.dt_label.color = color
+            
+    def show_timebase(self, channel):
+        """ Show the time/div and sample rate of a channel's sweeps.
+        
+        The label only changes when they do. In spectrum mode it shows
+        the frequency/div and the width of an FFT bin instead. Channels 
+        without a timebase, and roll mode, show the name of the scope.
+        """
+        us = None
+        rate = None
+        if channel is not None and not channel.roll_mode:
+            us = channel.time_per_div_us()
+            rate = channel.achieved_rate or channel.sample_rate
+        spectrum = (channel is not None and channel.spectrum_mode and 
+                    rate is not None)
+        if spectrum:
+            us = channel.fft_size
+        if (self.timebase_shown and us == self.timebase_us and 
+                rate == self.timebase_rate and 
+                spectrum == self.timebase_spectrum):
+            return
+        self.timebase_shown = True
+        self.timebase_us = us
+        self.timebase_rate = rate
+        self.timebase_spectrum = spectrum
+        if spectrum:
+            text = '%dHz/div %dHz/bin' % (
+                    rate // (2 * DisplayView.H_DIVISIONS), rate // us)
+        elif us is None:
+            text = 'EDGEMICSCOPE'
+        elif us >= 10000:
+            text = '%dms/div' % (us // 1000)
+        elif us >= 1000:
+            text = '%d.%dms/div' % (us // 1000, us % 1000 // 100)
+        else:
+            text = '%dus/div' % us
+        if rate and not spectrum:
+            text += ' %dHz' % rate
+        self.status_label.text = text
+        
+    def next_measure_page(self):
+        self.measure_page += 1
+        if self.measure_page > DisplayView.MEASURE_TIMING:
+            self.measure_page = DisplayView.MEASURE_OFF
+        self.timebase_shown = False
+        
+    def show_sweep_time(self, ms):
+        """ Show how long the last sweep took at the top left: ms, or 
+        None in roll mode, SWEEP_STOPPED inspecting, or -1 when it is not 
+        known yet. """
+        if ms == self.sweep_ms:
+            return
+        self.sweep_ms = ms
+        if ms is None:
+            text = 'ROLL'
+        elif ms == DisplayView.SWEEP_STOPPED:
+            text = 'STOP'
+        elif ms < 0:
+            text = 'ST: *ms'
+        else:
+            text = self.sweep_texts.get(ms)
+            if text is None:
+                if len(self.sweep_texts) == DisplayView.TEXT_CACHE_SIZE:
+                    self.sweep_texts.clear()
+                text = 'ST: %dms' % ms
+                self.sweep_texts[ms] = text
+        self.st_label.text = text
+        
+    def show_measurements(self, channel):
+        """ Show a channel's last measurements on the status line.
+        
+        The levels page has the peak-to-peak, mean and RMS in the
+        channel's unit, the timing page the frequency, period and duty 
+        cycle. Values that could not be measured show as --.
+        """
+        m = channel.measurements
+        if m is None or m.mean is None:
+            text = '--'
+        elif self.measure_page == DisplayView.MEASURE_LEVELS:
+            per = channel.UNIT_PER_COUNT
+            text = 'pp%.3g av%.3g rms%.3g%s' % (
+                    (m.hi - m.lo) * per, (m.mean - channel.UNIT_ZERO) * per,
+                    m.rms * per, channel.UNIT)
+        elif m.frequency is None:
+            text = '--Hz'
+        else:
+            text = '%.4gHz %.3gms %d.%d%%' % (
+                    m.frequency / 10, 10000 / m.frequency, 
+                    m.duty // 10, m.duty % 10)
+        if text != self.status_label.text:
+            self.status_label.text = text
+        
+    def draw_trace(self, color_idx, channel, layer_idx=0):
+        """Draw the channel's trace, replacing the trace drawn before"""
+        
+        """The view keeps what it drew last frame for each column, so
+        only pixels that differ from the new trace are written. There is 
+        no second pass to erase the trace, and erasing does not depend on
+        the channel settings, which may have changed since the last frame.
+        Each trace on the screen at once has its own layer.
+        """
+        layer = self.layers[layer_idx]
+        self.layer = layer
+        trace_mode = channel.trace_mode
+        if channel.inspecting:
+            trace_mode = DisplayView.TRACE_INSPECT
+        elif channel.roll_mode:
+            trace_mode = DisplayView.TRACE_ROLL
+        elif channel.spectrum_mode:
+            trace_mode = DisplayView.TRACE_SPECTRUM
+        elif channel.acquire_mode == ACQUIRE_PEAK:
+            trace_mode = DisplayView.TRACE_PEAK
+        if trace_mode != layer.trace_mode or color_idx != layer.trace_color:
+            self.erase_trace()
+            layer.trace_mode = trace_mode
+            layer.trace_color = color_idx
+        layer.drawn = True
+        if trace_mode == DisplayView.TRACE_INSPECT:
+            self.draw_inspect(color_idx, channel, channel.history)
+        elif trace_mode == DisplayView.TRACE_ROLL:
+            self.draw_roll(color_idx, channel, channel.roll)
+        elif trace_mode == DisplayView.TRACE_PEAK:
+            self.draw_roll(color_idx, channel, channel.accumulator.peak)
+        elif trace_mode == DisplayView.TRACE_SPECTRUM:
+            self.draw_spectrum(color_idx, channel)
+        elif trace_mode == DisplayView.TRACE_ENVELOPE:
+            self.draw_envelope(color_idx, channel)
+        else:
+            self.draw_dots(color_idx, channel)
+            
+    def draw_traces(self, channels):
+        """Draw several channels' traces, each in its own color"""
+        
+        """Where two traces cross, a pixel belongs to both, so changing 
+        one trace pixel by pixel would cut holes in the other. With more 
+        than one trace on the screen, now or last frame, every layer is 
+        erased first and each trace is then drawn in full. A single trace
+        is drawn pixel by pixel as usual.
+        """
+        self.start_draw(channels)
+        for idx in range(len(channels)):
+            self.draw_trace(DisplayView.TRACE_COLORS[idx], channels[idx], idx)
+            
+    def start_draw(self, channels):
+        """ Get ready to draw these channels' traces, one draw_trace() 
+        each, erasing every layer if they have to be drawn in full. The 
+        render task draws a trace per step this way. """
+        count = len(channels)
+        while len(self.layers) < count:
+            self.layers.append(TraceLayer(self.columns))
+        redraw = count > 1
+        for layer_idx in range(count, len(self.layers)):
+            if self.layers[layer_idx].drawn:
+                redraw = True
+        if redraw:
+            drawn = False
+            for layer in self.layers:
+                if layer.drawn:
+                    drawn = True
+                    layer.forget()
+            if drawn:
+                self.bitmap.fill(0)
+                
+    def refresh_step(self):
+        """ Try to refresh the display, without waiting. Returns False
+        when it is too soon after the last refresh. """
+        return self.display.refresh(minimum_frames_per_second=0)
+        
+    def erase_trace(self):
+        """Erase the trace drawn last, using the column cache"""
+        
+        """When no other trace is on the screen, the whole bitmap is 
+        cleared in one write. Otherwise each column's span is cleared, 
+        and each dot.
+        """
+        layer = self.layer
+        if not layer.drawn:
+            return
+        for other in self.layers:
+            if other is not layer and other.drawn:
+                break
+        else:
+            self.bitmap.fill(0)
+            layer.forget()
+            return
+        layer.drawn = False
+        bitmap = self.bitmap
+        tops = layer.span_top
+        bottoms = layer.span_bottom
+        for col in range(self.columns):
+            if tops[col] <= bottoms[col]:
+                if bitmaptools is not None:
+                    bitmaptools.fill_region(bitmap, col, tops[col], col + 1,
+                                            bottoms[col] + 1, 0)
+                else:
+                    for y in range(tops[col], bottoms[col] + 1):
+                        bitmap[col, y] = 0
+            tops[col] = DisplayView.SPAN_EMPTY
+            bottoms[col] = 0
+        ys = layer.dot_ys
+        per = layer.dot_per
+        for idx in range(layer.dot_count):
+            bitmap[idx // per, ys[idx]] = 0
+        layer.dot_count = 0
+            
+    def set_mapping(self, channel):
+        """ Get ready to map the channel's samples to y.
+        
+        y = vertical_offset - ((sample - adc_midscale) >> vertical_gain),
+        limited to the graph. y is on the screen, and the rows of the 
+        trace bitmap start at y_top. The lookup table is only built again
+        when the gain, offset or midscale changes. It is a run of the 
+        bottom row, a slope one pixel per entry, then a run of row 0, so
+        it is built from slices.
+        """
+        gain = channel.vertical_gain
+        offset = channel.vertical_offset
+        midscale = channel.adc_midscale
+        if (gain == self.map_gain and offset == self.map_offset and 
+                midscale == self.map_midscale):
+            return
+        self.map_gain = gain
+        self.map_offset = offset
+        self.map_midscale = midscale
+        # The table is indexed by sample >> gain, so it is only exact when
+        # the low bits of midscale are 0.
+        if (np is not None or gain < DisplayView.LUT_MIN_GAIN or 
+                midscale & ((1 << gain) - 1)):
+            self.lut = None
+            return
+            
+        size = 65536 >> gain
+        if self.lut is None or len(self.lut) != size:
+            self.lut = bytearray(size)
+        lut = self.lut
+        # Entry k is row = offset - y_top - k + (midscale >> gain). It is
+        # the bottom row up to k_bottom and row 0 from k_top on.
+        bottom = self.rows - 1
+        offset -= y_top
+        k_mid = midscale >> gain
+        k_bottom = min(max(offset + k_mid - bottom, 0), size)
+        k_top = min(max(offset + k_mid + 1, 0), size)
+        lut[0:k_bottom] = bytes([bottom]) * k_bottom
+        y_first = offset + k_mid - k_bottom
+        lut[k_bottom:k_top] = bytes(range(y_first, y_first - (k_top - k_bottom), -1))
+        lut[k_top:size] = bytes([0]) * (size - k_top)
+        
+    def map_samples(self, samples, start, count, dest):
+        """ Put the rows of samples[start:start + count] in dest[0:count].
+        
+        Call set_mapping() first. With array math the whole slice is 
+        mapped in one go. Otherwise each sample is a table lookup, or 
+        worked out on its own at the highest gains.
+        """
+        if count <= 0:
+            return
+        gain = self.map_gain
+        offset = self.map_offset - y_top
+        midscale = self.map_midscale
+        bottom = self.rows - 1
+        if np is not None:
+            # A shift right is a floor division by a power of two, which
+            # is exact in floating point for 16-bit samples.
+            scale = 1.0 / (1 << gain)
+            s = np.frombuffer(samples, dtype=np.uint16, count=count, 
+                              offset=2 * start)
+            y = offset - np.floor(s * scale - midscale * scale)
+            ys = np.frombuffer(dest, dtype=np.uint8, count=count)
+            ys[:] = np.clip(y, 0, bottom)
+        elif self.lut is not None:
+            # Indexing, where a memoryview slice would be a new object
+            lut = self.lut
+            for idx in range(count):
+                dest[idx] = lut[samples[start + idx] >> gain]
+        else:
+            for idx in range(count):
+                y = offset - ((samples[start + idx] - midscale) >> gain)
+                if y > bottom:
+                    y = bottom
+                elif y < 0:
+                    y = 0
+                dest[idx] = y
+        
+    def draw_dots(self, color_idx, channel):
+        """Draw a trace on the screen with one pixel per sample"""
+    
+        """Globals:
+            Screen:
+              - x_left
+              - x_right
+              - y_bottom
+              - y_top
+              
+           Channel settings:   
+            Display:
+              - num_samples_per_px
+              - adc_midscale
+              - vertical_offset
+              - vertical_gain
+            Sampling:
+              - start_sample
+              - num_samples
+              
+        All the samples on the screen are mapped to rows in one batch 
+        first. The row of every dot drawn is kept in dot_ys. For each column the
+        old and new dots are marked in a scratch column, then old dots
+        that are not redrawn are cleared and new dots that were not 
+        there before are set.
+        """
+        samples = channel.samples
+        start = channel.start_sample
+        per = channel.samples_per_column()
+        bitmap = self.bitmap
+        mark = self.mark
+        
+        count = channel.drawn_samples()
+        if count < 0:
+            count = 0
+        if len(self.layer.dot_ys_next) < count:
+            self.layer.dot_ys_next = bytearray(count)
+        new_ys = self.layer.dot_ys_next
+        old_ys = self.layer.dot_ys
+        old_count = self.layer.dot_count
+        old_per = self.layer.dot_per
+        
+        self.set_mapping(channel)
+        self.map_samples(samples, start, count, new_ys)
+        
+        for col in range(self.columns):
+            new_first = col * per
+            old_first = col * old_per
+            if new_first >= count and old_first >= old_count:
+                break
+            new_last = min(new_first + per, count)
+            old_last = min(old_first + old_per, old_count)
+            
+            for idx in range(new_first, new_last):
+                mark[new_ys[idx]] |= 2
+            for idx in range(old_first, old_last):
+                mark[old_ys[idx]] |= 1
+                
+            # A mark of 1 is an old dot only, 2 a new dot only, 3 both.
+            for idx in range(old_first, old_last):
+                y = old_ys[idx]
+                if mark[y] == 1:
+                    bitmap[col, y] = 0
+                mark[y] = 0
+            for idx in range(new_first, new_last):
+                y = new_ys[idx]
+                if mark[y] == 2:
+                    bitmap[col, y] = color_idx
+                mark[y] = 0
+                
+        self.layer.dot_ys = new_ys
+        self.layer.dot_ys_next = old_ys
+        self.layer.dot_count = count
+        self.layer.dot_per = per
+                
+    def draw_envelope(self, color_idx, channel):
+        """Draw a trace on the screen with one vertical span per column"""
+        
+        """The samples for each column are reduced to their minimum and
+        maximum in one pass, and the span between them is drawn. The span 
+        also reaches the last sample of the column to its left, so edges 
+        stay connected and a glitch inside a column still shows up.
+        The work is one span per column however many samples there are.
+        
+        Only the ends of the span that moved since the last frame are 
+        written. A stable waveform costs no bitmap writes at all.
+        """
+        samples = channel.samples
+        num_samples = channel.start_sample + channel.drawn_samples()
+        samples_per_column = channel.samples_per_column()
+        offset = channel.vertical_offset - y_top
+        midscale = channel.adc_midscale
+        gain = channel.vertical_gain
+        bottom = self.rows - 1
+        tops = self.layer.span_top
+        bottoms = self.layer.span_bottom
+        
+        col = 0
+        sample_index = channel.start_sample
+        if sample_index < num_samples:
+            last = samples[sample_index]
+        while (col < self.columns) and (sample_index < num_samples):
+            lo = last
+            hi = last
+            end = sample_index + samples_per_column
+            if end > num_samples:
+                end = num_samples
+            for idx in range(sample_index, end):
+                last = samples[idx]
+                if last < lo:
+                    lo = last
+                elif last > hi:
+                    hi = last
+            sample_index = end
+            
+            # Positive y is down, so the largest sample is the top of the span.
+            new_top = offset - ((hi - midscale) >> gain)
+            if new_top < 0:
+                new_top = 0
+            elif new_top > bottom:
+                new_top = bottom
+            new_bottom = offset - ((lo - midscale) >> gain)
+            if new_bottom > bottom:
+                new_bottom = bottom
+            elif new_bottom < 0:
+                new_bottom = 0
+            
+            if new_top != tops[col] or new_bottom != bottoms[col]:
+                self.draw_span(col, new_top, new_bottom, color_idx)
+            col += 1
+            
+        # Clear the columns past the end of the samples.
+        while col < self.columns:
+            self.draw_span(col, DisplayView.SPAN_EMPTY, 0, color_idx)
+            col += 1
+            
+    def draw_roll(self, color_idx, channel, roll):
+        """Draw a roll buffer, newest column at the right"""
+        
+        """Columns scroll left as new ones arrive. Each frame maps the 
+        stored minimum and maximum of every column to a span, and only 
+        the pixels that changed are written. Peak hold is drawn the same
+        way, from a buffer that is always full.
+        """
+        offset = channel.vertical_offset - y_top
+        midscale = channel.adc_midscale
+        gain = channel.vertical_gain
+        bottom = self.rows - 1
+        tops = self.layer.span_top
+        bottoms = self.layer.span_bottom
+        
+        # Screen columns to the left of the oldest column are empty.
+        first = self.columns - roll.count
+        idx = roll.head - roll.count
+        if idx < 0:
+            idx += roll.columns
+        for col in range(self.columns):
+            if col < first:
+                new_top = DisplayView.SPAN_EMPTY
+                new_bottom = 0
+            else:
+                new_top = offset - ((roll.hi[idx] - midscale) >> gain)
+                if new_top < 0:
+                    new_top = 0
+                elif new_top > bottom:
+                    new_top = bottom
+                new_bottom = offset - ((roll.lo[idx] - midscale) >> gain)
+                if new_bottom > bottom:
+                    new_bottom = bottom
+                elif new_bottom < 0:
+                    new_bottom = 0
+                idx += 1
+                if idx == roll.columns:
+                    idx = 0
+            if new_top != tops[col] or new_bottom != bottoms[col]:
+                self.draw_span(col, new_top, new_bottom, color_idx)
+            
+    def draw_inspect(self, color_idx, channel, history):
+        """Draw the part of a held sweep in view, one span per column"""
+        
+        """The history works out each column's minimum and maximum when
+        the view changes, in about the same time at any zoom. They are 
+        drawn like a roll, from the left, writing only the pixels that 
+        changed, so a view that did not change writes none.
+        """
+        history.update()
+        offset = channel.vertical_offset - y_top
+        midscale = channel.adc_midscale
+        gain = channel.vertical_gain
+        bottom = self.rows - 1
+        tops = self.layer.span_top
+        bottoms = self.layer.span_bottom
+        lo = history.lo
+        hi = history.hi
+        
+        # Screen columns past the end of the sweep are empty.
+        shown = history.shown
+        for col in range(self.columns):
+            if col >= shown:
+                new_top = DisplayView.SPAN_EMPTY
+                new_bottom = 0
+            else:
+                new_top = offset - ((hi[col] - midscale) >> gain)
+                if new_top < 0:
+                    new_top = 0
+                elif new_top > bottom:
+                    new_top = bottom
+                new_bottom = offset - ((lo[col] - midscale) >> gain)
+                if new_bottom > bottom:
+                    new_bottom = bottom
+                elif new_bottom < 0:
+                    new_bottom = 0
+            if new_top != tops[col] or new_bottom != bottoms[col]:
+                self.draw_span(col, new_top, new_bottom, color_idx)
+            
+    def draw_spectrum(self, color_idx, channel):
+        """Draw a channel's spectrum, one bar per column"""
+        levels = channel.spectrum_db
+        bottom = self.rows - 1
+        tops = self.layer.span_top
+        bottoms = self.layer.span_bottom
+        for col in range(self.columns):
+            new_top = -levels[col] * DisplayView.SPECTRUM_PX_PER_DB
+            new_bottom = bottom
+            if new_top < 0:
+                new_top = 0
+            elif new_top > bottom:
+                new_top = DisplayView.SPAN_EMPTY
+                new_bottom = 0
+            if new_top != tops[col] or new_bottom != bottoms[col]:
+                self.draw_span(col, new_top, new_bottom, color_idx)
+                
+    def draw_span(self, col, new_top, new_bottom, color_idx):
+        """Change the span drawn in one column, writing only what changed"""
+        
+        """With bitmaptools, each run of rows that changes is one 
+        fill_region() call. It fills any rectangle, empty or not, so the
+        empty runs are left out.
+        """
+        bitmap = self.bitmap
+        old_top = self.layer.span_top[col]
+        old_bottom = self.layer.span_bottom[col]
+        if bitmaptools is not None:
+            fill = bitmaptools.fill_region
+            x = col + 1
+            if new_bottom < old_top or new_top > old_bottom:
+                # The spans do not overlap. Replace the whole span.
+                if old_top <= old_bottom:
+                    fill(bitmap, col, old_top, x, old_bottom + 1, 0)
+                if new_top <= new_bottom:
+                    fill(bitmap, col, new_top, x, new_bottom + 1, color_idx)
+            else:
+                if old_top < new_top:
+                    fill(bitmap, col, old_top, x, new_top, 0)
+                if new_bottom < old_bottom:
+                    fill(bitmap, col, new_bottom + 1, x, old_bottom + 1, 0)
+                if new_top < old_top:
+                    fill(bitmap, col, new_top, x, old_top, color_idx)
+                if old_bottom < new_bottom:
+                    fill(bitmap, col, old_bottom + 1, x, new_bottom + 1, 
+                         color_idx)
+        elif new_bottom < old_top or new_top > old_bottom:
+            for y in range(old_top, old_bottom + 1):
+                bitmap[col, y] = 0
+            for y in range(new_top, new_bottom + 1):
+                bitmap[col, y] = color_idx
+        else:
+            for y in range(old_top, new_top):
+                bitmap[col, y] = 0
+            for y in range(new_bottom + 1, old_bottom + 1):
+                bitmap[col, y] = 0
+            for y in range(new_top, old_top):
+                bitmap[col, y] = color_idx
+            for y in range(old_bottom + 1, new_bottom + 1):
+                bitmap[col, y] = color_idx
+        self.layer.span_top[col] = new_top
+        self.layer.span_bottom[col] = new_bottom
+
+class LedView(object):
+    """Class to turn the NeoPixels on and off"""
+    
+    PIXEL_SWEEP = const(0)
+    PIXEL_STREAM = const(1)
+    PIXEL_SELECT = const(2)
+    PIXEL_REFRESH = const(4)
+    
+    # The colors, made once
+    BLACK = (0, 0, 0)
+    PALE_GREEN = (0, 1, 0)
+    PALE_BLUE = (0, 0, 1)
+    
+    def __init__(self, leds):
+        """ Neopixel initialization """
+        
+        neopixel_count = 5
+        self.pixels = neopixel.NeoPixel(leds, neopixel_count,
+                                            pixel_order=neopixel.GRB)
+        # The color each pixel was last set to
+        self.colors = [LedView.BLACK] * neopixel_count
+        
+    def set_light_color(self, pixel_idx, color):
+        """ Set one neopixel to one of the colors above. Each write goes
+        out to the whole strip, so a pixel already that color is left. """
+        if self.pixels is not None and self.colors[pixel_idx] is not color:
+            self.colors[pixel_idx] = color
+            self.pixels[pixel_idx] = color
@@ -0,0 +1,187 @@
+"""
+The function generator channel. Imported when it is first shown.
+"""
+
+import array
+import math
+
+from micropython import const
+
+from edgemic.buttons import Button
+from edgemic.channel import sensorChannel
+from edgemic.common import UNITS
+
+class generatorChannel(sensorChannel):
+    """ Class to use a generated waveform as a data channel. 
+    
+    It is a function generator: sawtooth, triangle, sine, square or noise,
+    with chords for the frequency and amplitude. It is also a fast,
+    repeatable test signal for the rest of the scope.
+    
+    One period of each waveform is computed once, at full scale. When the
+    waveform, frequency or amplitude changes, they are scaled into a
+    playback table holding a whole number of periods. A phase index into
+    the playback table carries on from one sweep to the next, and sweeps
+    are filled from it with slice copies.
+    """
+    
+    CHANNEL_ID = const(3)
+    UNIT, UNIT_PER_COUNT, UNIT_ZERO = UNITS[CHANNEL_ID]
+    
+    WAVE_SAWTOOTH = const(0)
+    WAVE_TRIANGLE = const(1)
+    WAVE_SINE = const(2)
+    WAVE_SQUARE = const(3)
+    WAVE_NOISE = const(4)
+    WAVE_NAMES = ('SAW', 'TRI', 'SINE', 'SQUARE', 'NOISE')
+    
+    # Points in the full scale period of each waveform
+    SHAPE_SIZE = const(256)
+    # The playback table holds at least this many samples, so a sweep
+    # takes few copies even at high frequencies.
+    MIN_TABLE_SIZE = const(512)
+    # The rate the samples would have been taken at, for the timebase
+    SAMPLE_RATE = const(10000)
+    
+    # Frequencies are whole divisors of the sample rate, so a period is a
+    # whole number of samples.
+    FREQUENCIES = (10, 20, 50, 100, 200, 500, 1000, 2000)
+    AMPLITUDES = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+        
+    def __init__(self, board, button, samples):
+        super().__init__(button)
+        self.set_buffers(samples)
+        self.board = board
+        self.sample_rate = generatorChannel.SAMPLE_RATE
+        self.shapes = self.make_shapes()
+        self.wave = generatorChannel.WAVE_SAWTOOTH
+        self.frequency_idx = 3
+        self.amplitude_idx = 2
+        self.phase = 0
+        self.make_table()
+        
+    def make_shapes(self):
+        """ One period of each waveform, from -32767 to 32767. """
+        size = generatorChannel.SHAPE_SIZE
+        half = size >> 1
+        sawtooth = array.array('h', [0] * size)
+        triangle = array.array('h', [0] * size)
+        sine = array.array('h', [0] * size)
+        square = array.array('h', [0] * size)
+        noise = array.array('h', [0] * size)
+        # Noise from a fixed seed, so it is the same every time
+        seed = 0x2545
+        for i in range(size):
+            sawtooth[i] = (i * 65534) // (size - 1) - 32767
+            if i < half:
+                triangle[i] = (i * 65534) // half - 32767
+            else:
+                triangle[i] = 32767 - ((i - half) * 65534) // half
+            sine[i] = int(32767 * math.sin(2 * math.pi * i / size))
+            square[i] = 32767 if i < half else -32767
+            seed = (seed * 1103515245 + 12345) & 0x7fffffff
+            noise[i] = (seed >> 15) - 32768
+        return (sawtooth, triangle, sine, square, noise)
+        
+    def make_table(self):
+        """ Scale the waveform into the playback table. """
+        size = generatorChannel.SHAPE_SIZE
+        shape = self.shapes[self.wave]
+        amplitude = generatorChannel.AMPLITUDES[self.amplitude_idx]
+        frequency = generatorChannel.FREQUENCIES[self.frequency_idx]
+        midscale = self.adc_midscale
+        period = self.sample_rate // frequency
+        periods = (generatorChannel.MIN_TABLE_SIZE + period - 1) // period
+        
+        # MicroPython's arrays cannot be repeated with *, so each sample 
+        # of the period is written into every period of the table.
+        length = period * periods
+        table = array.array('H', bytes(2 * length))
+        for i in range(period):
+            value = midscale + ((shape[(i * size) // period] * amplitude) >> 15)
+            for j in range(i, length, period):
+                table[j] = value
+        self.table = table
+        self.phase = 0
+        self.name = '%s %dHz' % (generatorChannel.WAVE_NAMES[self.wave], 
+                                 frequency)
+        
+    def next_wave(self):
+        self.wave += 1
+        if self.wave == len(self.shapes):
+            self.wave = 0
+        self.make_table()
+        
+    def increase_frequency(self):
+        if self.frequency_idx < len(generatorChannel.FREQUENCIES) - 1:
+            self.frequency_idx += 1
+            self.make_table()
+            
+    def decrease_frequency(self):
+        if self.frequency_idx > 0:
+            self.frequency_idx -= 1
+            self.make_table()
+            
+    def increase_amplitude(self):
+        if self.amplitude_idx < len(generatorChannel.AMPLITUDES) - 1:
+            self.amplitude_idx += 1
+            self.make_table()
+            
+    def decrease_amplitude(self):
+        if self.amplitude_idx > 0:
+            self.amplitude_idx -= 1
+            self.make_table()
+        
+    def preset(self):
+        
+        super().preset()
+        self.vertical_gain = 5
+        self.vertical_offset = 68
+        
+    def button_event(self, kind, mask):
+        """ Buttons for a function generator.
+        
+        The buttons on their own are as for the other channels. A with 
+        Left or Right lowers or raises the frequency, A with Up or Down 
+        raises or lowers the amplitude, and A and B together pick the 
+        next waveform, as the generator cannot roll. The other chords, 
+        and the buttons while inspecting, are as for the other channels.
+        """
+        if kind == Button.EVENT_CHORD and not self.inspecting:
+            if mask == Button.BUTTON_A | Button.BUTTON_LEFT:
+                self.decrease_frequency()
+                return
+            if mask == Button.BUTTON_A | Button.BUTTON_RIGHT:
+                self.increase_frequency()
+                return
+            if mask == Button.BUTTON_A | Button.BUTTON_UP:
+                self.increase_amplitude()
+                return
+            if mask == Button.BUTTON_A | Button.BUTTON_DOWN:
+                self.decrease_amplitude()
+                return
+            if mask == Button.BUTTON_A | Button.BUTTON_B:
+                self.next_wave()
+                return
+        super().button_event(kind, mask)
+        
+    def take_sweep(self):
+        """ Fill the sweep from the playback table, no measurement."""
+        
+        # Memoryview slices copy without making a new array for each one.
+        dest = memoryview(self.sweep_samples)
+        table = memoryview(self.table)
+        size = len(self.table)
+        num_samples = self.num_samples
+        phase = self.phase
+        idx = 0
+        while idx < num_samples:
+            count = size - phase
+            if count > num_samples - idx:
+                count = num_samples - idx
+            dest[idx:idx + count] = table[phase:phase + count]
+            idx += count
+            phase += count
+            if phase == size:
+                phase = 0
+        self.phase = phase
@@ -0,0 +1,214 @@
+"""
+A sweep held to inspect. Imported when a sweep is first held.
+"""
+
+import array
+
+from micropython import const
+
+# Array math, on boards whose CircuitPython has ulab
+try:
+    from ulab import numpy as np
+except ImportError:
+    np = None
+
+class History(object):
+    """ A sweep held to zoom and pan across, with a min/max pyramid.
+    
+    hold() keeps the sweep where it is, in the channel's buffer, and 
+    builds the pyramid: level 0 has the minimum and maximum of each block
+    of BLOCK samples, and each level above those of two blocks of the 
+    level below. The view shows per samples a column, a power of two, 
+    from sample pos of the sweep, a multiple of per. A column is then one
+    block of the level with per samples a block, or under BLOCK samples 
+    read directly, so the columns take the same time to work out at any
+    zoom. update() only works them out again when the view has changed, 
+    into lo and hi, for the shown columns from the left. Each column also
+    reaches the last sample of the column to its left, as envelopes do.
+    """
+    
+    BLOCK_SHIFT = const(4)
+    BLOCK = const(16)
+    
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.columns = columns
+        # Where each level starts in level_lo and level_hi. The top level
+        # has blocks big enough to show a whole sweep on the screen.
+        self.level_start = []
+        size = 0
+        blocks = (capacity + History.BLOCK - 1) >> History.BLOCK_SHIFT
+        block = History.BLOCK
+        while True:
+            self.level_start.append(size)
+            size += blocks
+            if block * columns >= capacity:
+                break
+            blocks = (blocks + 1) >> 1
+            block <<= 1
+        self.level_lo = array.array('H', [0] * size)
+        self.level_hi = array.array('H', [0] * size)
+        self.lo = array.array('H', [0] * columns)
+        self.hi = array.array('H', [0] * columns)
+        # The sweep: samples[first:first + count]
+        self.samples = None
+        self.first = 0
+        self.count = 0
+        # The view, the most samples a column it can have, the columns 
+        # with samples, and the view lo and hi are for, per 0 for none
+        self.per = 1
+        self.pos = 0
+        self.max_per = 1
+        self.shown = 0
+        self.view_per = 0
+        self.view_pos = 0
+        
+    def hold(self, samples, first, count, per, pos):
+        """ Hold samples[first:first + count], and view it from about pos
+        at about per samples a column. """
+        self.samples = samples
+        self.first = first
+        self.count = count
+        lo = self.level_lo
+        hi = self.level_hi
+        
+        # Level 0. Whole blocks are reduced with array math, if there is
+        # any, and the rest one sample at a time.
+        blocks = (count + History.BLOCK - 1) >> History.BLOCK_SHIFT
+        done = 0
+        if np is not None and count >= History.BLOCK:
+            done = count >> History.BLOCK_SHIFT
+            s = np.frombuffer(samples, dtype=np.uint16, 
+                              count=done << History.BLOCK_SHIFT,
+                              offset=2 * first).reshape((done, History.BLOCK))
+            np.frombuffer(lo, dtype=np.uint16, count=done)[:] = np.min(s, axis=1)
+            np.frombuffer(hi, dtype=np.uint16, count=done)[:] = np.max(s, axis=1)
+        end = first + count
+        for b in range(done, blocks):
+            start = first + (b << History.BLOCK_SHIFT)
+            stop = start + History.BLOCK
+            if stop > end:
+                stop = end
+            low = samples[start]
+            high = low
+            for idx in range(start + 1, stop):
+                v = samples[idx]
+                if v < low:
+                    low = v
+                elif v > high:
+                    high = v
+            lo[b] = low
+            hi[b] = high
+            
+        # Each level above from pairs of blocks of the one below
+        for level in range(1, len(self.level_start)):
+            below = self.level_start[level - 1]
+            here = self.level_start[level]
+            odd = blocks & 1
+            blocks = (blocks + 1) >> 1
+            for b in range(blocks):
+                i = below + 2 * b
+                low = lo[i]
+                high = hi[i]
+                if not (odd and b == blocks - 1):
+                    if lo[i + 1] < low:
+                        low = lo[i + 1]
+                    if hi[i + 1] > high:
+                        high = hi[i + 1]
+                lo[here + b] = low
+                hi[here + b] = high
+                
+        # The fewest samples a column that show the whole sweep
+        self.max_per = 1
+        while self.max_per * self.columns < count:
+            self.max_per <<= 1
+        self.per = self.fit(per)
+        self.view_per = 0
+        self.pan_to(pos)
+        
+    def fit(self, per):
+        """ per rounded down to a power of two, up to max_per. """
+        fitted = 1
+        while fitted << 1 <= per and fitted < self.max_per:
+            fitted <<= 1
+        return fitted
+        
+    def zoom(self, per):
+        """ Show per samples a column, rounded down to a power of two, 
+        keeping the middle of the screen where it is. """
+        middle = self.pos + ((self.per * self.columns) >> 1)
+        self.per = self.fit(per)
+        self.pan_to(middle - ((self.per * self.columns) >> 1))
+        
+    def pan(self, columns):
+        """ Move the view this many columns later, or earlier. """
+        self.pan_to(self.pos + columns * self.per)
+        
+    def pan_to(self, pos):
+        """ Start the view at pos, or as near as it can. """
+        per = self.per
+        last = self.count - per * self.columns
+        if pos > last:
+            # The last column may be partly past the end of the sweep.
+            pos = last + per - 1
+        if pos < 0:
+            pos = 0
+        self.pos = pos - pos % per
+        
+    def update(self):
+        """ Work out lo and hi, if the view has changed. """
+        per = self.per
+        pos = self.pos
+        if per == self.view_per and pos == self.view_pos:
+            return
+        self.view_per = per
+        self.view_pos = pos
+        samples = self.samples
+        first = self.first
+        count = self.count
+        lo = self.lo
+        hi = self.hi
+        shown = (count - pos + per - 1) // per
+        if shown > self.columns:
+            shown = self.columns
+        self.shown = shown
+        
+        if per >= History.BLOCK:
+            level = 0
+            block = History.BLOCK
+            while block < per:
+                block <<= 1
+                level += 1
+            level_lo = self.level_lo
+            level_hi = self.level_hi
+            start = self.level_start[level] + pos // per
+            for col in range(shown):
+                lo[col] = level_lo[start + col]
+                hi[col] = level_hi[start + col]
+        else:
+            end = first + count
+            for col in range(shown):
+                start = first + pos + col * per
+                stop = start + per
+                if stop > end:
+                    stop = end
+                low = samples[start]
+                high = low
+                for idx in range(start + 1, stop):
+                    v = samples[idx]
+                    if v < low:
+                        low = v
+                    elif v > high:
+                        high = v
+                lo[col] = low
+                hi[col] = high
+                
+        # Join each column to the one before, as envelopes are.
+        idx = first + pos + per - 1
+        for col in range(1, shown):
+            v = samples[idx]
+            if v < lo[col]:
+                lo[col] = v
+            elif v > hi[col]:
+                hi[col] = v
+            idx += per
@@ -0,0 +1,130 @@
+"""
+The light sensor channel. Imported when it is first shown.
+"""
+
+import time
+
+import analogio
+from micropython import const
+
+from edgemic.channel import sensorChannel
+from edgemic.common import UNITS
+
+# Bulk ADC capture, on boards whose CircuitPython has it
+try:
+    import analogbufio
+except ImportError:
+    analogbufio = None
+
+class lightChannel(sensorChannel):
+    """ Class to use the light sensor as a data channel. """
+    
+    CHANNEL_ID = const(2)
+    UNIT, UNIT_PER_COUNT, UNIT_ZERO = UNITS[CHANNEL_ID]
+    
+    # Samples per second. Python reads the ADC faster than this on the
+    # badge, so the sweep loop waits for the time of each sample.
+    SAMPLE_RATE = const(5000)
+    # Time across the screen after a preset
+    PRESET_WINDOW_MS = const(100)
+    # A paced sweep taken in steps reads this many samples per step: 16ms
+    STEP_SAMPLES = const(80)
+        
+    def __init__(self, board, button, samples):
+        super().__init__(button)
+        self.set_buffers(samples)
+        self.board = board
+        self.name = 'LIGHT'
+        self.sample_rate = lightChannel.SAMPLE_RATE
+        self.light_sensor = analogio.AnalogIn(board.A7)
+        # When the sweep taken in steps started, and the next sample is due
+        self.paced_start = 0
+        self.paced_due = 0
+        
+    def preset(self):
+        super().preset()
+        self.vertical_gain = 8
+        self.vertical_offset = 0
+        self.calc_num_samples(lightChannel.PRESET_WINDOW_MS)
+        
+    def read_sample(self):
+        return self.light_sensor.value
+        
+    def take_sweep(self):
+        """ Take a sweep of light samples at sample_rate.
+        
+        The ADC fills the buffer by itself where analogbufio is available.
+        Otherwise each sample is read when its time comes. Either way
+        achieved_rate is set to the rate measured over the sweep.
+        """
+        if analogbufio is not None:
+            self.take_sweep_buffered()
+        else:
+            self.take_sweep_paced()
+            
+    def take_sweep_buffered(self):
+        num_samples = self.num_samples
+        # The pin can only be used by one ADC object at a time.
+        self.light_sensor.deinit()
+        with analogbufio.BufferedIn(self.board.A7, 
+                                    sample_rate=self.sample_rate) as adc:
+            start = time.monotonic_ns()
+            adc.readinto(memoryview(self.sweep_samples)[:num_samples])
+            elapsed = time.monotonic_ns() - start
+        self.light_sensor = analogio.AnalogIn(self.board.A7)
+        # readinto() only returns once the ADC has taken every sample, so
+        # the sweep takes at least num_samples at sample_rate. A clock 
+        # that saw less, as in the host simulation, missed the wait, and
+        # the rate the ADC was set to is the better figure.
+        if elapsed * self.sample_rate >= num_samples * 1000000000:
+            self.achieved_rate = num_samples * 1000000000 // elapsed
+        else:
+            self.achieved_rate = self.sample_rate
+            
+    def take_sweep_paced(self):
+        self.start_sweep()
+        self.paced_step(self.step_count)
+        
+    def sweep_step(self):
+        """ With analogbufio the ADC takes the whole sweep in one step.
+        Otherwise STEP_SAMPLES are read per step. """
+        if analogbufio is not None:
+            self.take_sweep_buffered()
+            return True
+        return self.paced_step(lightChannel.STEP_SAMPLES)
+        
+    def paced_step(self, max_count):
+        """ Read up to max_count more samples of the sweep, each at its 
+        time. Return True when the sweep is complete. """
+        samples = self.sweep_samples
+        sensor = self.light_sensor
+        period = 1000000000 // self.sample_rate
+        now = time.monotonic_ns
+        
+        # Sample times are kept on a fixed grid from the start of the 
+        # sweep. A sample that is late is taken at once, without waiting,
+        # so the sweep catches up and the lateness does not add up. That
+        # includes lateness from other tasks running between steps.
+        if self.step_index == 0:
+            self.paced_start = now()
+            self.paced_due = self.paced_start
+        due = self.paced_due
+        end = self.step_index + max_count
+        if end > self.step_count:
+            end = self.step_count
+        for a in range(self.step_index, end):
+            while now() < due:
+                pass
+            samples[a] = sensor.value
+            due += period
+        self.paced_due = due
+        self.step_index = end
+        if end < self.step_count:
+            return False
+        # The time from the first sample to the last is num_samples - 1
+        # periods.
+        elapsed = now() - self.paced_start
+        if elapsed > 0:
+            self.achieved_rate = ((self.step_count - 1) * 1000000000 
+                                  // elapsed)
+        return True
@@ -0,0 +1,132 @@
+"""
+Measurements of a sweep. Imported when measurements are first turned on.
+"""
+
+from micropython import const
+
+class Measurements(object):
+    """ Peak-to-peak, mean, RMS, frequency and duty cycle of a sweep.
+    
+    All of them come from one pass over the samples on the screen, with
+    integer sums. The frequency and duty cycle are timed between the 
+    first and last rising crossing of a level halfway between the last
+    measured sweep's lowest and highest samples, with hysteresis of an 
+    eighth of their difference. The duty cycle is the part of that time
+    spent above the level. One pass cannot know this sweep's own halfway
+    level until it has ended, so when the signal changes they settle on
+    the next sweep.
+    
+    The RMS is about the mean, of the AC part of the signal. Squares are
+    taken of the difference from the last mean, shifted down so that the
+    last peak-to-peak fits in 8 bits and the sum stays a small integer.
+    
+    Results are in counts, the frequency in tenths of a Hz and the duty
+    cycle in tenths of a percent. Either is None when there were fewer 
+    than two rising crossings, and everything is None when no sweep 
+    could be measured.
+    """
+    
+    # The least hysteresis, so noise on a flat trace is not a frequency
+    MIN_HYSTERESIS = const(64)
+    
+    def __init__(self):
+        self.lo = None
+        self.hi = None
+        self.mean = None
+        self.rms = None
+        self.frequency = None
+        self.duty = None
+        # Derived from the last sweep measured
+        self.center = 32768
+        self.shift = 8
+        self.level = 32768
+        self.hysteresis = Measurements.MIN_HYSTERESIS
+        
+    @staticmethod
+    def isqrt(n):
+        """ The integer square root of n, by Newton's method. """
+        if n <= 0:
+            return 0
+        x = n
+        y = (x + 1) >> 1
+        while y < x:
+            x = y
+            y = (x + n // x) >> 1
+        return x
+            
+    def measure(self, samples, start, count, rate):
+        """ Measure samples[start:start + count], taken at rate Hz. """
+        if count < 2:
+            self.lo = None
+            self.hi = None
+            self.mean = None
+            self.rms = None
+            self.frequency = None
+            self.duty = None
+            return
+        center = self.center
+        shift = self.shift
+        level = self.level
+        upper = level + self.hysteresis
+        lower = level - self.hysteresis
+        
+        lo = samples[start]
+        hi = lo
+        total = 0
+        diffs = 0
+        squares = 0
+        high = lo > level
+        high_count = 0
+        rises = 0
+        first_rise = 0
+        last_rise = 0
+        high_at_first = 0
+        high_at_last = 0
+        for idx in range(start, start + count):
+            sample = samples[idx]
+            if sample < lo:
+                lo = sample
+            elif sample > hi:
+                hi = sample
+            total += sample
+            d = (sample - center) >> shift
+            diffs += d
+            squares += d * d
+            if high:
+                if sample < lower:
+                    high = False
+            elif sample > upper:
+                if rises == 0:
+                    first_rise = idx
+                    high_at_first = high_count
+                last_rise = idx
+                high_at_last = high_count
+                rises += 1
+                high = True
+            if sample > level:
+                high_count += 1
+            
+        self.lo = lo
+        self.hi = hi
+        self.mean = total // count
+        variance = (squares - diffs * diffs // count) // count
+        self.rms = (Measurements.isqrt(variance << 8) << shift) >> 4
+        span = last_rise - first_rise
+        if rises > 1 and span > 0:
+            self.frequency = (rises - 1) * rate * 10 // span if rate else None
+            self.duty = (high_at_last - high_at_first) * 1000 // span
+        else:
+            self.frequency = None
+            self.duty = None
+            
+        # Get ready for the next sweep.
+        peak_to_peak = hi - lo
+        self.center = self.mean
+        shift = 0
+        while (peak_to_peak >> shift) > 255:
+            shift += 1
+        self.shift = shift
+        self.level = (lo + hi) >> 1
+        self.hysteresis = peak_to_peak >> 3
+        if self.hysteresis < Measurements.MIN_HYSTERESIS:
+            self.hysteresis = Measurements.MIN_HYSTERESIS
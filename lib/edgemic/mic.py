@@ -0,0 +1,66 @@
+"""
+The microphone channel. Imported, with audiobusio, when it is first shown.
+"""
+
+import audiobusio
+from micropython import const
+
+from edgemic.channel import sensorChannel
+from edgemic.common import UNITS
+from edgemic.display import DisplayView
+
+class micChannel(sensorChannel):
+    """ Class to use the light sensor as a data channel. """
+    
+    CHANNEL_ID = const(1)
+    UNIT, UNIT_PER_COUNT, UNIT_ZERO = UNITS[CHANNEL_ID]
+    
+    # A sweep taken in steps records this many samples per step: 16ms.
+    # Together with the accelerometer, the FIFO is emptied in between, 
+    # well inside the 24ms it holds at 1344Hz.
+    STEP_SAMPLES = const(256)
+    
+    def __init__(self, board, button, samples):
+        super().__init__(button)
+        self.set_buffers(samples)
+        self.board = board
+        # Sound has many samples per pixel and fast edges. 
+        # Show the envelope of each column instead of scattered dots.
+        self.name = 'MIC'
+        self.trace_mode = DisplayView.TRACE_ENVELOPE
+        self.sample_rate = 16000
+        self.mic = audiobusio.PDMIn(
+                board.TX,
+                board.D12,
+                sample_rate=self.sample_rate,
+                bit_depth=16)
+        
+    def set_spectrum_mode(self, spectrum_mode):
+        super().set_spectrum_mode(spectrum_mode)
+        self.name = 'FFT' if spectrum_mode else 'MIC'
+        
+    def record(self, index, count):
+        """ Record count samples into the sweep at index. """
+        self.mic.record(memoryview(self.sweep_samples)[index:index + count],
+                        count)
+        
+    def take_sweep(self):
+        """ Take a sweep of sound samples."""
+        
+        self.mic.record(self.sweep_samples, self.num_samples)
+        if self.spectrum_mode:
+            self.take_spectrum()
+            
+    def sweep_step(self):
+        """ Record the next STEP_SAMPLES of the sweep, and in spectrum 
+        mode take the FFT after the last. """
+        count = self.step_count - self.step_index
+        if count > micChannel.STEP_SAMPLES:
+            count = micChannel.STEP_SAMPLES
+        self.record(self.step_index, count)
+        self.step_index += count
+        if self.step_index < self.step_count:
+            return False
+        if self.spectrum_mode:
+            self.take_spectrum()
+        return True
@@ -0,0 +1,164 @@
+"""
+The capture file playback channel. Imported when a capture file is found.
+"""
+
+import array
+import struct
+import time
+
+from micropython import const
+
+from edgemic.buttons import Button
+from edgemic.channel import sensorChannel
+from edgemic.common import UNITS
+from edgemic.display import DisplayView
+
+class replayChannel(sensorChannel):
+    """ Class to play back a capture file as a data channel. 
+    
+    Capture files are written on a PC by the capture package, from the
+    sweeps SweepStream sends, and hold one channel's sweeps at fixed
+    settings. Sweeps are read from the file one at a time into the sweep
+    buffer, so a file of any size plays back in the memory of one sweep.
+    They are drawn as the badge drew them: with the recorded gain, offset,
+    samples per pixel and trigger point, or as a spectrum if that is what
+    was recorded. At the end of the file it starts again.
+    
+    At speed 1 a sweep takes as long as it took to sample. Higher speeds
+    are that many times faster, and speed 0 does not wait at all.
+    """
+    
+    # The capture file header and the start of each row, as laid out in
+    # capture/capfile.py. The samples follow each row's start.
+    FILE_MAGIC = b'EMCAPTUR'
+    FILE_VERSION = const(1)
+    HEADER_FORMAT = '<8sHHBBBBIhhHHIII'
+    ROW_FORMAT = '<IIHH'
+    FLAG_SPECTRUM = const(1)
+    
+    # Left and Right step through these
+    SPEEDS = (1, 2, 4, 8, 16, 0)
+    
+    # The trace starts at the recorded trigger point.
+    TRIGGER_CONTROLS = False
+    
+    # The microphone's CHANNEL_ID. Its sweeps are drawn as an envelope,
+    # as they were on the badge.
+    MIC_CHANNEL_ID = const(1)
+    
+    def __init__(self, board, button, samples, path, speed=1):
+        super().__init__(button)
+        self.set_buffers(samples)
+        self.board = board
+        self.file = open(path, 'rb')
+        header = self.file.read(struct.calcsize(replayChannel.HEADER_FORMAT))
+        (magic, version, self.header_size, channel_id, flags, 
+         self.file_spp, _, self.sample_rate, self.file_gain, 
+         self.file_offset, self.sweep_length, _, self.sweep_count, _, 
+         _) = struct.unpack(replayChannel.HEADER_FORMAT, header)
+        if (magic != replayChannel.FILE_MAGIC or 
+                version != replayChannel.FILE_VERSION):
+            raise ValueError('not a capture file: ' + path)
+        if self.sweep_count == 0 or self.sweep_length > len(samples):
+            raise ValueError('no sweeps this scope can play: ' + path)
+        # Streamed again, the sweeps say which channel they came from.
+        self.CHANNEL_ID = channel_id
+        self.row = bytearray(struct.calcsize(replayChannel.ROW_FORMAT))
+        self.row_bytes = len(self.row) + 2 * self.sweep_length
+        self.index = 0
+        self.recorded_start = self.skip_samples
+        # When the sweep read last is due, in monotonic_ns, or None
+        self.due = None
+        # The unit of the channel recorded, without importing it and the
+        # hardware modules it needs
+        if channel_id in UNITS:
+            self.UNIT, self.UNIT_PER_COUNT, self.UNIT_ZERO = UNITS[channel_id]
+        if channel_id == replayChannel.MIC_CHANNEL_ID:
+            self.trace_mode = DisplayView.TRACE_ENVELOPE
+        if flags & replayChannel.FLAG_SPECTRUM:
+            self.spectrum_mode = True
+            self.spectrum_db = array.array('h', [0] * self.sweep_length)
+        self.set_speed(speed)
+        
+    def set_speed(self, speed):
+        self.speed = speed
+        if speed == 1:
+            self.name = 'REPLAY'
+        elif speed:
+            self.name = 'REPLAY x%d' % speed
+        else:
+            self.name = 'REPLAY MAX'
+            
+    def next_speed(self, step):
+        idx = replayChannel.SPEEDS.index(self.speed) + step
+        if 0 <= idx < len(replayChannel.SPEEDS):
+            self.set_speed(replayChannel.SPEEDS[idx])
+        
+    def rewind(self):
+        self.index = 0
+        self.file.seek(self.header_size)
+        
+    def preset(self):
+        """ The recorded settings, from the first sweep. """
+        self.vertical_gain = self.file_gain
+        self.vertical_offset = self.file_offset
+        self.num_samples_per_px = self.file_spp
+        self.calc_num_samples()
+        self.rewind()
+        
+    def calc_num_samples(self, window_ms=None):
+        self.num_samples = self.sweep_length
+        
+    def button_event(self, kind, mask):
+        """ Left and right set the replay speed. Start goes back to the 
+        first sweep and the recorded settings. The other buttons, and all
+        of them while inspecting, are as for the other channels.
+        """
+        if ((mask == Button.BUTTON_LEFT or mask == Button.BUTTON_RIGHT) and 
+                not self.inspecting):
+            if kind == Button.EVENT_PRESS or kind == Button.EVENT_REPEAT:
+                self.next_speed(1 if mask == Button.BUTTON_RIGHT else -1)
+            return
+        super().button_event(kind, mask)
+        
+    def take_sweep(self):
+        """ Read the next sweep from the file, and wait until it is due. """
+        self.read_sweep()
+        if self.due is not None:
+            wait = self.due - time.monotonic_ns()
+            if wait > 0:
+                time.sleep(wait / 1000000000)
+                
+    def sweep_step(self):
+        """ Read the sweep in the first step, then return False until it
+        is due, without waiting. """
+        if self.step_index < self.step_count:
+            self.read_sweep()
+            self.step_index = self.step_count
+        return self.due is None or time.monotonic_ns() >= self.due
+        
+    def read_sweep(self):
+        """ Read the next sweep from the file. Set due to when it would 
+        be finished, sampled speed times faster, or None. """
+        start = time.monotonic_ns()
+        if self.index == self.sweep_count:
+            self.rewind()
+        self.file.readinto(self.row)
+        _, rate, self.recorded_start, _ = struct.unpack(
+                replayChannel.ROW_FORMAT, self.row)
+        dest = self.spectrum_db if self.spectrum_mode else self.sweep_samples
+        self.file.readinto(memoryview(dest)[0:self.sweep_length])
+        self.index += 1
+        self.achieved_rate = rate or None
+        
+        # Take as long as the sweep took to sample, over the speed.
+        self.due = None
+        if self.speed and rate:
+            self.due = start + (self.sweep_length * 1000000000 // 
+                                (rate * self.speed))
+        
+    def trigger(self):
+        """ Start the trace where it started on the badge. """
+        self.sweep_start = self.recorded_start
+        self.sweep_aligned = True
+        return True
@@ -0,0 +1,206 @@
+"""
+The spectrum of a sweep. Imported when the spectrum is first shown.
+"""
+
+import array
+import math
+
+from micropython import const
+
+# Array math, on boards whose CircuitPython has ulab
+try:
+    from ulab import numpy as np
+except ImportError:
+    np = None
+
+class Spectrum(object):
+    """ Fixed point FFT of a real sweep, done in place in its sample buffer.
+    
+    size real samples are treated as size/2 complex samples, even samples
+    real and odd samples imaginary, which is how they already lie in the
+    buffer. A radix-2 FFT of those, then a split step, gives the spectrum
+    of the real sweep. Values stay offset binary, like the samples, and 
+    every stage halves them, so they always fit in 16 bits.
+    
+    With ulab the FFT is done by array math instead.
+    """
+    
+    # The power of a full scale sine, after the window and the scaling
+    FULL_SCALE = const(32767 // 8)
+    
+    def __init__(self, size):
+        self.size = size
+        half = size >> 1
+        # W^k = cos(2 pi k / size) - j sin(2 pi k / size) for k < size / 2,
+        # in Q15. The FFT stages use every (size / span)th entry.
+        self.cos = array.array('h', [0] * half)
+        self.sin = array.array('h', [0] * half)
+        # Hann window in Q15. It is symmetric, so only half is kept.
+        self.window = array.array('H', [0] * half)
+        for k in range(half):
+            angle = 2 * math.pi * k / size
+            self.cos[k] = int(round(32767 * math.cos(angle)))
+            self.sin[k] = int(round(32767 * math.sin(angle)))
+            self.window[k] = int(round(
+                32767 * (0.5 - 0.5 * math.cos(2 * math.pi * k / (size - 1)))))
+        # For the ulab path: the window, and the windowed sweep
+        self.window_array = None
+        self.x = None
+        
+    def levels(self, samples, start, dest):
+        """ Put the level of each column in dest, in dB from full scale.
+        
+        Transforms samples[start:start + size] in place. The columns of
+        dest span 0Hz to half the sample rate. Each gets the largest bin
+        in its range.
+        """
+        if np is not None:
+            power = self.power_array(samples, start)
+            ref = (self.size * 32767 / 4) ** 2
+        else:
+            self.transform(samples, start)
+            power = None
+            ref = Spectrum.FULL_SCALE * Spectrum.FULL_SCALE
+        bins = self.size >> 1
+        columns = len(dest)
+        log10 = math.log10
+        for col in range(columns):
+            first = col * bins // columns
+            last = (col + 1) * bins // columns
+            if last <= first:
+                last = first + 1
+            if power is not None:
+                peak = np.max(power[first:last])
+            else:
+                peak = 0
+                for idx in range(start + 2 * first, start + 2 * last, 2):
+                    re = samples[idx] - 32768
+                    im = samples[idx + 1] - 32768
+                    p = re * re + im * im
+                    if p > peak:
+                        peak = p
+            if peak > 0:
+                dest[col] = int(10 * log10(peak / ref))
+            else:
+                dest[col] = -200
+        
+    def power_array(self, samples, start):
+        """ The power in each bin, by array math.
+        
+        The sweep is windowed in an array kept from frame to frame, and
+        the power is worked out in the FFT's own output, so the only 
+        arrays made each frame are the two that ulab's fft() returns. It
+        has no argument to put its output in, so those are size floats 
+        each: 16kB a frame at 2048 points with the badge's 4 byte floats.
+        """
+        size = self.size
+        if self.window_array is None:
+            half = np.array(self.window) / 32767
+            self.window_array = np.concatenate((half, np.flip(half)))
+            self.x = np.zeros(size)
+        x = self.x
+        x[:] = np.frombuffer(samples, dtype=np.uint16, count=size, 
+                             offset=2 * start)
+        x -= 32768.0
+        x *= self.window_array
+        spectrum = np.fft.fft(x)
+        if isinstance(spectrum, tuple):
+            re, im = spectrum
+        else:
+            re = np.real(spectrum)
+            im = np.imag(spectrum)
+        bins = size >> 1
+        re = re[:bins]
+        im = im[:bins]
+        re *= re
+        im *= im
+        re += im
+        return re
+        
+    def transform(self, buf, start):
+        """ Replace buf[start:start + size] with its spectrum.
+        
+        Bin k, for k < size / 2, is left in buf[start + 2k] (real) and
+        buf[start + 2k + 1] (imaginary), as offset binary, scaled so a full 
+        scale sine gives a magnitude of FULL_SCALE.
+        """
+        n = self.size
+        m = n >> 1
+        end = start + n
+        win = self.window
+        cos = self.cos
+        sin = self.sin
+        
+        # Window, and halve, so the complex samples are under 2^15 / sqrt(2).
+        # Then no stage can overflow.
+        for i in range(m):
+            w = win[i]
+            idx = start + i
+            buf[idx] = ((buf[idx] - 32768) * w >> 16) + 32768
+            idx = end - 1 - i
+            buf[idx] = ((buf[idx] - 32768) * w >> 16) + 32768
+            
+        # Put the m complex samples in bit reversed order.
+        j = 0
+        for i in range(m - 1):
+            if i < j:
+                a = start + 2 * i
+                b = start + 2 * j
+                buf[a], buf[b] = buf[b], buf[a]
+                buf[a + 1], buf[b + 1] = buf[b + 1], buf[a + 1]
+            k = m >> 1
+            while k <= j:
+                j -= k
+                k >>= 1
+            j += k
+            
+        # Butterflies, halving every stage. a + 32768 is the stored value,
+        # so ((a + t) >> 1) + 32768 is (stored + t + 32768) >> 1.
+        span = 2
+        while span <= m:
+            half = span >> 1
+            stride = n // span
+            for k in range(half):
+                wr = cos[k * stride]
+                wi = sin[k * stride]
+                for a in range(start + 2 * k, end, 2 * span):
+                    b = a + span
+                    br = buf[b] - 32768
+                    bi = buf[b + 1] - 32768
+                    tr = (br * wr + bi * wi) >> 15
+                    ti = (bi * wr - br * wi) >> 15
+                    ar = buf[a] + 32768
+                    ai = buf[a + 1] + 32768
+                    buf[a] = (ar + tr) >> 1
+                    buf[a + 1] = (ai + ti) >> 1
+                    buf[b] = (ar - tr) >> 1
+                    buf[b + 1] = (ai - ti) >> 1
+            span <<= 1
+            
+        # Split the spectrum of the complex samples into that of the real
+        # sweep. Bins k and m - k come from the same two complex values.
+        zr = buf[start] - 32768
+        zi = buf[start + 1] - 32768
+        buf[start] = ((zr + zi) >> 1) + 32768
+        buf[start + 1] = 32768
+        for k in range(1, (m >> 1) + 1):
+            a = start + 2 * k
+            b = start + 2 * (m - k)
+            zr = buf[a] - 32768
+            zi = buf[a + 1] - 32768
+            yr = buf[b] - 32768
+            yi = buf[b + 1] - 32768
+            # Twice the even and odd parts
+            er = zr + yr
+            ei = zi - yi
+            odr = zi + yi
+            odi = yr - zr
+            c = cos[k]
+            s = sin[k]
+            tr = (c * odr + s * odi) >> 15
+            ti = (c * odi - s * odr) >> 15
+            buf[a] = ((er + tr) >> 2) + 32768
+            buf[a + 1] = ((ei + ti) >> 2) + 32768
+            if b != a:
+                buf[b] = ((er - tr) >> 2) + 32768
+                buf[b + 1] = ((ti - ei) >> 2) + 32768
@@ -0,0 +1,110 @@
+"""
+Sweeps streamed over USB. Imported when streaming is first turned on.
+"""
+
+import struct
+
+from micropython import const
+
+class SweepStream(object):
+    """Send each sweep to a PC over the USB serial data port"""
+    
+    """Each sweep is sent as a header packed in HEADER_FORMAT, then the
+    samples straight from the sample array, little-endian unsigned 16 bit
+    offset binary, then END. In spectrum mode the dB level of each column
+    is sent instead, as signed 16 bit, and FLAG_SPECTRUM is set. When the
+    sweep was measured, FLAG_MEASURED is set and the measurements follow
+    the samples, packed in MEASURE_FORMAT. The header says
+    which channel it is, its gain, offset and samples per pixel, its 
+    sample rate in Hz, and where the trigger put the first sample drawn.
+    A decimated sweep is sent as the one sample per column drawn, with 
+    0 samples per pixel, the decimated rate and the first sample at 0.
+    
+    seq counts every sweep sent while a PC has the port open, including 
+    any that could not be written within WRITE_TIMEOUT_S, so the receiver
+    sees a gap for each one lost. A sweep cut short does not end in END,
+    so it is not taken for a whole one. capture/stream.py decodes this
+    format.
+    """
+    
+    MAGIC = const(0x4d45)   # b'EM'
+    VERSION = const(2)
+    # magic, version, channel, flags, samples per pixel, seq, 
+    # sample rate, gain, offset, start sample, count
+    HEADER_FORMAT = '<HBBBBIIhhHH'
+    # lowest, highest, mean and RMS in counts, frequency in 0.1Hz or 0,
+    # duty cycle in 0.1% or NO_DUTY
+    MEASURE_FORMAT = '<HHHHIH'
+    NO_DUTY = const(0xffff)
+    END = b'\xa5\x5a'
+    FLAG_SPECTRUM = const(1)
+    FLAG_MEASURED = const(2)
+    
+    # Don't hold up the scope for long when the PC stops reading.
+    WRITE_TIMEOUT_S = 0.1
+    
+    def __init__(self, port):
+        self.port = port
+        self.enabled = False
+        self.header = bytearray(struct.calcsize(SweepStream.HEADER_FORMAT))
+        self.measured = bytearray(
+                struct.calcsize(SweepStream.MEASURE_FORMAT))
+        self.seq = 0
+        self.dropped = 0
+        if port is not None:
+            port.write_timeout = SweepStream.WRITE_TIMEOUT_S
+        
+    def send(self, channel):
+        """ Send the sweep just swapped in, and its measurements if it was
+        measured. Return True if it all went. """
+        port = self.port
+        if port is None or not port.connected:
+            return False
+        flags = 0
+        m = channel.measurements
+        if m.mean is not None and not channel.spectrum_mode:
+            flags |= SweepStream.FLAG_MEASURED
+            struct.pack_into(SweepStream.MEASURE_FORMAT, self.measured, 0,
+                             m.lo, m.hi, m.mean, m.rms, m.frequency or 0,
+                             SweepStream.NO_DUTY if m.duty is None 
+                             else m.duty)
+        if channel.spectrum_mode:
+            flags |= SweepStream.FLAG_SPECTRUM
+            data = channel.spectrum_db
+            start = 0
+            count = len(data)
+        else:
+            data = channel.samples
+            start = channel.start_sample
+            count = channel.num_samples
+        rate = int(channel.achieved_rate or channel.sample_rate or 0)
+        per = channel.num_samples_per_px
+        first = 0
+        # A decimated sweep goes as what it now is, one sample per column 
+        # at the decimated rate, starting from the first column.
+        if channel.decimated:
+            first = start
+            start = 0
+            count = channel.decimated
+            rate //= per + 1
+            per = 0
+        struct.pack_into(SweepStream.HEADER_FORMAT, self.header, 0,
+                         SweepStream.MAGIC, SweepStream.VERSION, 
+                         channel.CHANNEL_ID, flags, 
+                         per, self.seq, rate, 
+                         channel.vertical_gain, channel.vertical_offset, 
+                         start, count)
+        # seq is 32 bits on the wire, and wraps round to 0.
+        self.seq = (self.seq + 1) & 0xffffffff
+        ok = port.write(self.header) == len(self.header)
+        if ok:
+            # The array's own bytes, with no copy.
+            ok = (port.write(memoryview(data)[first:first + count]) == 
+                  2 * count)
+        if ok and flags & SweepStream.FLAG_MEASURED:
+            ok = port.write(self.measured) == len(self.measured)
+        if ok:
+            ok = port.write(SweepStream.END) == 2
+        if not ok:
+            self.dropped += 1
+        return ok
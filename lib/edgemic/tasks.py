@@ -0,0 +1,130 @@
+"""
+The scope as cooperative tasks. Imported when the scope runs under asyncio.
+"""
+
+import asyncio
+
+from edgemic.channel import sweeps_due, start_sweeps, step_sweeps
+from edgemic.common import ticks_diff, ticks_ms
+from edgemic.display import DisplayView
+from edgemic.telemetry import Telemetry
+
+# How often the input task reads the buttons and the lights task updates
+# the LEDs, and how long the render task waits between tries at the
+# refresh, in seconds
+INPUT_PERIOD_S = 0.01
+LIGHTS_PERIOD_S = 0.02
+REFRESH_POLL_S = 0.002
+
+async def input_task(ctl):
+    """ Read the buttons and act on them, however long a sweep takes. """
+    while ctl.running:
+        ctl.handle_input()
+        await asyncio.sleep(INPUT_PERIOD_S)
+
+async def lights_task(ctl):
+    """ Keep the LEDs showing what the other tasks are doing. """
+    while ctl.running:
+        ctl.update_lights()
+        await asyncio.sleep(LIGHTS_PERIOD_S)
+
+async def acquire_task(ctl, budget_ms):
+    """ Take each sweep in steps, while the render task waits for the
+    refresh, and trigger it. A sweep is dropped if the input changes
+    while it is taken. Rolls stop budget_ms after they start. """
+    while True:
+        await ctl.sweep_free.wait()
+        ctl.sweep_free.clear()
+        if not ctl.running:
+            return
+        traces = ctl.traces
+        generation = ctl.generation
+        if sweeps_due(traces):
+            ctl.sweeping = True
+            start_time = ticks_ms()
+            start_sweeps(traces)
+            while not step_sweeps(traces, start_time, budget_ms):
+                await asyncio.sleep(0)
+                if ctl.generation != generation:
+                    break
+            ctl.sweeping = False
+            if ctl.generation == generation:
+                ctl.show_sweep(ticks_diff(ticks_ms(), start_time))
+        if ctl.generation == generation:
+            ctl.trigger(traces, stepped=True)
+        ctl.sweep_ready.set()
+
+async def first_sweeps(ctl, budget_ms):
+    """ Take the first sweeps of the channels just selected, in steps,
+    and swap them in, so the input and lights tasks carry on while they
+    are taken. They are taken again if the input changes meanwhile. """
+    while ctl.unswept:
+        generation = ctl.generation
+        traces = tuple(channel for channel in ctl.unswept 
+                       if not channel.roll_mode)
+        ctl.sweeping = True
+        start_time = ticks_ms()
+        for channel in traces:
+            channel.start_sweep()
+        while not step_sweeps(traces, start_time, budget_ms):
+            await asyncio.sleep(0)
+            if ctl.generation != generation:
+                break
+        ctl.sweeping = False
+        if ctl.generation == generation:
+            for channel in traces:
+                channel.trigger()
+                channel.swap_buffers()
+            ctl.unswept = ()
+
+async def render_task(ctl, frames, screen, telemetry, heap, budget_ms):
+    """ Draw the last sweeps a trace at a time, start the refresh, let
+    the acquire task take the next sweeps, finish the refresh and swap
+    them in. The refresh is tried again every REFRESH_POLL_S, and not
+    while a sweep is taken, so it does not cut a sweep in two. Channels
+    just selected get their first sweeps before they are drawn. """
+    while frames is None or ctl.frame < frames:
+        ctl.start_frame()
+        # Input is a task of its own.
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_INPUT)
+        if ctl.unswept:
+            await first_sweeps(ctl, budget_ms)
+        ctl.refreshing = True
+        traces = ctl.traces
+        screen.start_draw(traces)
+        for idx in range(len(traces)):
+            screen.draw_trace(DisplayView.TRACE_COLORS[idx], traces[idx], idx)
+            await asyncio.sleep(0)
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_DRAW)
+        refreshed = screen.refresh_step()
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_REFRESH)
+
+        ctl.sweep_free.set()
+        await ctl.sweep_ready.wait()
+        ctl.sweep_ready.clear()
+        # The sweep span includes the trigger, which the acquire task did.
+        if ctl.profiling:
+            telemetry.mark(Telemetry.SPAN_SWEEP)
+            telemetry.mark(Telemetry.SPAN_TRIGGER)
+
+        heap.collect_if_due()
+        while not refreshed:
+            await asyncio.sleep(REFRESH_POLL_S)
+            refreshed = screen.refresh_step()
+        ctl.refreshing = False
+        ctl.finish_frame()
+    ctl.running = False
+    ctl.sweep_free.set()
+
+async def run(ctl, frames, screen, telemetry, heap, budget_ms):
+    """ Run the four tasks on a Controller until frames have been drawn,
+    or forever if frames is None. """
+    ctl.sweep_free = asyncio.Event()
+    ctl.sweep_ready = asyncio.Event()
+    await asyncio.gather(render_task(ctl, frames, screen, telemetry, heap,
+                                     budget_ms),
+                         acquire_task(ctl, budget_ms),
+                         input_task(ctl), lights_task(ctl))
@@ -0,0 +1,233 @@
+"""
+Frame timing and heap statistics.
+"""
+
+import array
+import gc
+import time
+
+from micropython import const
+
+from edgemic.common import ticks_diff, ticks_ms
+
+class Telemetry(object):
+    """Time each stage of the frame and report the statistics"""
+    
+    """The main loop calls start() at the top of a frame, mark(span) at
+    the end of each stage and end_frame() at the bottom. Each mark records
+    the time since the one before in the span's ring of the last 
+    RING_SIZE frames. The loop only calls them when the mode is not OFF,
+    so when it is off the cost is one test per stage.
+    
+    Under the tasks, the render task marks the spans of its own frame: 
+    input is a task of its own, and sweep is the time it waited for the
+    acquire task, trigger included.
+    
+    SCREEN shows the mean of each span in ms on the status line. SERIAL
+    prints min/mean/p95/max in us for every span, once per ring. MEMORY
+    times nothing, as reading the ns clock allocates, and shows what the
+    Heap saw instead.
+    """
+    
+    MODE_OFF = const(0)
+    MODE_SCREEN = const(1)
+    MODE_SERIAL = const(2)
+    MODE_MEMORY = const(3)
+    
+    SPAN_INPUT = const(0)
+    SPAN_DRAW = const(1)
+    SPAN_REFRESH = const(2)
+    SPAN_SWEEP = const(3)
+    SPAN_TRIGGER = const(4)
+    SPAN_WAIT = const(5)
+    SPAN_FRAME = const(6)
+    SPAN_NAMES = ('input', 'draw', 'refresh', 'sweep', 'trigger', 'wait', 
+                  'frame')
+    # One letter per span for the status line
+    SPAN_LETTERS = 'IDRSTWF'
+    
+    RING_SIZE = const(64)
+    # Frames between updates of the status line
+    SCREEN_FRAMES = const(16)
+    
+    def __init__(self):
+        self.mode = Telemetry.MODE_OFF
+        self.times = [array.array('L', [0] * Telemetry.RING_SIZE) 
+                      for _ in Telemetry.SPAN_NAMES]
+        self.frame_start = 0
+        self.last = 0
+        self.reset()
+        
+    def reset(self):
+        """ Empty the rings. The clock of the frame going on keeps 
+        running, since the mode can change part way through a frame. """
+        self.index = 0
+        self.count = 0
+        self.frames = 0
+        
+    def next_mode(self):
+        self.mode += 1
+        if self.mode > Telemetry.MODE_MEMORY:
+            self.mode = Telemetry.MODE_OFF
+        self.reset()
+        
+    def timing(self):
+        """ Whether the frame stages are timed. """
+        return (self.mode == Telemetry.MODE_SCREEN or 
+                self.mode == Telemetry.MODE_SERIAL)
+        
+    def start(self):
+        self.frame_start = self.last = time.monotonic_ns()
+        
+    def mark(self, span):
+        """ End a span, in us. """
+        now = time.monotonic_ns()
+        self.times[span][self.index] = (now - self.last) // 1000
+        self.last = now
+        
+    def end_frame(self):
+        self.times[Telemetry.SPAN_FRAME][self.index] = (
+                (self.last - self.frame_start) // 1000)
+        self.index += 1
+        if self.index == Telemetry.RING_SIZE:
+            self.index = 0
+        if self.count < Telemetry.RING_SIZE:
+            self.count += 1
+        self.frames += 1
+        
+    def stats(self, span):
+        """ Return (min, mean, p95, max) in us over the ring. """
+        values = sorted(self.times[span][:self.count])
+        count = self.count
+        p95 = values[(count * 95 + 99) // 100 - 1]
+        return (values[0], sum(values) // count, p95, values[-1])
+        
+    def report(self, label):
+        """ Report now and then. Call it after end_frame(). """
+        if self.count == 0:
+            return
+        if self.mode == Telemetry.MODE_SCREEN:
+            if self.frames % Telemetry.SCREEN_FRAMES == 0:
+                text = ''
+                for span in range(len(Telemetry.SPAN_NAMES)):
+                    mean = sum(self.times[span][:self.count]) // self.count
+                    text += '%s%d ' % (Telemetry.SPAN_LETTERS[span], 
+                                       (mean + 500) // 1000)
+                label.text = text
+        elif self.mode == Telemetry.MODE_SERIAL:
+            if self.frames % Telemetry.RING_SIZE == 0:
+                line = 'frame us min/mean/p95/max:'
+                for span in range(len(Telemetry.SPAN_NAMES)):
+                    line += ' %s %d/%d/%d/%d' % (
+                        (Telemetry.SPAN_NAMES[span],) + self.stats(span))
+                print(line)
+
+class Heap(object):
+    """Collect garbage at a time the main loop picks, and watch the heap"""
+    
+    """The main loop allocates nothing from one frame to the next, so 
+    garbage only comes from things that change, like button presses and
+    new label texts. Left alone, CircuitPython collects it when the heap
+    fills up, in the middle of whatever allocated last, and that frame 
+    hitches. Instead the loop calls collect_if_due() while the display 
+    refresh is still going. A collection is due once COLLECT_BYTES have 
+    been allocated since the last one, or where gc.mem_alloc() is not 
+    available, as on a PC, every COLLECT_FRAMES frames.
+    
+    start_frame() and end_frame() measure what each frame allocated, not
+    counting what a collection freed, and notice a collection that was 
+    not scheduled when the heap shrinks without one. report() shows the
+    free memory, the bytes allocated per frame, the collections and the
+    longest pause, for the MEMORY telemetry mode.
+    """
+    
+    COLLECT_BYTES = const(16384)
+    COLLECT_FRAMES = const(256)
+    
+    def __init__(self):
+        self.stats = hasattr(gc, 'mem_alloc')
+        self.frames = 0
+        self.collected_at = self.allocated()
+        self.frame_start = 0
+        self.frame_freed = 0
+        self.collections = 0
+        self.unscheduled = 0
+        self.pause_ms = 0
+        self.max_pause_ms = 0
+        self.reset()
+        
+    def reset(self):
+        """ Start the per-frame figures again. """
+        self.measured = 0
+        self.total_alloc = 0
+        self.max_alloc = 0
+        
+    def allocated(self):
+        return gc.mem_alloc() if self.stats else 0
+        
+    def start_frame(self):
+        self.frame_start = self.allocated()
+        self.frame_freed = 0
+        
+    def collect(self):
+        """ Collect now, and time it. """
+        before = self.allocated()
+        started = ticks_ms()
+        gc.collect()
+        pause = ticks_diff(ticks_ms(), started)
+        after = self.allocated()
+        self.frame_freed += before - after
+        self.collected_at = after
+        self.frames = 0
+        self.collections += 1
+        self.pause_ms = pause
+        if pause > self.max_pause_ms:
+            self.max_pause_ms = pause
+            
+    def collect_if_due(self):
+        if self.stats:
+            due = (gc.mem_alloc() - self.collected_at >= 
+                   Heap.COLLECT_BYTES)
+        else:
+            due = self.frames >= Heap.COLLECT_FRAMES
+        if due:
+            self.collect()
+            
+    def end_frame(self):
+        self.frames += 1
+        if not self.stats:
+            return
+        now = gc.mem_alloc()
+        alloc = now - self.frame_start + self.frame_freed
+        if alloc < 0:
+            # The heap shrank by itself: a collection no one asked for.
+            self.unscheduled += 1
+            self.collected_at = now
+            return
+        self.measured += 1
+        self.total_alloc += alloc
+        if alloc > self.max_alloc:
+            self.max_alloc = alloc
+            
+    def report(self, label, frames):
+        """ Report now and then. Call it after end_frame(). """
+        if frames % Telemetry.SCREEN_FRAMES == 0:
+            if self.stats and self.measured:
+                label.text = 'F%dk A%d/%d G%d+%d P%dms' % (
+                        gc.mem_free() // 1024, 
+                        self.total_alloc // self.measured, self.max_alloc,
+                        self.collections, self.unscheduled, 
+                        self.max_pause_ms)
+            else:
+                label.text = 'G%d P%dms' % (self.collections, 
+                                            self.max_pause_ms)
+        if frames % Telemetry.RING_SIZE == 0:
+            line = 'heap: %d collections, %d unscheduled, pause %d max %d ms' % (
+                    self.collections, self.unscheduled, self.pause_ms, 
+                    self.max_pause_ms)
+            if self.stats and self.measured:
+                line += ', free %d, allocated per frame %d mean %d max' % (
+                        gc.mem_free(), self.total_alloc // self.measured, 
+                        self.max_alloc)
+            print(line)
+            self.reset()
@@ -0,0 +1,17 @@
+"""
+The tests run the scope on the host simulation, like the benchmarks:
+
+    pytest tests
+
+Run pytest itself rather than python -m pytest from the top directory,
+which would put code.py ahead of the standard library's code module.
+The top directory is appended to sys.path here, after the standard
+library, so hostsim can be imported.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
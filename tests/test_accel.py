@@ -0,0 +1,92 @@
+"""The accelerometer's FIFO: readings burst-read from the LIS3DH in one
+transaction and summed into samples, for a full FIFO and a partial one."""
+
+import math
+
+import hostsim
+
+
+def script():
+    """ An AccelScript of readings on all three axes, positive and
+    negative, and the list of readings it has given. """
+    taken = []
+
+    def reading(t):
+        k = len(taken)
+        value = (15.0 * math.sin(0.7 * k), -9.806 + 0.37 * (k % 11),
+                 4.0 * math.cos(1.3 * k) - 2.0)
+        taken.append(value)
+        return value
+    return hostsim.sources.AccelScript(reading), taken
+
+
+def load(realtime=False):
+    accel_script, taken = script()
+    scope = hostsim.load_scope(hostsim.Backend(accel=accel_script,
+                                               realtime=realtime))
+    accel = scope.registry.get('accel')
+    assert accel.fifo_device is not None
+    return accel, taken
+
+
+def expected(reading):
+    """ The sample for one reading: 25 counts per m/s^2 of the sum of the
+    axes, about midscale. """
+    return 32768 + 25 * sum(reading)
+
+
+def check(samples, readings):
+    assert len(samples) == len(readings)
+    for sample, reading in zip(samples, readings):
+        # The driver rounds each axis to a count, a sixtieth of a sample.
+        assert abs(sample - expected(reading)) <= 1
+
+
+def test_full_burst():
+    accel, taken = load()
+    accel.reset_fifo()
+    first = len(taken)
+    transactions = accel.fifo_device.transactions
+    dest = [0] * 40
+    count = accel.read_fifo(dest, 3, 40)
+    # A full FIFO is 32 readings, all read in one transaction.
+    assert count == accel.FIFO_SIZE
+    assert accel.fifo_device.transactions == transactions + 1
+    assert dest[:3] == [0, 0, 0]
+    assert dest[35:] == [0] * 5
+    check(dest[3:35], taken[first:first + 32])
+    assert accel.fifo_overruns == 0
+
+
+def test_partial_burst():
+    accel, taken = load()
+    accel.reset_fifo()
+    first = len(taken)
+    # Fewer samples wanted than the FIFO holds: the rest stay in it, in
+    # order, for the next burst.
+    dest = [0] * 32
+    assert accel.read_fifo(dest, 0, 5) == 5
+    assert accel.read_fifo(dest, 5, 27) == 27
+    check(dest, taken[first:first + 32])
+
+
+def test_partly_filled_fifo(monkeypatch):
+    accel, taken = load()
+    # In real time the FIFO holds the readings taken since it was last
+    # read, at the data rate, on a clock the test moves.
+    from hostsim import adafruit_lis3dh
+    now = [100.0]
+    monkeypatch.setattr(adafruit_lis3dh.time, 'monotonic', lambda: now[0])
+    accel.accelerometer._backend.realtime = True
+    accel.reset_fifo()
+    dest = [0] * 32
+    assert accel.read_fifo(dest, 0, 32) == 0
+    first = len(taken)
+    now[0] += 7.5 / accel.sample_rate
+    assert accel.read_fifo(dest, 0, 32) == 7
+    check(dest[:7], taken[first:first + 7])
+    # Left long enough to overrun, the FIFO gives its newest 32 readings.
+    now[0] += 40.0 / accel.sample_rate
+    assert accel.read_fifo(dest, 0, 32) == 32
+    assert accel.fifo_overruns == 1
+    check(dest, taken[-32:])
@@ -0,0 +1,69 @@
+"""Averaging and peak hold of sweeps that never trigger, and of sweeps
+that start to trigger part way."""
+
+import math
+
+import pytest
+
+import hostsim
+
+
+def load():
+    """ The microphone with a trigger level above its tone, so auto
+    sweeps never find a trigger. """
+    scope = hostsim.load_scope(hostsim.Backend(
+        mic=hostsim.sources.function(
+            lambda t: 32768 + 6000 * math.sin(2 * math.pi * 440 * t))))
+    mic = scope.registry.get('mic')
+    mic.trigger_auto_level = False
+    mic.trigger_level = 60000
+    return scope, mic
+
+
+def lit(screen):
+    return sum(1 for pixel in screen.bitmap.pixels if pixel)
+
+
+@pytest.mark.parametrize('mode', ('AVG', 'EMA', 'PEAK'))
+def test_untriggered(mode):
+    scope, mic = load()
+    from edgemic.accumulator import Accumulator
+    mic.set_acquire_mode(Accumulator.MODE_NAMES.index(mode))
+    scope.run(frames=6, input_idx=0)
+    assert not mic.aligned
+    accumulator = mic.accumulator
+    assert accumulator.count > 0
+    assert not accumulator.aligned
+    assert lit(scope.screen) > 100
+    if mode == 'PEAK':
+        peak = accumulator.peak
+        assert peak.count == peak.columns
+        # The untriggered tone lands anywhere, so every column spans most
+        # of it.
+        spans = [peak.hi[col] - peak.lo[col] for col in range(10, 100)]
+        assert min(spans) > 8000
+
+
+def test_trigger_starts_again():
+    scope, mic = load()
+    from edgemic.accumulator import Accumulator
+    mic.set_acquire_mode(Accumulator.MODE_PEAK)
+    scope.run(frames=4, input_idx=0)
+    accumulator = mic.accumulator
+    untriggered = accumulator.count
+    assert untriggered > 0
+    # Once the tone triggers, the sweeps added without a trigger go, and
+    # the peaks are those of the triggered sweeps alone.
+    mic.trigger_auto_level = True
+    scope.run(frames=4, input_idx=0)
+    assert mic.aligned and accumulator.aligned
+    # As many frames again, so as many sweeps again
+    assert accumulator.count == untriggered
+    peak = accumulator.peak
+    spans = [peak.hi[col] - peak.lo[col] for col in range(10, 100)]
+    assert min(spans) < 4000
+    # A sweep without a trigger is then left out.
+    count = accumulator.count
+    mic.sweep_aligned = False
+    mic.swap_buffers()
+    assert accumulator.count == count
@@ -0,0 +1,105 @@
+"""Button events, and chords not acting as single presses."""
+
+import pytest
+
+import hostsim
+
+# Button's masks, for the scripts
+LEFT = 128
+UP = 64
+DOWN = 32
+RIGHT = 16
+SELECT = 8
+A = 2
+B = 1
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def scope(monkeypatch):
+    """ A scope whose buttons poll the script on a clock the test moves. """
+    script = hostsim.ButtonScript()
+    scope = hostsim.load_scope(hostsim.Backend(buttons=script))
+    import edgemic.buttons
+    clock = Clock()
+    monkeypatch.setattr(edgemic.buttons, 'ticks_ms', clock)
+    scope.clock = clock
+    scope.script = script
+    return scope
+
+
+def press(scope, steps, ms=10):
+    """ Poll each mask in turn, ms apart, and return the events. """
+    button = scope.button
+    scope.script.steps = list(steps)
+    scope.script.polls = 0
+    events = []
+    for _ in steps:
+        button.poll()
+        scope.clock.now += ms
+        event = button.get_event()
+        while event is not None:
+            kind, mask, _ = event
+            events.append((kind, mask))
+            event = button.get_event()
+    return events
+
+
+def test_tap_presses_on_release(scope):
+    Button = scope.Button
+    events = press(scope, [A, A, 0])
+    assert events == [(Button.EVENT_PRESS, A), (Button.EVENT_RELEASE, A)]
+
+
+def test_hold_presses_then_repeats(scope):
+    Button = scope.Button
+    events = press(scope, [B] * 60 + [0])
+    kinds = [kind for kind, mask in events]
+    assert kinds[0] == Button.EVENT_PRESS
+    assert kinds[1:-1] and set(kinds[1:-1]) == {Button.EVENT_REPEAT}
+    assert kinds[-1] == Button.EVENT_RELEASE
+
+
+def test_select_presses_at_once(scope):
+    Button = scope.Button
+    events = press(scope, [SELECT])
+    assert events == [(Button.EVENT_PRESS, SELECT)]
+
+
+@pytest.mark.parametrize('first, second', [(UP, RIGHT), (LEFT, RIGHT),
+                                           (A, B), (UP, DOWN)])
+def test_chord_has_no_single_presses(scope, first, second):
+    Button = scope.Button
+    # The second button goes down 100ms after the first, both are held
+    # for a second, and they are let go one at a time.
+    steps = ([first] * 10 + [first | second] * 100 + [second] * 50 + [0])
+    events = press(scope, steps)
+    kinds = [kind for kind, mask in events]
+    assert Button.EVENT_PRESS not in kinds
+    assert Button.EVENT_REPEAT not in kinds
+    assert (Button.EVENT_CHORD, first | second) in events
+    assert kinds.count(Button.EVENT_RELEASE) == 2
+
+
+def test_inspect_chord_leaves_the_settings(scope):
+    ctl = scope.Controller(0)
+    channel = ctl.channel
+    offset = channel.vertical_offset
+    num_samples = channel.num_samples
+    gain = channel.vertical_gain
+    scope.script.steps = [UP] * 5 + [UP | RIGHT] * 60 + [0]
+    scope.script.polls = 0
+    for _ in scope.script.steps:
+        ctl.handle_input()
+        scope.clock.now += 10
+    assert channel.inspecting
+    assert channel.vertical_offset == offset
+    assert channel.num_samples == num_samples
+    assert channel.vertical_gain == gain
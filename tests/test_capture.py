@@ -0,0 +1,87 @@
+"""Capture files: sweeps streamed by the scope, recorded by capture with a
+new file when the settings change, read back with CaptureReader, and
+played back on the scope as they were drawn."""
+
+import io
+import os
+import sys
+
+import hostsim
+from capture import CaptureReader, Recorder, SweepDecoder
+
+
+def record(tmp_path):
+    """ Stream light sensor sweeps, lower the gain part way, and record
+    them. Return the sweeps and the files. """
+    sink = io.BytesIO()
+    scope = hostsim.load_scope(hostsim.Backend(usb_data=sink,
+                                               analogbufio=True))
+    light = scope.registry.get('light')
+    scope.set_streaming(True)
+    scope.run(frames=4, input_idx=1)
+    light.decrease_gain()
+    light.decrease_offset()
+    scope.run(frames=4, input_idx=1)
+    decoder = SweepDecoder()
+    sweeps = decoder.feed(sink.getvalue())
+    assert decoder.dropped == 0
+    recorder = Recorder(str(tmp_path / 'run.emcap'))
+    for sweep in sweeps:
+        recorder.write(sweep)
+    recorder.close()
+    return sweeps, recorder.paths
+
+
+def test_round_trip(tmp_path):
+    sweeps, paths = record(tmp_path)
+    # The new gain and offset start a new file.
+    assert [os.path.basename(path) for path in paths] == [
+        'run.emcap', 'run-001.emcap']
+    readers = [CaptureReader(path) for path in paths]
+    assert readers[0].gain > readers[1].gain
+    assert readers[0].offset > readers[1].offset
+    assert sum(len(reader) for reader in readers) == len(sweeps)
+    rows = [row for reader in readers for row in reader]
+    for sweep, row in zip(sweeps, rows):
+        assert (row.channel, row.spp, row.gain, row.offset) == (
+            sweep.channel, sweep.spp, sweep.gain, sweep.offset)
+        assert (row.seq, row.sample_rate, row.start) == (
+            sweep.seq, sweep.sample_rate, sweep.start)
+        assert list(row.samples) == list(sweep.samples)
+    for reader in readers:
+        assert reader.channel == 2
+        assert reader.sweep_length == len(reader.samples[0])
+        assert reader.first_seq == reader[0].seq
+        assert reader.dropped == 0
+
+
+def test_replay(tmp_path):
+    sweeps, paths = record(tmp_path)
+    reader = CaptureReader(paths[1])
+    scope = hostsim.load_scope(hostsim.Backend())
+    input_idx = scope.add_replay(paths[1], speed=0)
+    replay = scope.registry.get('replay')
+    assert (replay.vertical_gain, replay.vertical_offset,
+            replay.num_samples_per_px) == (reader.gain, reader.offset,
+                                           reader.spp)
+    # The unit is the light sensor's, without the light sensor's module.
+    assert replay.UNIT == 'V'
+    assert replay.UNIT_ZERO == 0
+    assert 'edgemic.light' not in sys.modules
+    shown = []
+    swap_buffers = replay.swap_buffers
+
+    def swap():
+        swap_buffers()
+        shown.append((replay.start_sample,
+                      list(replay.samples[:replay.num_samples])))
+
+    replay.swap_buffers = swap
+    scope.run(frames=len(reader) + 2, input_idx=input_idx)
+    assert len(shown) >= len(reader)
+    # The sweeps play in order from the first, each from where the
+    # trigger put it on the badge, and start again at the end.
+    for idx, (start, samples) in enumerate(shown):
+        row = reader[idx % len(reader)]
+        assert start == row.start
+        assert samples == list(row.samples)
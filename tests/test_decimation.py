@@ -0,0 +1,89 @@
+"""The decimation filters' gain at DC, in the passband and past the
+column rate, as the README gives it."""
+
+import array
+import math
+
+import numpy
+import pytest
+
+import hostsim
+
+PERS = (2, 3, 4, 8, 16, 33)
+COLUMNS = 100
+# Columns at each end left out of the measurements, where the filters
+# reach past the sweep
+EDGE = 5
+
+
+def load():
+    hostsim.load_scope(hostsim.Backend())
+    from edgemic.decimator import Decimator
+    return Decimator
+
+
+def tone(length, per, freq, amplitude=10000):
+    """ A sine at freq times the column rate, as offset binary samples. """
+    n = numpy.arange(length)
+    x = 32768 + amplitude * numpy.sin(2 * math.pi * freq / per * n + 0.3)
+    return array.array('H', x.astype(int))
+
+
+def gain(mode, per, freq, amplitude=10000):
+    """ The amplitude of a decimated tone over that of the raw tone. """
+    decimator = load()()
+    samples = tone(COLUMNS * per, per, freq, amplitude)
+    count = decimator.run(mode, samples, 0, len(samples), per, COLUMNS)
+    assert count == COLUMNS
+    y = numpy.array(samples[EDGE:count - EDGE], float) - 32768
+    return math.sqrt(2 * numpy.mean(y * y)) / amplitude
+
+
+@pytest.mark.parametrize('per', PERS)
+@pytest.mark.parametrize('mode', (1, 2, 3))
+def test_dc_gain(mode, per):
+    Decimator = load()
+    decimator = Decimator()
+    for level in (0, 1000, 32768, 50000, 65535):
+        samples = array.array('H', [level] * (COLUMNS * per))
+        decimator.run(mode, samples, 0, len(samples), per, COLUMNS)
+        # The CIC drops the bits it shifts out to fit per**3 times a
+        # sample in its integrators.
+        slack = 0
+        if mode == Decimator.FILTER_CIC:
+            slack = 1 << max(0, (per ** 3).bit_length() - 12)
+        for value in samples[:COLUMNS]:
+            assert abs(value - level) <= slack
+
+
+@pytest.mark.parametrize('per', PERS)
+def test_passband(per):
+    Decimator = load()
+    for mode in (Decimator.FILTER_BOXCAR, Decimator.FILTER_CIC,
+                 Decimator.FILTER_FIR):
+        assert gain(mode, per, 0.1) > 0.95
+    # The FIR's cutoff, at 0.4 of the column rate, is where it halves.
+    assert 0.45 < gain(Decimator.FILTER_FIR, per, 0.4) < 0.55
+
+
+@pytest.mark.parametrize('per', PERS)
+def test_just_above_the_column_rate(per):
+    Decimator = load()
+    assert gain(Decimator.FILTER_CIC, per, 1.1) < 0.01
+    assert gain(Decimator.FILTER_FIR, per, 1.1) < 0.01
+    assert 0.08 < gain(Decimator.FILTER_BOXCAR, per, 1.1) < 0.16
+
+
+@pytest.mark.parametrize('per', PERS)
+@pytest.mark.parametrize('mode', (1, 2, 3))
+def test_samples_ahead_of_start(mode, per):
+    decimator = load()()
+    start = 3 * per + 1
+    sweep = tone(COLUMNS * per, per, 0.3)
+    outputs = []
+    for junk in (0, 65535):
+        samples = array.array('H', [junk] * start) + sweep
+        decimator.run(mode, samples, start, len(samples), per, COLUMNS)
+        assert list(samples[:start]) == [junk] * start
+        outputs.append(list(samples[start:start + COLUMNS]))
+    assert outputs[0] == outputs[1]
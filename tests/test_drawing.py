@@ -0,0 +1,158 @@
+"""The trace bitmap, drawn with bitmaptools' fill_region() and pixel by
+pixel, against a trace drawn from scratch every frame."""
+
+import math
+
+import pytest
+
+import hostsim
+
+
+def mic_source():
+    """ A triggered 440Hz tone with a second tone that moves the dots
+    and spans between sweeps. """
+    return hostsim.sources.function(
+        lambda t: (32768 + 6000 * math.sin(2 * math.pi * 440 * t) +
+                   2500 * math.sin(2 * math.pi * 1234.5 * t)))
+
+
+def light_source():
+    return hostsim.sources.function(
+        lambda t: (30000 + 2000 * math.sin(2 * math.pi * 100 * t) +
+                   700 * math.sin(2 * math.pi * 37 * t)))
+
+
+def script(scope):
+    """ Yield (input, settings, frames) steps, each run on from the
+    screen the step before drew. settings is called on the input's
+    channels, and returns a callback to run after the first frame, or
+    None. """
+    from edgemic.accumulator import Accumulator
+    from edgemic.decimator import Decimator
+    from edgemic.display import DisplayView
+
+    def dots(spp):
+        def apply(channel):
+            channel.trace_mode = DisplayView.TRACE_DOTS
+            channel.num_samples_per_px = spp
+            channel.calc_num_samples()
+        return apply
+
+    def envelope(spp):
+        def apply(channel):
+            channel.trace_mode = DisplayView.TRACE_ENVELOPE
+            channel.num_samples_per_px = spp
+            channel.calc_num_samples()
+        return apply
+
+    def gain(gain, offset):
+        def apply(channel):
+            channel.vertical_gain = gain
+            channel.vertical_offset = offset
+        return apply
+
+    def roll(on):
+        return lambda channel: channel.set_roll_mode(on)
+
+    def acquire(mode):
+        return lambda channel: channel.set_acquire_mode(mode)
+
+    def decimate(mode):
+        return lambda channel: channel.set_decimation(mode)
+
+    def inspect(per):
+        def apply(channel):
+            def hold():
+                channel.set_inspect(True)
+                channel.history.zoom(per)
+            return hold
+        return apply
+
+    def release(channel):
+        channel.set_inspect(False)
+
+    mic = scope.registry.get('mic')
+    light = scope.registry.get('light')
+    # The light channel's sweeps are paced, so they are kept short.
+    yield 1, dots(light.min_samples_per_px), 4
+    yield 1, dots(light.min_samples_per_px + 2), 4
+    yield 1, envelope(light.min_samples_per_px + 2), 4
+    yield 1, gain(light.max_gain_limit, light.vertical_offset - 32), 3
+    yield 1, gain(light.min_gain_limit, light.vertical_offset + 64), 3
+    yield 1, roll(True), 4
+    yield 1, roll(False), 2
+    yield 0, dots(mic.min_samples_per_px), 4
+    yield 0, envelope(mic.min_samples_per_px + 2), 4
+    yield 0, dots(mic.max_samples_per_px), 3
+    yield 0, inspect(4), 3
+    yield 0, release, 2
+    yield 0, dots(mic.min_samples_per_px + 4), 2
+    for mode in (Decimator.FILTER_BOXCAR, Decimator.FILTER_CIC,
+                 Decimator.FILTER_FIR):
+        yield 0, decimate(mode), 3
+    yield 0, decimate(Decimator.FILTER_NONE), 2
+    yield 0, acquire(Accumulator.MODE_NAMES.index('PEAK')), 4
+    yield 0, acquire(0), 2
+    yield scope.SPECTRUM_INPUT, lambda channel: None, 3
+    yield scope.MULTI_INPUT, lambda channel: None, 4
+    yield 2, envelope(4), 3
+    yield 3, dots(1), 3
+    yield 1, envelope(light.min_samples_per_px), 2
+
+
+def from_scratch(screen):
+    """ The trace bitmap's pixels, drawn from what each layer says it
+    drew, layer by layer as draw_traces() draws them. """
+    columns = screen.columns
+    pixels = bytearray(screen.bitmap.width * screen.bitmap.height)
+    width = screen.bitmap.width
+    for layer in screen.layers:
+        color = layer.trace_color
+        for col in range(columns):
+            for y in range(layer.span_top[col], layer.span_bottom[col] + 1):
+                pixels[y * width + col] = color
+        for idx in range(layer.dot_count):
+            pixels[layer.dot_ys[idx] * width + idx // layer.dot_per] = color
+    return pixels
+
+
+def frames(bitmaptools):
+    """ The trace bitmap after each frame the script draws. """
+    scope = hostsim.load_scope(hostsim.Backend(
+        mic=mic_source(), light=light_source(), bitmaptools=bitmaptools))
+    screen = scope.screen
+    drawn = []
+    pending = []
+    draw_traces = screen.draw_traces
+
+    def record(channels):
+        draw_traces(channels)
+        drawn.append(bytes(screen.bitmap.pixels))
+        assert drawn[-1] == from_scratch(screen), 'frame %d' % len(drawn)
+        while pending:
+            pending.pop()()
+
+    screen.draw_traces = record
+    for input_idx, settings, count in script(scope):
+        names = scope.INPUTS[input_idx]
+        if not isinstance(names, tuple):
+            names = (names,)
+        for name in names:
+            after = settings(scope.registry.get(name))
+            if after is not None:
+                pending.append(after)
+        scope.run(frames=count, input_idx=input_idx)
+    return drawn
+
+
+@pytest.mark.parametrize('bitmaptools', [True, False])
+def test_matches_drawing_from_scratch(bitmaptools):
+    assert len(frames(bitmaptools)) == 74
+
+
+def test_fill_region_matches_pixel_writes():
+    with_fills = frames(True)
+    by_pixel = frames(False)
+    assert len(with_fills) == len(by_pixel)
+    for idx in range(len(with_fills)):
+        assert with_fills[idx] == by_pixel[idx], 'frame %d' % (idx + 1)
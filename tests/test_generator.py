@@ -0,0 +1,121 @@
+"""The function generator: its waveform tables, the frequency and
+amplitude steps on their chords, and sweeps played from the table."""
+
+import pytest
+
+import hostsim
+
+LEFT, UP, DOWN, RIGHT = 128, 64, 32, 16
+START, A, B = 4, 2, 1
+
+
+def load():
+    scope = hostsim.load_scope(hostsim.Backend())
+    generator = scope.registry.get('generator')
+    generator.preset()
+    return scope, generator
+
+
+def test_shapes():
+    scope, generator = load()
+    size = generator.SHAPE_SIZE
+    half = size >> 1
+    sawtooth, triangle, sine, square, noise = generator.shapes
+    for shape in generator.shapes:
+        assert len(shape) == size
+        assert -32767 <= min(shape) and max(shape) <= 32767
+    assert (sawtooth[0], sawtooth[-1]) == (-32767, 32767)
+    assert all(sawtooth[i] < sawtooth[i + 1] for i in range(size - 1))
+    assert (triangle[0], triangle[half]) == (-32767, 32767)
+    assert sine[0] == 0 and sine[size >> 2] == 32767
+    assert sine[3 * size >> 2] == -32767
+    assert list(square) == [32767] * half + [-32767] * half
+    # Noise from a fixed seed, about midscale
+    assert noise == generator.make_shapes()[generator.WAVE_NOISE]
+    assert abs(sum(noise) / size) < 4000
+
+
+@pytest.mark.parametrize('wave', range(5))
+def test_tables(wave):
+    scope, generator = load()
+    midscale = generator.adc_midscale
+    generator.wave = wave
+    for frequency_idx, frequency in enumerate(generator.FREQUENCIES):
+        for amplitude_idx in (0, len(generator.AMPLITUDES) - 1):
+            generator.frequency_idx = frequency_idx
+            generator.amplitude_idx = amplitude_idx
+            generator.make_table()
+            table = generator.table
+            period = generator.SAMPLE_RATE // frequency
+            assert len(table) % period == 0
+            assert len(table) >= generator.MIN_TABLE_SIZE
+            assert list(table[period:]) == list(table[:-period])
+            amplitude = generator.AMPLITUDES[amplitude_idx]
+            assert midscale - amplitude <= min(table)
+            assert max(table) <= midscale + amplitude
+            shape = generator.shapes[wave]
+            step = generator.SHAPE_SIZE / period
+            for i in range(0, period, max(1, period // 7)):
+                value = shape[int(i * step)] * amplitude / 32768
+                assert abs(table[i] - midscale - value) <= 1
+
+
+def test_frequency_and_amplitude_chords():
+    scope, generator = load()
+    chord = scope.Button.EVENT_CHORD
+    frequencies = []
+    for _ in range(len(generator.FREQUENCIES) + 1):
+        generator.button_event(chord, A | RIGHT)
+        frequencies.append(generator.FREQUENCIES[generator.frequency_idx])
+    assert frequencies == list(generator.FREQUENCIES[4:]) + [2000] * 5
+    assert generator.name == 'SAW 2000Hz'
+    for _ in range(len(generator.FREQUENCIES)):
+        generator.button_event(chord, A | LEFT)
+    assert generator.FREQUENCIES[generator.frequency_idx] == 10
+    # Only whole periods of 10Hz fit the table.
+    assert len(generator.table) == 1000
+
+    amplitudes = []
+    for _ in range(len(generator.AMPLITUDES)):
+        generator.button_event(chord, A | UP)
+        amplitudes.append(generator.AMPLITUDES[generator.amplitude_idx])
+    assert amplitudes == list(generator.AMPLITUDES[3:]) + [32000] * 3
+    generator.button_event(chord, A | DOWN)
+    assert generator.AMPLITUDES[generator.amplitude_idx] == 16000
+
+    names = []
+    for _ in range(len(generator.WAVE_NAMES)):
+        generator.button_event(chord, A | B)
+        names.append(generator.name)
+    assert names == ['TRI 10Hz', 'SINE 10Hz', 'SQUARE 10Hz', 'NOISE 10Hz',
+                     'SAW 10Hz']
+
+
+def test_standard_buttons():
+    scope, generator = load()
+    press = scope.Button.EVENT_PRESS
+    spp = generator.num_samples_per_px
+    offset = generator.vertical_offset
+    generator.button_event(press, RIGHT)
+    generator.button_event(press, DOWN)
+    assert generator.num_samples_per_px > spp
+    assert generator.vertical_offset > offset
+    name = generator.name
+    # Start restores the defaults, and leaves the waveform as it was.
+    generator.button_event(press, START)
+    assert generator.num_samples_per_px == spp
+    assert generator.vertical_offset == offset
+    assert generator.name == name
+
+
+def test_sweeps_follow_on():
+    scope, generator = load()
+    generator.frequency_idx = 4
+    generator.make_table()
+    table = list(generator.table)
+    played = []
+    for _ in range(5):
+        generator.take_sweep()
+        played += list(generator.sweep_samples[:generator.num_samples])
+    assert len(played) > 2 * len(table)
+    assert played == (table * (len(played) // len(table) + 1))[:len(played)]
@@ -0,0 +1,18 @@
+"""The light channel's sweep rate, paced and with analogbufio."""
+
+import pytest
+
+import hostsim
+
+
+@pytest.mark.parametrize('analogbufio', [False, True])
+def test_rate_and_frequency(analogbufio):
+    # The default light source is a 100Hz sine.
+    scope = hostsim.load_scope(hostsim.Backend(analogbufio=analogbufio))
+    from edgemic.display import DisplayView
+    scope.screen.measure_page = DisplayView.MEASURE_TIMING
+    scope.run(frames=2 * DisplayView.MEASURE_FRAMES, input_idx=1)
+    channel = scope.registry.made('light')
+    # Paced reads can only run late, so the rate is at most the one set.
+    assert 4500 <= channel.achieved_rate <= channel.sample_rate
+    assert channel.measurements.frequency == pytest.approx(1000, rel=0.02)
@@ -0,0 +1,64 @@
+"""Samples mapped to rows, by table and by array math, against the formula."""
+
+import array
+import types
+
+import numpy
+import pytest
+
+import hostsim
+
+SAMPLES = array.array('H', range(65536))
+GAINS = range(16)
+OFFSETS = (-40, 14, 64, 114, 200)
+# 32767 has low bits set at every gain, so it never uses the table.
+MIDSCALES = (0, 32768, 32767)
+
+
+def expected_rows(view, gain, offset, midscale):
+    """ y = offset - ((sample - midscale) >> gain) on the screen, limited
+    to the graph, as a row of the trace bitmap. """
+    from edgemic.common import y_top
+    y = offset - y_top - ((numpy.arange(65536) - midscale) >> gain)
+    return bytearray(numpy.clip(y, 0, view.rows - 1).astype(numpy.uint8))
+
+
+@pytest.mark.parametrize('ulab', [False, True])
+@pytest.mark.parametrize('midscale', MIDSCALES)
+def test_every_sample_and_gain(ulab, midscale):
+    scope = hostsim.load_scope(hostsim.Backend(ulab=ulab))
+    view = scope.screen
+    from edgemic.display import DisplayView
+    dest = bytearray(65536)
+    for gain in GAINS:
+        for offset in OFFSETS:
+            channel = types.SimpleNamespace(vertical_gain=gain,
+                                            vertical_offset=offset,
+                                            adc_midscale=midscale)
+            view.set_mapping(channel)
+            if not ulab:
+                # The table is used wherever it is exact and small enough.
+                assert (view.lut is not None) == (
+                        gain >= DisplayView.LUT_MIN_GAIN and
+                        midscale & ((1 << gain) - 1) == 0)
+            view.map_samples(SAMPLES, 0, 65536, dest)
+            assert dest == expected_rows(view, gain, offset, midscale), (
+                    gain, offset)
+
+
+def test_table_follows_the_settings():
+    scope = hostsim.load_scope(hostsim.Backend())
+    view = scope.screen
+    channel = types.SimpleNamespace(vertical_gain=8, vertical_offset=64,
+                                    adc_midscale=32768)
+    view.set_mapping(channel)
+    lut = view.lut
+    # The same settings keep the table; new ones refill it.
+    view.set_mapping(channel)
+    assert view.lut is lut
+    channel.vertical_offset = 80
+    view.set_mapping(channel)
+    from edgemic.common import y_top
+    dest = bytearray(1)
+    view.map_samples(array.array('H', [32768]), 0, 1, dest)
+    assert dest[0] == 80 - y_top
@@ -0,0 +1,108 @@
+"""Measurements of generator sweeps with known levels and timing, of a
+flat trace, and of a trace that crosses its level only once."""
+
+import array
+import math
+
+import pytest
+
+import hostsim
+
+MIDSCALE = 32768
+AMPLITUDE = 8000
+FREQUENCY = 100
+# Twenty whole periods of FREQUENCY at the generator's rate
+COUNT = 2000
+
+
+def load():
+    hostsim.load_scope(hostsim.Backend())
+    from edgemic.measure import Measurements
+    return Measurements
+
+
+def sweep(wave):
+    """ COUNT samples of a generator waveform, and the rate. """
+    scope = hostsim.load_scope(hostsim.Backend())
+    generator = scope.registry.get('generator')
+    generator.wave = generator.WAVE_NAMES.index(wave)
+    generator.frequency_idx = generator.FREQUENCIES.index(FREQUENCY)
+    generator.amplitude_idx = generator.AMPLITUDES.index(AMPLITUDE)
+    generator.make_table()
+    generator.num_samples = COUNT
+    generator.take_sweep()
+    return generator.sweep_samples, generator.sample_rate
+
+
+def measured(samples, start, count, rate):
+    """ Measurements of a sweep, once the level from the sweep before
+    has settled on it. """
+    m = load()()
+    m.measure(samples, start, count, rate)
+    m.measure(samples, start, count, rate)
+    return m
+
+
+@pytest.mark.parametrize('wave, rms', (
+    ('SINE', AMPLITUDE / math.sqrt(2)),
+    ('SQUARE', AMPLITUDE),
+    ('SAW', AMPLITUDE / math.sqrt(3))))
+def test_generator(wave, rms):
+    samples, rate = sweep(wave)
+    m = measured(samples, 0, COUNT, rate)
+    assert abs((m.hi - m.lo) - 2 * AMPLITUDE) <= 2 * AMPLITUDE // 100
+    assert abs(m.mean - MIDSCALE) <= AMPLITUDE // 100
+    assert abs(m.rms - rms) <= rms / 50
+    # Timed over whole periods, in 0.1Hz and 0.1%
+    assert m.frequency == 10 * FREQUENCY
+    assert abs(m.duty - 500) <= 10
+
+
+def test_square_duty():
+    samples, rate = sweep('SQUARE')
+    m = measured(samples, 0, COUNT, rate)
+    assert m.duty == 500
+    # The table's values round down from 32767/32768 of the amplitude.
+    assert (m.lo, m.hi) == (MIDSCALE - AMPLITUDE, MIDSCALE + AMPLITUDE - 1)
+
+
+def test_start_and_count():
+    # Measured from start, over count samples only
+    samples, rate = sweep('SAW')
+    padded = array.array('H', [0] * 37) + samples[:COUNT] + array.array(
+        'H', [65535] * 37)
+    m = measured(padded, 37, COUNT, rate)
+    whole = measured(samples, 0, COUNT, rate)
+    assert (m.lo, m.hi, m.mean, m.rms, m.frequency, m.duty) == (
+        whole.lo, whole.hi, whole.mean, whole.rms, whole.frequency,
+        whole.duty)
+
+
+def test_flat():
+    samples = array.array('H', [40000] * COUNT)
+    m = measured(samples, 0, COUNT, 10000)
+    assert (m.lo, m.hi, m.mean, m.rms) == (40000, 40000, 40000, 0)
+    assert m.frequency is None and m.duty is None
+
+
+def test_flat_with_noise():
+    # Noise smaller than the least hysteresis is not a frequency.
+    samples = array.array('H', [40000 + 20 * (i % 3) for i in range(COUNT)])
+    m = measured(samples, 0, COUNT, 10000)
+    assert m.hi - m.lo == 40
+    assert m.frequency is None and m.duty is None
+
+
+def test_single_crossing():
+    samples = array.array('H', [30000] * 700 + [36000] * 1300)
+    m = measured(samples, 0, COUNT, 10000)
+    assert (m.lo, m.hi) == (30000, 36000)
+    assert m.mean == (30000 * 700 + 36000 * 1300) // COUNT
+    assert abs(m.rms - 6000 * math.sqrt(0.35 * 0.65)) <= 6000 / 50
+    assert m.frequency is None and m.duty is None
+
+
+def test_too_short():
+    samples = array.array('H', [30000, 36000])
+    m = measured(samples, 0, 1, 10000)
+    assert (m.lo, m.hi, m.mean, m.rms, m.frequency, m.duty) == (None,) * 6
@@ -0,0 +1,83 @@
+"""The spectrum's FFTs against a float DFT."""
+
+import array
+import math
+
+import numpy
+import pytest
+
+import hostsim
+
+SIZES = (128, 256, 512, 1024, 2048, 4096)
+# Room before and after the sweep in its buffer, which must not change
+PAD = 3
+
+
+def signal(size):
+    """ Two tones and some noise, as offset binary samples. """
+    rng = numpy.random.default_rng(size)
+    n = numpy.arange(size)
+    x = (32768 + 12000 * numpy.sin(2 * math.pi * 0.0625 * n) +
+         3000 * numpy.sin(2 * math.pi * 0.3 * n + 1) +
+         rng.integers(-512, 512, size))
+    return x.astype(int)
+
+
+def float_dft(spectrum, x):
+    """ The first size / 2 bins of the windowed sweep, by the definition. """
+    size = spectrum.size
+    half = numpy.array(spectrum.window) / 32767
+    windowed = (x - 32768) * numpy.concatenate((half, half[::-1]))
+    n = numpy.arange(size)
+    k = numpy.arange(size // 2)
+    return numpy.exp(-2j * math.pi * numpy.outer(k, n) / size) @ windowed
+
+
+def load(ulab):
+    hostsim.load_scope(hostsim.Backend(ulab=ulab))
+    from edgemic.spectrum import Spectrum
+    return Spectrum
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_fixed_point_transform(size):
+    spectrum = load(False)(size)
+    x = signal(size)
+    buf = array.array('H', [1] * PAD + list(x) + [2] * PAD)
+    spectrum.transform(buf, PAD)
+    assert list(buf[:PAD]) == [1] * PAD
+    assert list(buf[PAD + size:]) == [2] * PAD
+    # Bin k is X[k] / (2 size), and each stage may round by an LSB.
+    expected = float_dft(spectrum, x) / (2 * size)
+    out = numpy.array(buf[PAD:PAD + size], dtype=float) - 32768
+    stages = math.log2(size)
+    assert numpy.max(numpy.abs(out[0::2] - expected.real)) <= stages
+    assert numpy.max(numpy.abs(out[1::2] - expected.imag)) <= stages
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_array_power(size):
+    spectrum = load(True)(size)
+    x = signal(size)
+    buf = array.array('H', [0] * PAD + list(x))
+    power = numpy.array(spectrum.power_array(buf, PAD))
+    expected = numpy.abs(float_dft(spectrum, x)) ** 2
+    assert numpy.allclose(power, expected, rtol=1e-6,
+                          atol=1e-9 * expected.max())
+    # The same again, from the arrays kept from the first time
+    power = numpy.array(spectrum.power_array(buf, PAD))
+    assert numpy.allclose(power, expected, rtol=1e-6,
+                          atol=1e-9 * expected.max())
+
+
+@pytest.mark.parametrize('ulab', [False, True])
+def test_full_scale_sine_reads_0db(ulab):
+    size = 1024
+    spectrum = load(ulab)(size)
+    # A sine in the middle of bin 64, at full scale
+    buf = array.array('H', [
+            32768 + int(32767 * math.sin(2 * math.pi * 64 * i / size))
+            for i in range(size)])
+    levels = array.array('h', [0] * 131)
+    spectrum.levels(buf, 0, levels)
+    assert -1 <= max(levels) <= 0
@@ -0,0 +1,140 @@
+"""Sweeps streamed by edgemic.stream and decoded by capture: samples and
+spectra, the measurements, resyncing after garbage or a sweep cut short,
+and sweeps counted as dropped across gaps in seq."""
+
+import io
+
+import numpy
+
+import hostsim
+from capture import SweepDecoder
+from capture import stream as wire
+
+
+def load(**options):
+    sink = io.BytesIO()
+    scope = hostsim.load_scope(hostsim.Backend(usb_data=sink, **options))
+    return scope, sink
+
+
+def sender(scope):
+    """ A SweepStream on the scope's data port. """
+    import usb_cdc
+    from edgemic.stream import SweepStream
+    return SweepStream(usb_cdc.data)
+
+
+def sent(scope, sink, seqs, input_idx=0):
+    """ The bytes of the sweeps of a channel sent with each seq. """
+    channel = scope.registry.get(scope.INPUTS[input_idx])
+    stream = sender(scope)
+    scope.run(frames=2, input_idx=input_idx)
+    channel.measure()
+    packets = []
+    for seq in seqs:
+        stream.seq = seq
+        start = sink.tell()
+        assert stream.send(channel)
+        packets.append(sink.getvalue()[start:])
+    return channel, packets
+
+
+def test_streamed_while_running():
+    scope, sink = load()
+    scope.set_streaming(True)
+    scope.run(frames=6, input_idx=0)
+    mic = scope.registry.get('mic')
+    decoder = SweepDecoder()
+    sweeps = decoder.feed(sink.getvalue())
+    assert len(sweeps) >= 5
+    assert [sweep.seq for sweep in sweeps] == list(range(len(sweeps)))
+    assert decoder.dropped == 0 and decoder.skipped_bytes == 0
+    last = sweeps[-1]
+    assert wire.CHANNEL_NAMES[last.channel] == 'mic'
+    assert not last.flags & wire.FLAG_SPECTRUM
+    assert last.samples.dtype == numpy.dtype('<u2')
+    assert (last.spp, last.gain, last.offset) == (
+        mic.num_samples_per_px, mic.vertical_gain, mic.vertical_offset)
+    assert last.sample_rate == int(mic.achieved_rate or mic.sample_rate)
+    assert last.start == mic.start_sample
+    assert list(last.samples) == list(mic.samples[:mic.num_samples])
+    # Every sweep sent while streaming is measured.
+    m = mic.measurements
+    assert last.flags & wire.FLAG_MEASURED
+    assert (last.measurements.lo, last.measurements.hi,
+            last.measurements.mean) == (m.lo, m.hi, m.mean)
+    assert abs(last.measurements.frequency - 440) < 10
+
+
+def test_spectrum():
+    scope, sink = load()
+    scope.set_streaming(True)
+    scope.run(frames=3, input_idx=scope.SPECTRUM_INPUT)
+    mic = scope.registry.get('mic')
+    sweeps = SweepDecoder().feed(sink.getvalue())
+    last = sweeps[-1]
+    assert last.flags & wire.FLAG_SPECTRUM
+    assert not last.flags & wire.FLAG_MEASURED
+    assert last.samples.dtype == numpy.dtype('<i2')
+    assert list(last.samples) == list(mic.spectrum_db)
+    # The levels are signed dB, and the tone stands well above the rest.
+    assert last.samples.min() < 0
+    assert last.samples.max() > numpy.median(last.samples) + 30
+
+
+def test_resync_after_garbage():
+    scope, sink = load()
+    channel, packets = sent(scope, sink, (0, 1))
+    # Garbage with a false magic and a header that does not fit
+    garbage = b'\x00\xffEM\x09junk' + packets[1][:5] + b'E'
+    decoder = SweepDecoder()
+    data = garbage + packets[0] + packets[1]
+    sweeps = []
+    # Fed in odd-sized pieces as a serial port delivers them
+    for at in range(0, len(data), 7):
+        sweeps += decoder.feed(data[at:at + 7])
+    assert [sweep.seq for sweep in sweeps] == [0, 1]
+    assert decoder.skipped_bytes == len(garbage)
+    assert list(sweeps[1].samples) == list(sweeps[0].samples)
+
+
+def test_truncated_packet():
+    scope, sink = load()
+    channel, packets = sent(scope, sink, (0, 1, 2))
+    decoder = SweepDecoder()
+    # The badge timed out part way through the middle sweep.
+    cut = packets[1][:len(packets[1]) // 2]
+    sweeps = decoder.feed(packets[0] + cut + packets[2])
+    assert [sweep.seq for sweep in sweeps] == [0, 2]
+    assert decoder.skipped_bytes == len(cut)
+    assert decoder.dropped == 1
+    # A header alone waits for the rest.
+    assert decoder.feed(packets[0][:wire.HEADER.size]) == []
+    assert len(decoder.feed(packets[0][wire.HEADER.size:])) == 1
+
+
+def test_dropped_sweeps():
+    scope, sink = load()
+    seqs = (5, 6, 9, 0xfffffffe, 0xffffffff, 0, 2, 1)
+    channel, packets = sent(scope, sink, seqs)
+    decoder = SweepDecoder()
+    dropped = []
+    for packet in packets:
+        decoder.feed(packet)
+        dropped.append(decoder.dropped)
+    # 7 and 8 are lost, and 1 once seq has wrapped round to 0. A jump
+    # of more than half the range is the badge starting again, not a
+    # loss, whether it goes forward to 0xfffffffe or back from 2 to 1.
+    assert dropped == [0, 0, 2, 2, 2, 2, 3, 3]
+    assert decoder.sweeps == len(seqs)
+
+
+def test_seq_wraps():
+    scope, sink = load()
+    channel, packets = sent(scope, sink, (0xffffffff,))
+    stream = sender(scope)
+    stream.seq = 0xffffffff
+    assert stream.send(channel)
+    assert stream.send(channel)
+    sweeps = SweepDecoder().feed(sink.getvalue()[-2 * len(packets[0]):])
+    assert [sweep.seq for sweep in sweeps] == [0xffffffff, 0]
@@ -0,0 +1,47 @@
+"""The scope as cooperative tasks: an input just selected gets its first
+sweep in steps, while the buttons are still read."""
+
+import asyncio
+
+import hostsim
+
+SELECT = 8
+
+
+def test_first_sweep_is_stepped():
+    # Select, pressed on the microphone, moves to the light sensor,
+    # whose paced sweeps take many steps. The buttons are read once when
+    # they are set up, so Select is the script's second step.
+    script = hostsim.ButtonScript([0, SELECT, 0])
+    scope = hostsim.load_scope(hostsim.Backend(buttons=script))
+    light = scope.registry.get('light')
+    events = []
+
+    def take_sweep():
+        raise AssertionError('a sweep taken in one go under the tasks')
+
+    sweep_step = light.sweep_step
+
+    def step():
+        done = sweep_step()
+        events.append(('step', script.polls, done))
+        return done
+
+    draw_trace = scope.screen.draw_trace
+
+    def draw(color_idx, channel, layer_idx=0):
+        if channel is light:
+            events.append(('draw', script.polls, None))
+        draw_trace(color_idx, channel, layer_idx)
+
+    light.take_sweep = take_sweep
+    light.sweep_step = step
+    scope.screen.draw_trace = draw
+    asyncio.run(scope.run_tasks(frames=12, input_idx=0))
+
+    first = [kind for kind, polls, done in events].index('draw')
+    steps = events[:first]
+    assert steps, 'the light sensor drawn before its first sweep'
+    assert steps[-1][2], 'the light sensor drawn part way through a sweep'
+    # The input task went on reading the buttons between the steps.
+    assert steps[-1][1] > steps[0][1]
@@ -0,0 +1,67 @@
+"""Frame telemetry when Up and Down together change its mode part way
+through a frame."""
+
+import hostsim
+
+UP = 64
+DOWN = 32
+# A span longer than this is the uptime, not a stage of a frame.
+MAX_SPAN_US = 1000000
+
+
+def spans(telemetry):
+    for ring in telemetry.times:
+        for value in ring[:telemetry.count]:
+            yield value
+
+
+def test_mode_change_mid_frame():
+    hostsim.load_scope(hostsim.Backend())
+    from edgemic.telemetry import Telemetry
+    telemetry = Telemetry()
+    telemetry.next_mode()
+    telemetry.start()
+    telemetry.mark(Telemetry.SPAN_INPUT)
+    telemetry.next_mode()
+    assert telemetry.mode == Telemetry.MODE_SERIAL
+    telemetry.mark(Telemetry.SPAN_DRAW)
+    telemetry.end_frame()
+    assert telemetry.count == 1
+    assert all(value < MAX_SPAN_US for value in spans(telemetry))
+
+
+def test_chord_while_running(monkeypatch):
+    # Each frame reads the buttons once, and Button reads them once when
+    # it is set up. The chord acts in handle_input(), after start_frame()
+    # has decided whether the frame is timed.
+    steps = [0, (0, 3), UP | DOWN, (0, 4), UP | DOWN, 0]
+    script = hostsim.ButtonScript(steps)
+    scope = hostsim.load_scope(hostsim.Backend(buttons=script))
+    import edgemic.buttons
+    from edgemic.telemetry import Telemetry
+    # The button clock moves 10ms a read, so the presses are far enough
+    # apart not to be taken for bounces.
+    poll = script.poll
+    now = [1000]
+
+    def timed_poll():
+        now[0] += 10
+        return poll()
+
+    script.poll = timed_poll
+    monkeypatch.setattr(edgemic.buttons, 'ticks_ms', lambda: now[0])
+    modes = []
+    end_frame = scope.telemetry.end_frame
+
+    def record():
+        end_frame()
+        modes.append(scope.telemetry.mode)
+
+    scope.telemetry.end_frame = record
+    # Fewer frames than the ring holds, so none of the spans timed are
+    # written over.
+    scope.run(frames=30, input_idx=2)
+    assert Telemetry.MODE_SCREEN in modes
+    assert modes[-1] == Telemetry.MODE_SERIAL
+    assert scope.telemetry.count > 0
+    assert all(value < MAX_SPAN_US for value in spans(scope.telemetry))
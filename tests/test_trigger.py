@@ -0,0 +1,178 @@
+"""The trigger: the edge search with its hysteresis, holdoff, the
+pretrigger, single sweeps held and re-armed, the button chords, and the
+level following the signal."""
+
+import array
+
+import hostsim
+
+LEFT, UP, DOWN, RIGHT = 128, 64, 32, 16
+START, B = 4, 1
+
+
+def load(name='mic'):
+    """ A channel whose sweep buffer is filled by the tests. """
+    scope = hostsim.load_scope(hostsim.Backend())
+    channel = scope.registry.get(name)
+    channel.preset()
+    return scope, channel
+
+
+def fill(channel, values):
+    """ Put values in the sweep buffer from the first sample searched,
+    past the samples skipped and the pretrigger, and midscale around
+    them. """
+    samples = channel.sweep_samples
+    for idx in range(channel.num_samples):
+        samples[idx] = channel.adc_midscale
+    first = channel.skip_samples + channel.pretrigger_px * (
+        1 + channel.num_samples_per_px)
+    samples[first:first + len(values)] = array.array('H', values)
+    return first
+
+
+def manual(channel, level, hysteresis):
+    channel.trigger_auto_level = False
+    channel.trigger_level = level
+    channel.trigger_hysteresis = hysteresis
+
+
+def test_hysteresis():
+    scope, mic = load()
+    manual(mic, 32768, 1000)
+    # Noise around the level does not arm the trigger; a swing past the
+    # hysteresis does, and the next crossing triggers.
+    first = fill(mic, [32900, 32500, 33000, 32000, 31000, 32000, 33000])
+    assert mic.find_trigger(mic.sweep_samples, first, first + 7) == first + 6
+    first = fill(mic, [32900, 32500, 33000, 32000, 32100, 33000])
+    assert mic.find_trigger(mic.sweep_samples, first, first + 6) == -1
+    assert mic.trigger()
+    assert not mic.sweep_aligned
+    assert mic.sweep_start == mic.skip_samples
+
+
+def test_falling_edge():
+    scope, mic = load()
+    manual(mic, 32768, 1000)
+    mic.next_trigger_edge()
+    first = fill(mic, [31000, 34000, 33000, 32768, 31000, 34000])
+    assert mic.find_trigger(mic.sweep_samples, first, first + 6) == first + 3
+    mic.next_trigger_edge()
+    assert mic.find_trigger(mic.sweep_samples, first, first + 6) == first + 1
+
+
+def test_pretrigger():
+    scope, mic = load()
+    manual(mic, 32768, 1000)
+    # A crossing ahead of the pretrigger columns is not a trigger point,
+    # or the trace would start before the sweep.
+    first = fill(mic, [])
+    samples = mic.sweep_samples
+    samples[mic.skip_samples] = 30000
+    samples[mic.skip_samples + 1] = 35000
+    samples[first + 40] = 30000
+    samples[first + 41] = 35000
+    assert mic.trigger()
+    assert mic.sweep_aligned
+    pretrigger = mic.pretrigger_px * (1 + mic.num_samples_per_px)
+    assert mic.sweep_start == first + 41 - pretrigger
+    assert mic.sweep_start >= mic.skip_samples
+
+
+def test_holdoff(monkeypatch):
+    scope, mic = load()
+    # Each scope loads its modules afresh.
+    import edgemic.channel
+    manual(mic, 32768, 1000)
+    now = [1000]
+    monkeypatch.setattr(edgemic.channel, 'ticks_ms', lambda: now[0])
+    mic.trigger_holdoff_ms = 50
+    fill(mic, [30000, 35000])
+    assert mic.trigger()
+    # Within the holdoff an auto sweep is not shown at all.
+    now[0] += 49
+    assert not mic.trigger()
+    now[0] += 1
+    assert mic.trigger()
+    assert mic.sweep_aligned
+
+
+def test_normal_and_single():
+    scope, mic = load()
+    manual(mic, 32768, 1000)
+    mic.set_trigger_mode(mic.TRIGGER_NORMAL)
+    fill(mic, [])
+    assert not mic.trigger()
+    mic.set_trigger_mode(mic.TRIGGER_SINGLE)
+    assert not mic.trigger()
+    assert not mic.trigger_held
+    fill(mic, [30000, 35000])
+    assert mic.trigger()
+    assert mic.trigger_held
+    # The held sweep stays until Start re-arms the trigger.
+    assert not mic.trigger()
+    gain = mic.vertical_gain
+    mic.vertical_gain = mic.max_gain_limit
+    mic.button_event(scope.Button.EVENT_PRESS, START)
+    assert not mic.trigger_held
+    assert mic.vertical_gain == mic.max_gain_limit
+    assert mic.trigger()
+    assert mic.trigger_held
+    mic.button_event(scope.Button.EVENT_PRESS, START)
+    mic.button_event(scope.Button.EVENT_PRESS, START)
+    assert mic.vertical_gain == gain
+
+
+def test_chords():
+    scope, mic = load()
+    chord = scope.Button.EVENT_CHORD
+    names = []
+    for _ in range(len(mic.TRIGGER_NAMES)):
+        mic.button_event(chord, B | LEFT)
+        names.append(mic.TRIGGER_NAMES[mic.trigger_mode])
+    assert names == ['NORM', 'SNGL', 'FREE', 'AUTO']
+    mic.button_event(chord, B | RIGHT)
+    assert mic.trigger_edge == mic.TRIGGER_FALLING
+    mic.button_event(chord, B | RIGHT)
+    assert mic.trigger_edge == mic.TRIGGER_RISING
+    level = mic.trigger_level
+    step = mic.TRIGGER_LEVEL_STEP_PX << mic.vertical_gain
+    mic.button_event(chord, B | UP)
+    mic.button_event(chord, B | UP)
+    mic.button_event(chord, B | DOWN)
+    assert mic.trigger_level == level + step
+    assert not mic.trigger_auto_level
+    # Start brings back the automatic level.
+    mic.button_event(scope.Button.EVENT_PRESS, START)
+    assert mic.trigger_auto_level
+
+
+def test_name_shows_trigger():
+    scope, mic = load()
+    chord = scope.Button.EVENT_CHORD
+    screen = scope.screen
+    screen.show_name(mic)
+    assert screen.dt_label.text == mic.name
+    mic.button_event(chord, B | RIGHT)
+    screen.show_name(mic)
+    assert screen.dt_label.text == mic.name + ' AUTO\\'
+    mic.button_event(chord, B | LEFT)
+    mic.button_event(chord, B | LEFT)
+    mic.trigger_held = True
+    screen.show_name(mic)
+    assert screen.dt_label.text == mic.name + ' HELD'
+
+
+def test_level_follows_the_light():
+    # The light sensor's signal is nowhere near midscale, so it only
+    # triggers once the level has found it.
+    scope, light = load('light')
+    scope.run(frames=4, input_idx=1)
+    assert abs(light.trigger_level - 30000) < 100
+    assert abs(light.trigger_hysteresis - (4000 >> 3)) < 10
+    aligned = []
+    for _ in range(4):
+        light.take_sweep()
+        light.trigger()
+        aligned.append(light.sweep_aligned)
+    assert all(aligned)